@@ -5,12 +5,109 @@ This file provides a fallback method for retrieving stock data.
 
 import yfinance as yf
 import pandas as pd
+import os
 import logging
+import calendar
 import datetime
 import time
+from urllib.parse import urlparse
+
+from fetch_engine import host_limiter
+from http_pool import get_session
+from metrics import HTTP_ATTEMPTS, RETRIES
+from request_timing import phase
+from yahoo_scraper import chart_result_frame, HISTORY_COLUMNS, MAX_RANGE_DAYS
 
 logger = logging.getLogger(__name__)
 
+# Chart API to query directly instead of going through yfinance (e.g. a local stand-in for load tests)
+YAHOO_CHART_BASE_URL = os.environ.get('YAHOO_CHART_BASE_URL', '').rstrip('/')
+
+# Host yfinance downloads history from, used for per-host concurrency limits
+YFINANCE_HOST = urlparse(YAHOO_CHART_BASE_URL).netloc if YAHOO_CHART_BASE_URL else "query2.finance.yahoo.com"
+
+# yfinance errors that mean the range really has no bars (e.g. before the listing date)
+NO_DATA_ERRORS = ("no price data found", "no data found", "data doesn't exist")
+
+def _inclusive_end(end_date):
+    """Return the day after end_date (YYYY-MM-DD) for yfinance's exclusive end parameter"""
+    end_dt = datetime.datetime.strptime(end_date, '%Y-%m-%d') + datetime.timedelta(days=1)
+    return end_dt.strftime('%Y-%m-%d')
+
+def _epoch(date_str):
+    return calendar.timegm(datetime.datetime.strptime(date_str, '%Y-%m-%d').timetuple())
+
+def _download_chart(ticker, start, end):
+    """
+    Fetch daily bars for [start, end) from the chart API at YAHOO_CHART_BASE_URL
+    
+    Returns:
+        DataFrame: Bars indexed by Date, oldest first, like yf.download returns them (empty if none)
+    """
+    params = {
+        'period1': _epoch(start),
+        'period2': _epoch(end),
+        'interval': '1d',
+        'events': 'div,split',
+        'includeAdjustedClose': 'true'
+    }
+    response = get_session().get(f"{YAHOO_CHART_BASE_URL}/v8/finance/chart/{ticker}", params=params, timeout=15)
+    response.raise_for_status()
+    results = (response.json().get("chart") or {}).get("result") or []
+    # Events aren't part of yfinance's download() output either
+    df, _ = chart_result_frame(results[0]) if results else (None, None)
+    if df is None:
+        return pd.DataFrame()
+    return df.sort_values("Date").set_index("Date")
+
+def _download(tickers, start, end, **kwargs):
+    """
+    yf.download, or the chart API at YAHOO_CHART_BASE_URL when it is set
+    
+    Args:
+        tickers (str or list): One symbol (flat columns) or several ((ticker, field) columns)
+        start (str): First day, YYYY-MM-DD
+        end (str): Day after the last day, YYYY-MM-DD
+        **kwargs: Passed on to yf.download
+    """
+    if not YAHOO_CHART_BASE_URL:
+        return yf.download(tickers, start=start, end=end, **kwargs)
+    if isinstance(tickers, str):
+        return _download_chart(tickers, start, end)
+    
+    frames = {}
+    for ticker in tickers:
+        try:
+            frame = _download_chart(ticker, start, end)
+        except Exception as e:
+            # yfinance leaves failed symbols out of a batch as well
+            logger.warning(f"API batch: chart request for {ticker} failed: {str(e)}")
+            continue
+        if not frame.empty:
+            frames[ticker] = frame
+    return pd.concat(frames, axis=1) if frames else pd.DataFrame()
+
+def _empty_download_error(ticker):
+    """
+    Explain an empty single-ticker download, or return None if the range really has no bars
+
+    yf.download catches per-ticker failures (rate limits, network errors,
+    HTTP errors) and returns an empty frame, recording the error in
+    yf.shared._ERRORS. Only an empty answer that yfinance attributes to
+    missing price data is trusted; without such a record (or with a
+    yfinance that doesn't keep one) the empty frame counts as a failure.
+    The chart API raises on failed requests, so its empty answers are real.
+    """
+    if YAHOO_CHART_BASE_URL:
+        return None
+    errors = getattr(getattr(yf, 'shared', None), '_ERRORS', None) or {}
+    error = errors.get(ticker)
+    if error is None:
+        return "empty download without an error record"
+    if any(message in str(error).lower() for message in NO_DATA_ERRORS):
+        return None
+    return str(error)
+
 def get_stock_data_from_api(ticker, start_date, end_date):
     """
     Get stock data from yfinance API as a fallback method
@@ -21,7 +118,8 @@ def get_stock_data_from_api(ticker, start_date, end_date):
         end_date (str): End date in YYYY-MM-DD format
         
     Returns:
-        DataFrame: Historical stock data or None if error
+        DataFrame: Historical stock data (empty if the range has no bars) or None if error,
+            including empty downloads yfinance reports as failed
     """
     try:
         logger.info(f"Fetching data for {ticker} from yfinance API")
@@ -57,9 +155,9 @@ def get_stock_data_from_api(ticker, start_date, end_date):
                 
             # Make sure date range is not too long (limit to 2 years)
             date_diff = (end_dt - start_dt).days
-            if date_diff > 730:  # ~2 years
+            if date_diff > MAX_RANGE_DAYS:  # ~2 years
                 logger.warning(f"API: Date range too long ({date_diff} days), limiting to 2 years")
-                start_dt = end_dt - datetime.timedelta(days=730)
+                start_dt = end_dt - datetime.timedelta(days=MAX_RANGE_DAYS)
                 start_date = start_dt.strftime('%Y-%m-%d')
                 
             logger.info(f"API: Using date range: {start_date} to {end_date}")
@@ -81,38 +179,39 @@ def get_stock_data_from_api(ticker, start_date, end_date):
             try:
                 # Get data from yfinance with progress False to avoid stdout noise
                 logger.info(f"API attempt {attempt+1}: Downloading {ticker} from {start_date} to {end_date}")
-                data = yf.download(ticker, start=start_date, end=end_date, progress=False)
+                # yfinance treats end as exclusive, add a day so the range is inclusive like the scraper
+                with host_limiter.slot(YFINANCE_HOST), phase("http"):
+                    data = _download(ticker, start_date, _inclusive_end(end_date), progress=False)
                 
-                if not data.empty:
-                    break
-                    
-                logger.warning(f"API attempt {attempt+1}/{max_retries}: Empty data for {ticker}, retrying...")
-                
-                if attempt < max_retries - 1:
-                    import time
-                    time.sleep(retry_delay)
-                    retry_delay *= 2  # Exponential backoff
+                error = _empty_download_error(ticker) if data.empty else None
+                if error is not None:
+                    data = None
+                    raise RuntimeError(f"yfinance returned no data: {error}")
+                # An empty answer is valid (e.g. a range before the listing date), retrying won't change it
+                HTTP_ATTEMPTS.inc(source="api", status="empty" if data.empty else "ok")
+                break
             except Exception as e:
                 last_error = e
+                HTTP_ATTEMPTS.inc(source="api", status="error")
                 logger.warning(f"API error on attempt {attempt+1}/{max_retries}: {str(e)}")
                 if attempt < max_retries - 1:
-                    import time
+                    RETRIES.inc(source="api")
                     time.sleep(retry_delay)
                     retry_delay *= 2
         
         # Check if all attempts failed
-        if data is None or data.empty:
-            if last_error:
-                logger.error(f"All API requests failed for {ticker}. Last error: {str(last_error)}")
-            else:
-                logger.error(f"No data returned from yfinance for {ticker}")
+        if data is None:
+            logger.error(f"All API requests failed for {ticker}. Last error: {str(last_error)}")
             return None
+        if data.empty:
+            logger.warning(f"No data returned from yfinance for {ticker} from {start_date} to {end_date}")
+            return pd.DataFrame(columns=HISTORY_COLUMNS)
             
         # Reset index to make Date a column
         data = data.reset_index()
         
         # Make column names match our expected format
-        data.columns = ["Date", "Open", "High", "Low", "Close", "Adj Close", "Volume"]
+        data.columns = HISTORY_COLUMNS
         
         # Add debug info about the data we got
         logger.info(f"Successfully retrieved {len(data)} records for {ticker} from {data['Date'].min()} to {data['Date'].max()}")
@@ -123,4 +222,66 @@ def get_stock_data_from_api(ticker, start_date, end_date):
         import traceback
         logger.error(f"Error fetching data from yfinance: {str(e)}")
         logger.error(traceback.format_exc())
-        return None
\ No newline at end of file
+        return None
+
+
+def get_batch_stock_data_from_api(tickers, start_date, end_date):
+    """
+    Get stock data for several tickers with a single multi-symbol yfinance download
+    
+    Args:
+        tickers (list): Stock ticker symbols
+        start_date (str): Start date in YYYY-MM-DD format
+        end_date (str): End date in YYYY-MM-DD format (inclusive)
+        
+    Returns:
+        dict: Ticker -> DataFrame in our column format, tickers without data are left out
+    """
+    tickers = [ticker.strip().upper() for ticker in tickers if ticker and ticker.strip()]
+    if not tickers:
+        return {}
+    
+    max_retries = 3
+    retry_delay = 2  # seconds
+    data = None
+    
+    for attempt in range(max_retries):
+        try:
+            logger.info(f"API batch attempt {attempt+1}: Downloading {len(tickers)} tickers from {start_date} to {end_date}")
+            # group_by='ticker' gives (ticker, field) columns even for a single symbol
+            with host_limiter.slot(YFINANCE_HOST):
+                data = _download(tickers, start_date, _inclusive_end(end_date),
+                                 group_by='ticker', auto_adjust=False, threads=True, progress=False)
+            if data is not None and not data.empty:
+                break
+            logger.warning(f"API batch attempt {attempt+1}/{max_retries}: Empty data, retrying...")
+        except Exception as e:
+            logger.warning(f"API batch error on attempt {attempt+1}/{max_retries}: {str(e)}")
+        
+        if attempt < max_retries - 1:
+            time.sleep(retry_delay)
+            retry_delay *= 2  # Exponential backoff
+    
+    if data is None or data.empty:
+        logger.error(f"No batch data returned from yfinance for {', '.join(tickers)}")
+        return {}
+    
+    # Split the wide frame into one frame per ticker
+    frames = {}
+    available = set(data.columns.get_level_values(0))
+    for ticker in tickers:
+        if ticker not in available:
+            logger.warning(f"API batch: no columns returned for {ticker}")
+            continue
+        
+        frame = data[ticker].dropna(how='all')
+        if frame.empty:
+            logger.warning(f"API batch: empty data for {ticker}")
+            continue
+        
+        frame = frame.reset_index()
+        frame = frame.rename(columns={frame.columns[0]: "Date"})
+        frames[ticker] = frame[["Date", "Open", "High", "Low", "Close", "Adj Close", "Volume"]]
+    
+    logger.info(f"API batch: retrieved data for {len(frames)}/{len(tickers)} tickers")
+    return frames
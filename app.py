@@ -1,6 +1,8 @@
 import os
 import logging
-import uuid
+import re
+import time
+from concurrent.futures import wait, FIRST_COMPLETED
 from datetime import datetime, timedelta
 from functools import wraps
 from urllib.parse import quote
@@ -10,7 +12,24 @@ from flask_caching import Cache
 import pandas as pd
 import io
 
-from yahoo_scraper import scrape_yahoo_finance_history, get_period_timestamps
+from yahoo_scraper import scrape_yahoo_finance_history, get_period_timestamps, history_url
+from cache_backends import resolve_cache_type, is_shared_cache
+from bar_store import BarStore, clamp_range, _to_date
+from fetch_engine import engine, FetchEngine
+from http_pool import session_stats
+from downsample import downsample_frame
+from singleflight import SingleFlight
+from circuit_breaker import breakers
+from jobs import JobQueue
+from datasets import DatasetStore
+import request_timing
+from request_timing import phase
+from metrics import (registry as metrics_registry, FETCH_SECONDS, FETCHES, FETCH_ROWS,
+                     HISTORY_SECONDS, RESULT_ROWS, EXPORT_SECONDS)
+from warm_cache import CacheWarmer
+from exporters import (EXCEL_EXPORT_MODE, EXPORT_FORMATS, ARROW_FORMATS, PYARROW_AVAILABLE,
+                       build_excel_in_memory, write_excel_streaming, iter_file_chunks,
+                       iter_csv, write_parquet, write_arrow_ipc)
 import traceback
 
 # Import the alternative API module
@@ -19,7 +38,7 @@ try:
     import yfinance
     
     # Then try to import our API function
-    from alternative_api import get_stock_data_from_api
+    from alternative_api import get_stock_data_from_api, get_batch_stock_data_from_api
     ALTERNATIVE_API_AVAILABLE = True
     logging.info("yfinance API support is available and will be used as a fallback")
 except ImportError as e:
@@ -31,6 +50,10 @@ except ImportError as e:
     def get_stock_data_from_api(ticker, start_date, end_date):
         logging.error("yfinance not installed - cannot use API fallback")
         return None
+    
+    def get_batch_stock_data_from_api(tickers, start_date, end_date):
+        logging.error("yfinance not installed - cannot use batch API")
+        return {}
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -40,6 +63,9 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key")
 
+# Server-Timing header, timing log line and opt-in profiler for /scrape, /download and /results
+request_timing.init_app(app)
+
 # Configure for Render.com
 if os.environ.get("RENDER") == 'true' or os.environ.get("RENDER_SERVICE_ID"):
     logger.info("Running on Render.com platform")
@@ -64,14 +90,198 @@ else:
     else:
         logger.info("Using web scraping as primary data source in development")
 
-# Configure cache
+# Configure cache - the SQLite backend is shared by all gunicorn workers and survives restarts,
+# set CACHE_TYPE=SimpleCache to go back to a private in-memory cache per worker
 cache_config = {
     "DEBUG": True,
-    "CACHE_TYPE": "SimpleCache",
-    "CACHE_DEFAULT_TIMEOUT": 1800  # 30 minutes
+    "CACHE_TYPE": resolve_cache_type(os.environ.get("CACHE_TYPE", "SQLiteCache")),
+    "CACHE_DEFAULT_TIMEOUT": int(os.environ.get("CACHE_DEFAULT_TIMEOUT", 1800)),  # 30 minutes
+    "CACHE_SQLITE_PATH": os.environ.get("CACHE_SQLITE_PATH")
 }
 app.config.from_mapping(cache_config)
 cache = Cache(app)
+bar_store = BarStore(cache)
+single_flight = SingleFlight(cache)
+job_queue = JobQueue(cache)
+dataset_store = DatasetStore(cache)
+
+# Async mode: /scrape returns a job id at once instead of fetching inside the request
+ASYNC_FETCH = os.environ.get('ASYNC_FETCH') == 'true'
+if ASYNC_FETCH and not is_shared_cache(cache_config["CACHE_TYPE"]):
+    # Job records live in the cache, a poll landing on another worker would never find them
+    logger.warning(f"ASYNC_FETCH needs a cache shared by all workers (SQLiteCache), "
+                   f"not {cache_config['CACHE_TYPE']}; fetching inside the request instead")
+    ASYNC_FETCH = False
+
+# Hedged mode: start the fallback source if the primary hasn't answered within the budget
+HEDGED_FETCH = os.environ.get('HEDGED_FETCH') == 'true'
+HEDGE_DELAY_SECONDS = float(os.environ.get('HEDGE_DELAY_SECONDS', 2.0))
+
+# Separate pool for racing sources so hedged fetches made from fetch engine workers can't starve it
+hedge_engine = FetchEngine(max_workers=int(os.environ.get('HEDGE_MAX_WORKERS', 8)))
+
+# Largest watchlist accepted by the batch endpoint
+MAX_BATCH_TICKERS = int(os.environ.get('MAX_BATCH_TICKERS', 100))
+
+def source_order():
+    """Data sources in the order they should be tried"""
+    # When on Render.com, prioritize the API approach since it's more reliable
+    if PREFER_API_OVER_SCRAPING and ALTERNATIVE_API_AVAILABLE:
+        return ["api", "scrape"]
+    # When not on Render.com (local development), we can try scraping first
+    return ["scrape", "api"] if ALTERNATIVE_API_AVAILABLE else ["scrape"]
+
+def fetch_from_source(source, ticker, start_date, end_date):
+    """
+    Fetch history from a single data source ("api" or "scrape"), skipped while its circuit is open
+    
+    Returns:
+        tuple: (DataFrame, events DataFrame or None), or None if the source failed or was skipped
+    """
+    return breakers[source].call(_fetch_from_source, source, ticker, start_date, end_date)
+
+def _fetch_from_source(source, ticker, start_date, end_date):
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        result = _fetch_upstream(source, ticker, start_date, end_date)
+        df = result[0] if result is not None else None
+        outcome = "error" if df is None else "empty" if df.empty else "ok"
+        if outcome == "ok":
+            FETCH_ROWS.inc(len(df), source=source)
+        return result
+    finally:
+        FETCH_SECONDS.observe(time.perf_counter() - start, source=source)
+        FETCHES.inc(source=source, outcome=outcome)
+
+def _fetch_upstream(source, ticker, start_date, end_date):
+    if source == "api":
+        logger.info(f"Using yfinance API for {ticker} (start: {start_date}, end: {end_date})")
+        df = get_stock_data_from_api(ticker, start_date, end_date)
+        return (df, None) if df is not None else None
+    
+    logger.debug(f"Scraping data for {ticker}")
+    # Convert dates to timestamps for Yahoo Finance URL
+    with phase("timestamps"):
+        period1, period2 = get_period_timestamps(start_date, end_date)
+    # Dividends and splits only come with the scraped page, the bar store keeps them next to the bars
+    df, events = scrape_yahoo_finance_history(history_url(ticker, period1, period2))
+    return (df, events) if df is not None else None
+
+def fetch_hedged(sources, ticker, start_date, end_date):
+    """
+    Race the data sources: the secondary starts once the primary has used up
+    its latency budget (or failed), and the first non-empty result wins
+    
+    Returns:
+        tuple: (DataFrame or None, source name, events DataFrame or None)
+    """
+    futures = {hedge_engine.submit(fetch_from_source, sources[0], ticker, start_date, end_date): sources[0]}
+    pending = set(futures)
+    empty = None
+    hedged = len(sources) < 2
+    deadline = time.monotonic() + HEDGE_DELAY_SECONDS
+    
+    while pending:
+        timeout = None if hedged else max(0.0, deadline - time.monotonic())
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        
+        for future in done:
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.warning(f"Hedged fetch from {futures[future]} failed: {str(e)}")
+                continue
+            if result is None:
+                continue
+            df, events = result
+            if df.empty:
+                empty = (df, futures[future], events)
+                continue
+            # The slower source can't be interrupted mid-request, its result is just ignored
+            for loser in pending:
+                loser.cancel()
+            logger.info(f"Hedged fetch for {ticker}: {futures[future]} answered first")
+            return df, futures[future], events
+        
+        if not hedged and (not pending or time.monotonic() >= deadline):
+            logger.info(f"Hedged fetch for {ticker}: {sources[0]} too slow or failed, starting {sources[1]}")
+            future = hedge_engine.submit(fetch_from_source, sources[1], ticker, start_date, end_date)
+            futures[future] = sources[1]
+            pending.add(future)
+            hedged = True
+    
+    return empty or (None, sources[-1], None)
+
+def fetch_history(ticker, start_date, end_date):
+    """
+    Fetch history from the preferred data source, falling back to the other one
+    
+    Args:
+        ticker (str): Stock ticker symbol
+        start_date (str): Start date in YYYY-MM-DD format
+        end_date (str): End date in YYYY-MM-DD format
+        
+    Returns:
+        tuple: (DataFrame, empty if the range has no bars, or None if every source failed;
+                source name; dividend/split events DataFrame or None)
+    """
+    sources = source_order()
+    if HEDGED_FETCH:
+        return fetch_hedged(sources, ticker, start_date, end_date)
+    
+    empty = None
+    for source in sources:
+        if source != sources[0]:
+            logger.info(f"{sources[0]} failed, trying {source} for {ticker} as fallback")
+        result = fetch_from_source(source, ticker, start_date, end_date)
+        if result is None:
+            continue
+        df, events = result
+        if not df.empty:
+            return df, source, events
+        empty = (df, source, events)
+    # An empty frame tells the bar store the range has no bars, None that every source failed
+    return empty or (None, sources[-1], None)
+
+def get_history(ticker, start_date, end_date):
+    """
+    Get bars from the bar store, coalescing concurrent identical misses into one fetch
+    
+    Returns:
+        tuple: (DataFrame or None, source)
+    """
+    start = time.perf_counter()
+    if bar_store.is_covered(ticker, start_date, end_date):
+        df, source = bar_store.get_bars(ticker, start_date, end_date, fetch_history)
+    else:
+        df, source = single_flight.do(f"{ticker}_{start_date}_{end_date}",
+                                      bar_store.get_bars, ticker, start_date, end_date, fetch_history)
+    
+    HISTORY_SECONDS.observe(time.perf_counter() - start, path="cache" if source == "cache" else "upstream")
+    if df is not None:
+        RESULT_ROWS.observe(len(df))
+    return df, source
+
+def warm_ticker(ticker, start_date, end_date, refresh_from):
+    """
+    Keep one watchlist ticker warm: re-fetch its most recent days, then fill any gaps
+    
+    Re-fetching the tail picks up new bars and restarts the live tail's TTL, so
+    it is skipped while the cached tail is still fresh.
+    
+    Returns:
+        DataFrame or None: The cached bars for the range
+    """
+    if bar_store.is_covered(ticker, refresh_from, end_date, fresh=True):
+        logger.debug(f"Cache warming: tail of {ticker} is still fresh, not re-fetching it")
+    else:
+        single_flight.do(f"{ticker}_{refresh_from}_{end_date}_refresh",
+                         bar_store.get_bars, ticker, refresh_from, end_date, fetch_history, True)
+    df, _ = get_history(ticker, start_date, end_date)
+    return df
+
+cache_warmer = CacheWarmer(cache, warm_ticker)
 
 @app.route('/')
 def index():
@@ -128,73 +338,26 @@ def scrape():
             start_date = start_dt.strftime('%Y-%m-%d')
             end_date = end_dt.strftime('%Y-%m-%d')
         
-        # Check cache first
-        cache_key = f"{ticker}_{start_date}_{end_date}"
-        cached_data = cache.get(cache_key)
-        
-        if cached_data is not None:
-            logger.debug(f"Using cached data for {ticker}")
-            df = cached_data
-            source = "cache"
-        else:
-            # When on Render.com, prioritize the API approach since it's more reliable
-            if PREFER_API_OVER_SCRAPING and ALTERNATIVE_API_AVAILABLE:
-                logger.info(f"Using yfinance API for {ticker} (start: {start_date}, end: {end_date})")
-                df = get_stock_data_from_api(ticker, start_date, end_date)
-                source = "api"
-                
-                # Only try scraping as a last resort if API fails
-                if df is None or df.empty:
-                    logger.debug(f"API failed, trying web scraping for {ticker} as fallback")
-                    # Convert dates to timestamps for Yahoo Finance URL
-                    period1, period2 = get_period_timestamps(start_date, end_date)
-                    url = f"https://finance.yahoo.com/quote/{ticker}/history/?period1={period1}&period2={period2}"
-                    df = scrape_yahoo_finance_history(url)
-                    source = "scrape"
-            else:
-                # When not on Render.com (local development), we can try scraping first
-                logger.debug(f"Scraping data for {ticker}")
-                # Convert dates to timestamps for Yahoo Finance URL
-                period1, period2 = get_period_timestamps(start_date, end_date)
-                url = f"https://finance.yahoo.com/quote/{ticker}/history/?period1={period1}&period2={period2}"
-                df = scrape_yahoo_finance_history(url)
-                source = "scrape"
-                
-                # If scraping fails, try alternative API if available
-                if (df is None or df.empty) and ALTERNATIVE_API_AVAILABLE:
-                    logger.info(f"Scraping failed, trying yfinance API for {ticker}")
-                    df = get_stock_data_from_api(ticker, start_date, end_date)
-                    source = "api"
-            
-            # If all methods fail, show error with more helpful message
-            if df is None or df.empty:
-                logger.error(f"Could not retrieve data for {ticker} using any method")
-                flash(f"No data found for {ticker} in the selected date range. Please verify the ticker symbol is correct (e.g., MSFT for Microsoft).", "warning")
-                return redirect(url_for('index'))
-            
-            # Cache the result
-            cache.set(cache_key, df)
-        
-        # Generate a unique ID for this dataset and store in cache
-        download_id = str(uuid.uuid4())
-        download_cache_key = f"download_{download_id}"
-        cache.set(download_cache_key, df, timeout=1800)  # 30 minutes timeout
+        # Async mode: hand cache misses to a background job and let the page poll for it
+        if (ASYNC_FETCH or request.form.get('async') == '1') and not bar_store.is_covered(ticker, start_date, end_date):
+            job_id = job_queue.submit(run_fetch_job, ticker, start_date, end_date,
+                                      description=f"{ticker} {start_date} to {end_date}")
+            return render_template('pending.html', job_id=job_id, ticker=ticker,
+                                   start_date=start_date, end_date=end_date)
         
-        # Store minimal info in session
-        session['download_id'] = download_id
-        session['ticker'] = ticker
+        # Serve from the per-ticker bar store, fetching only the date ranges it doesn't cover yet;
+        # concurrent requests for the same missing range share a single fetch
+        df, source = get_history(ticker, start_date, end_date)
         
-        # Format data for display
-        data_for_template = {
-            'ticker': ticker,
-            'data': df.to_dict('records'),
-            'start_date': start_date,
-            'end_date': end_date,
-            'source': source,
-            'download_id': download_id
-        }
+        # If all methods fail, show error with more helpful message
+        if df is None or df.empty:
+            logger.error(f"Could not retrieve data for {ticker} using any method")
+            flash(no_data_message(ticker), "warning")
+            return redirect(url_for('index'))
         
-        return render_template('results.html', **data_for_template)
+        meta = {'ticker': ticker, 'start_date': start_date, 'end_date': end_date, 'source': source}
+        download_id = publish_download(df, meta)
+        return render_results(download_id, df, meta)
     
     except Exception as e:
         error_msg = f"Error scraping data: {str(e)}"
@@ -203,18 +366,212 @@ def scrape():
         flash(error_msg, "danger")
         return redirect(url_for('index'))
 
+def no_data_message(ticker):
+    return f"No data found for {ticker} in the selected date range. Please verify the ticker symbol is correct (e.g., MSFT for Microsoft)."
+
+def publish_download(df, meta):
+    """
+    Publish a result under a new download id for the results page, its JSON endpoints and /download
+    
+    Identical results share one cached dataset; the download id is only a small handle to it.
+    
+    Args:
+        df (DataFrame): Historical stock data
+        meta (dict): ticker, start_date, end_date and source of the data
+        
+    Returns:
+        str: The download id
+    """
+    with phase("cache"):
+        return dataset_store.publish(df, meta)
+
+def load_download(download_id):
+    """Return the cached frame behind a download id, or None if it expired"""
+    with phase("cache"):
+        df, _ = dataset_store.load(download_id)
+    return df
+
+def event_records(events):
+    """Dividend and split events as display rows, newest first"""
+    records = []
+    for date, dividend, split in zip(events["Date"], events["Dividends"], events["Stock Splits"]):
+        if dividend:
+            records.append({'date': date.strftime('%Y-%m-%d'), 'type': 'Dividend', 'value': f"{dividend:g}"})
+        if split:
+            records.append({'date': date.strftime('%Y-%m-%d'), 'type': 'Stock split', 'value': f"{split:g}:1"})
+    return records
+
+def render_results(download_id, df, meta):
+    """Render the results page for a published download"""
+    # Store minimal info in session
+    session['download_id'] = download_id
+    session['ticker'] = meta['ticker']
+    
+    # Format data for display; table rows and chart points are served by the JSON endpoints
+    data_for_template = {
+        'ticker': meta['ticker'],
+        'record_count': len(df),
+        'stats': summarize(df),
+        'start_date': meta['start_date'],
+        'end_date': meta['end_date'],
+        'source': meta['source'],
+        'download_id': download_id,
+        'events': event_records(bar_store.get_events(meta['ticker'], meta['start_date'], meta['end_date']))
+    }
+    
+    with phase("render"):
+        return render_template('results.html', **data_for_template)
+
+def run_fetch_job(ticker, start_date, end_date):
+    """Background job body: fetch the range and publish it as a download"""
+    df, source = get_history(ticker, start_date, end_date)
+    if df is None or df.empty:
+        raise LookupError(no_data_message(ticker))
+    meta = {'ticker': ticker, 'start_date': start_date, 'end_date': end_date, 'source': source}
+    return {'download_id': publish_download(df, meta), 'rows': len(df), 'source': source}
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Poll a background fetch job"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'status': 'unknown', 'error': 'Job not found or expired. Please search again.'}), 404
+    
+    response = dict(job)
+    if job['status'] == 'done':
+        response['results_url'] = url_for('results', download_id=job['result']['download_id'])
+    return jsonify(response)
+
+@app.route('/results/<download_id>')
+def results(download_id):
+    """Show the results page for data fetched by a background job"""
+    with phase("cache"):
+        df, meta = dataset_store.load(download_id)
+    if df is None:
+        flash("Data has expired. Please search again.", "warning")
+        return redirect(url_for('index'))
+    return render_results(download_id, df, meta)
+
+def summarize(df):
+    """Quick stats for the results page header (df is sorted newest first)"""
+    latest = df.iloc[0]
+    oldest = df.iloc[-1]
+    change = float(latest["Close"]) - float(oldest["Close"])
+    oldest_close = float(oldest["Close"])
+    return {
+        'latest_close': float(latest["Close"]),
+        'latest_date': latest["Date"].strftime('%Y-%m-%d'),
+        'oldest_date': oldest["Date"].strftime('%Y-%m-%d'),
+        'period_high': float(df["High"].max()),
+        'change': change,
+        'change_percent': change / oldest_close * 100 if oldest_close != 0 else 0,
+        'avg_volume': float(df["Volume"].mean())
+    }
+
+def fetch_batch(tickers, start_date, end_date):
+    """
+    Get history for several tickers, downloading all uncached ones in one yfinance call
+    
+    Args:
+        tickers (list): Stock ticker symbols
+        start_date (str or date): Start date (YYYY-MM-DD string or date)
+        end_date (str or date): End date (YYYY-MM-DD string or date)
+        
+    Returns:
+        dict: Ticker -> (DataFrame or None, source)
+    """
+    start, end = clamp_range(start_date, end_date)
+    pending = [ticker for ticker in tickers if not bar_store.is_covered(ticker, start, end)]
+    sources = {}
+    
+    if pending and ALTERNATIVE_API_AVAILABLE:
+        logger.info(f"Batch: downloading {len(pending)} of {len(tickers)} tickers in one API call")
+        frames = get_batch_stock_data_from_api(pending, start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'))
+        for ticker, frame in frames.items():
+            # A frame starting late may be truncated, it is covered only from its first bar
+            bar_store.store_window(ticker, frame, start, end)
+            sources[ticker] = "api"
+    
+    # Anything the batch call didn't return goes through the regular per-ticker path, in parallel
+    results = {}
+    jobs = [(ticker, start, end, fetch_history) for ticker in tickers]
+    for (ticker, _, _, _), result in engine.imap_unordered(bar_store.get_bars, jobs):
+        df, source = result if result is not None else (None, "unavailable")
+        results[ticker] = (df, sources.get(ticker, source))
+    return {ticker: results[ticker] for ticker in tickers}
+
+def frame_to_records(df):
+    """Convert a bar frame to JSON-friendly records with ISO dates"""
+    df = df.assign(Date=df["Date"].dt.strftime('%Y-%m-%d'))
+    return df.astype(object).where(pd.notna(df), None).to_dict('records')
+
+@app.route('/api/batch', methods=['POST'])
+def batch():
+    """Return history for a list of tickers (JSON body or form field)"""
+    payload = request.get_json(silent=True)
+    if payload is None:
+        payload = request.form
+    elif not isinstance(payload, dict):
+        return jsonify({'error': 'Expected a JSON object with a tickers field'}), 400
+    tickers = payload.get('tickers', [])
+    if isinstance(tickers, str):
+        tickers = re.split(r'[\s,;]+', tickers)
+    if not isinstance(tickers, list) or not all(isinstance(t, str) for t in tickers):
+        return jsonify({'error': 'tickers must be a list of strings or a comma separated string'}), 400
+    for field in ('start_date', 'end_date'):
+        value = payload.get(field) or ''
+        if not isinstance(value, str):
+            return jsonify({'error': f'{field} must be a YYYY-MM-DD string'}), 400
+        try:
+            if value:
+                _to_date(value)
+        except ValueError:
+            return jsonify({'error': f'Invalid {field}: {value!r}, expected YYYY-MM-DD'}), 400
+    
+    # Normalize and de-duplicate while keeping the caller's order
+    tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t and t.strip()))
+    if not tickers:
+        return jsonify({'error': 'No tickers given'}), 400
+    if len(tickers) > MAX_BATCH_TICKERS:
+        return jsonify({'error': f'At most {MAX_BATCH_TICKERS} tickers per request'}), 400
+    
+    # Missing dates default to the last 30 days; the range is ordered and capped like every other request
+    start, end = clamp_range(payload.get('start_date'), payload.get('end_date'))
+    
+    try:
+        results = fetch_batch(tickers, start, end)
+    except Exception as e:
+        logger.error(f"Error in batch request: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({'error': str(e)}), 500
+    
+    response = {}
+    for ticker, (df, source) in results.items():
+        if df is None or df.empty:
+            response[ticker] = {'source': source, 'rows': 0, 'data': []}
+        else:
+            response[ticker] = {'source': source, 'rows': len(df), 'data': frame_to_records(df)}
+    
+    return jsonify({'start_date': start.isoformat(), 'end_date': end.isoformat(), 'results': response})
+
 @app.route('/download')
 def download():
-    """Download the last scraped data as Excel"""
+    """Download the last scraped data as Excel, CSV, Parquet or Arrow (?format=)"""
     if 'download_id' not in session or 'ticker' not in session:
         flash("No data available for download", "warning")
         return redirect(url_for('index'))
     
+    export_format = request.args.get('format', 'xlsx').lower()
+    if export_format not in EXPORT_FORMATS:
+        flash(f"Unsupported download format: {export_format}", "warning")
+        return redirect(url_for('index'))
+    if export_format in ARROW_FORMATS and not PYARROW_AVAILABLE:
+        flash(f"{export_format.title()} downloads need pyarrow (pip install pyarrow)", "warning")
+        return redirect(url_for('index'))
+    
     try:
         # Retrieve the data from the cache
-        download_id = session['download_id']
-        download_cache_key = f"download_{download_id}"
-        df = cache.get(download_cache_key)
+        df = load_download(session['download_id'])
         
         if df is None:
             flash("Data has expired. Please search again.", "warning")
@@ -222,44 +579,155 @@ def download():
             
         ticker = session['ticker']
         
-        # Create Excel file in memory
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            df.to_excel(writer, sheet_name=f"{ticker} History", index=False)
-            
-            # Configure workbook
-            workbook = writer.book
-            worksheet = writer.sheets[f"{ticker} History"]
-            
-            # Format for dates
-            date_format = workbook.add_format({'num_format': 'yyyy-mm-dd'})
-            worksheet.set_column('A:A', 12, date_format)
-            
-            # Format for numbers
-            number_format = workbook.add_format({'num_format': '0.00'})
-            worksheet.set_column('B:F', 12, number_format)
-            
-            # Format for volume
-            volume_format = workbook.add_format({'num_format': '#,##0'})
-            worksheet.set_column('G:G', 15, volume_format)
-        
-        # Set file for download
-        output.seek(0)
         today = datetime.now().strftime("%Y-%m-%d")
-        filename = f"{ticker}_historical_data_{today}.xlsx"
+        extension, mimetype = EXPORT_FORMATS[export_format]
+        filename = f"{ticker}_historical_data_{today}.{extension}"
+        disposition = {"Content-Disposition": f"attachment;filename={filename}"}
+        
+        if export_format == 'csv':
+            # Rows are formatted and sent chunk by chunk
+            return Response(iter_csv(df), mimetype=mimetype, headers=disposition)
+        
+        if export_format == 'xlsx' and EXCEL_EXPORT_MODE == 'memory':
+            # Original path: whole workbook built in memory
+            with EXPORT_SECONDS.time(format=export_format), phase("export"):
+                workbook = build_excel_in_memory(df, ticker)
+            return Response(workbook, mimetype=mimetype, headers=disposition)
+        
+        with EXPORT_SECONDS.time(format=export_format), phase("export"):
+            if export_format == 'parquet':
+                output = write_parquet(df)
+            elif export_format == 'arrow':
+                output = write_arrow_ipc(df)
+            else:
+                # Constant-memory workbook in a spooled temp file
+                output = write_excel_streaming(df, ticker)
         
+        # Stream the spooled file in chunks
+        size = output.seek(0, io.SEEK_END)
+        output.seek(0)
         return Response(
-            output.read(),
-            mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={"Content-Disposition": f"attachment;filename={filename}"}
+            iter_file_chunks(output),
+            mimetype=mimetype,
+            headers={**disposition, "Content-Length": str(size)},
+            direct_passthrough=True
         )
     except Exception as e:
-        error_msg = f"Error generating Excel file: {str(e)}"
+        error_msg = f"Error generating {export_format} file: {str(e)}"
         logger.error(error_msg)
         logger.error(traceback.format_exc())
         flash(error_msg, "danger")
         return redirect(url_for('index'))
 
+# Column order of the results table
+TABLE_COLUMNS = ["Date", "Open", "High", "Low", "Close", "Adj Close", "Volume"]
+
+# Largest page the table endpoint returns
+MAX_TABLE_PAGE = 1000
+
+def format_table(df):
+    """Format rows as the text the results table displays"""
+    formatted = pd.DataFrame({"Date": df["Date"].dt.strftime('%Y-%m-%d')}, index=df.index)
+    for column in TABLE_COLUMNS[1:-1]:
+        formatted[column] = df[column].map(lambda v: 'N/A' if pd.isna(v) else f"${v:.2f}")
+    formatted["Volume"] = df["Volume"].map(lambda v: 'N/A' if pd.isna(v) else f"{v:,.0f}")
+    return formatted
+
+@app.route('/api/data/<download_id>')
+def table_data(download_id):
+    """Serve sorted, filtered pages of a cached dataset (DataTables server-side protocol)"""
+    df = load_download(download_id)
+    if df is None:
+        return jsonify({'error': 'Data has expired. Please search again.'}), 404
+    
+    draw = request.args.get('draw', 0, type=int)
+    start = max(request.args.get('start', 0, type=int), 0)
+    length = request.args.get('length', 50, type=int)
+    length = MAX_TABLE_PAGE if length < 0 else min(length, MAX_TABLE_PAGE)
+    search = request.args.get('search[value]', '').strip()
+    order_column = request.args.get('order[0][column]', 0, type=int)
+    ascending = request.args.get('order[0][dir]', 'desc') == 'asc'
+    
+    view = df
+    if search:
+        # Match against the displayed text of every column
+        formatted = format_table(view)
+        haystack = formatted[TABLE_COLUMNS[0]].str.cat(formatted[TABLE_COLUMNS[1:]], sep='|')
+        view = view.loc[haystack.str.contains(search, case=False, regex=False)]
+    
+    if 0 <= order_column < len(TABLE_COLUMNS):
+        view = view.sort_values(TABLE_COLUMNS[order_column], ascending=ascending, kind='stable')
+    
+    page = view.iloc[start:start + length]
+    return jsonify({
+        'draw': draw,
+        'recordsTotal': len(df),
+        'recordsFiltered': len(view),
+        'data': format_table(page).values.tolist()
+    })
+
+# Chart points returned when the client doesn't ask for a specific number
+DEFAULT_CHART_POINTS = 500
+MAX_CHART_POINTS = 5000
+
+@app.route('/api/chart/<download_id>')
+def chart_data(download_id):
+    """Serve the price chart as columnar arrays, LTTB-downsampled to ?points= (optionally within ?start=&end=)"""
+    df = load_download(download_id)
+    if df is None:
+        return jsonify({'error': 'Data has expired. Please search again.'}), 404
+    
+    points = request.args.get('points', DEFAULT_CHART_POINTS, type=int)
+    points = max(3, min(points, MAX_CHART_POINTS))
+    
+    view = df.sort_values("Date")
+    start = request.args.get('start')
+    end = request.args.get('end')
+    try:
+        if start:
+            view = view[view["Date"] >= pd.Timestamp(start)]
+        if end:
+            view = view[view["Date"] <= pd.Timestamp(end)]
+    except ValueError:
+        return jsonify({'error': 'Invalid start or end date'}), 400
+    
+    total = len(view)
+    if total > points:
+        # Keep the shape of the close series; high/low use the same rows so dates line up
+        view = downsample_frame(view, "Date", "Close", points)
+    
+    return jsonify({
+        'dates': view["Date"].dt.strftime('%Y-%m-%d').tolist(),
+        'close': view["Close"].round(4).tolist(),
+        'high': view["High"].round(4).tolist(),
+        'low': view["Low"].round(4).tolist(),
+        'total_points': total,
+        'downsampled': total > points
+    })
+
+@app.route('/health/sources')
+def source_health():
+    """Report circuit breaker state, success rate and latency of each data source"""
+    return jsonify({name: breaker.snapshot() for name, breaker in breakers.items()})
+
+@app.route('/cache/stats')
+def cache_stats():
+    """Report hit/miss statistics for the active cache backend"""
+    backend = cache.cache
+    if hasattr(backend, 'stats'):
+        return jsonify(backend.stats())
+    return jsonify({'backend': type(backend).__name__})
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus metrics summed over all gunicorn workers"""
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/http/stats')
+def http_stats():
+    """Report connection reuse for the scraper's pooled HTTP session"""
+    return jsonify(session_stats())
+
 @app.errorhandler(404)
 def page_not_found(e):
     return render_template('index.html', error="Page not found"), 404
@@ -0,0 +1,530 @@
+"""
+Incremental per-ticker store of daily OHLCV bars.
+
+Instead of caching each exact ticker/start/end request, the store keeps one
+merged frame of daily bars per ticker plus the list of date intervals it has
+already fetched. A new request only goes upstream for the sub-ranges that are
+not covered yet, so overlapping requests (the common case) are mostly served
+from the cache.
+
+Settled bars never change, so entries don't expire. Only the live tail (the
+days that were not settled when they were fetched) has a TTL, which depends
+on the market session, and windows that are covered only because they came
+back empty (before the listing date) are asked again after
+EMPTY_COVERAGE_TTL. A request that hits an expired tail is served the
+cached bars right away while the tail is refreshed in the background.
+"""
+
+import os
+import time
+import datetime
+import logging
+
+import pandas as pd
+
+from fetch_engine import engine as default_engine
+from market_hours import settled_through, tail_ttl
+from metrics import CACHE_REQUESTS
+from request_timing import phase
+from yahoo_scraper import MAX_RANGE_DAYS
+
+logger = logging.getLogger(__name__)
+
+# Size of the windows a long range is split into; both sources clamp single
+# requests to MAX_RANGE_DAYS, so windows can never be longer than that
+FETCH_WINDOW_DAYS = min(int(os.environ.get('FETCH_WINDOW_DAYS', 365)), MAX_RANGE_DAYS)
+
+# Oldest history served, counted back from today
+MAX_HISTORY_YEARS = int(os.environ.get('MAX_HISTORY_YEARS', 20))
+
+# A window whose first bar starts this many days after the window start is
+# treated as truncated (e.g. the rendered table's row limit), so only the part
+# that actually came back is marked as covered
+TRUNCATION_TOLERANCE_DAYS = 7
+
+# Seconds a window that came back empty before the ticker's first bar stays covered
+EMPTY_COVERAGE_TTL = int(os.environ.get('EMPTY_COVERAGE_TTL', 24 * 3600))
+
+# How long a dividend/split merge holds its cross-worker lock at most
+EVENTS_LOCK_TIMEOUT = 10
+
+# How long a background tail refresh holds its cross-worker lock at most
+REVALIDATE_LOCK_TIMEOUT = int(os.environ.get('REVALIDATE_LOCK_TIMEOUT', 60))
+
+# Range used when a request has no (valid) start date, like the form's default
+DEFAULT_RANGE_DAYS = 30
+
+BAR_COLUMNS = ["Date", "Open", "High", "Low", "Close", "Adj Close", "Volume"]
+
+
+def _to_date(value):
+    """Convert a YYYY-MM-DD string (or date/datetime) to a date"""
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def _parse_date(value):
+    """Like _to_date, but None for a missing or malformed date"""
+    if not value:
+        return None
+    try:
+        return _to_date(value)
+    except (TypeError, ValueError):
+        logger.warning(f"Invalid date {value!r}, using the default range")
+        return None
+
+
+def clamp_range(start_date, end_date):
+    """
+    Convert a requested range to (start, end) dates, ordered, not past today and within MAX_HISTORY_YEARS
+
+    A missing or malformed end date means today, a missing or malformed start
+    date DEFAULT_RANGE_DAYS before the end.
+    """
+    today = datetime.date.today()
+    end = min(_parse_date(end_date) or today, today)
+    start = _parse_date(start_date) or end - datetime.timedelta(days=DEFAULT_RANGE_DAYS)
+    if start > end:
+        start, end = end, start
+    oldest = today - datetime.timedelta(days=MAX_HISTORY_YEARS * 365)
+    if start < oldest:
+        logger.warning(f"Start date {start} is more than {MAX_HISTORY_YEARS} years back, using {oldest}")
+        start = min(oldest, end)
+    return start, end
+
+
+def merge_intervals(intervals):
+    """
+    Merge overlapping or adjacent date intervals
+
+    Args:
+        intervals (list): (start, end) date pairs, both ends inclusive
+
+    Returns:
+        list: Sorted, non-overlapping (start, end) pairs
+    """
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + datetime.timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def clip_intervals(intervals, before):
+    """Cut (start, end) date pairs off at the day before `before`"""
+    last = before - datetime.timedelta(days=1)
+    return [(start, min(end, last)) for start, end in intervals if start <= last]
+
+
+def missing_ranges(covered, start, end):
+    """
+    Find the parts of [start, end] that are not in the covered intervals
+
+    Args:
+        covered (list): Merged (start, end) date pairs already fetched
+        start (date): First requested day
+        end (date): Last requested day
+
+    Returns:
+        list: (start, end) date pairs that still need to be fetched
+    """
+    gaps = []
+    cursor = start
+    for covered_start, covered_end in covered:
+        if covered_end < cursor:
+            continue
+        if covered_start > end:
+            break
+        if covered_start > cursor:
+            gaps.append((cursor, covered_start - datetime.timedelta(days=1)))
+        cursor = max(cursor, covered_end + datetime.timedelta(days=1))
+        if cursor > end:
+            break
+    if cursor <= end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+def split_range(start, end, max_days=FETCH_WINDOW_DAYS):
+    """Split [start, end] into consecutive windows of at most max_days days"""
+    windows = []
+    window_start = start
+    while window_start <= end:
+        window_end = min(end, window_start + datetime.timedelta(days=max_days - 1))
+        windows.append((window_start, window_end))
+        window_start = window_end + datetime.timedelta(days=1)
+    return windows
+
+
+def has_trading_days(start, end):
+    """Return False when [start, end] only contains weekend days"""
+    days = (end - start).days + 1
+    if days >= 3:
+        return True
+    return any((start + datetime.timedelta(days=i)).weekday() < 5 for i in range(days))
+
+
+def plan_windows(covered, start, end, window_days=FETCH_WINDOW_DAYS):
+    """
+    Plan the upstream fetches needed to serve [start, end]
+
+    Uncovered gaps are split into windows of at most window_days days, which
+    can be fetched concurrently and stored one by one, so an interrupted long
+    fetch resumes from the windows that are still missing.
+
+    Args:
+        covered (list): Merged (start, end) date pairs already fetched
+        start (date): First requested day
+        end (date): Last requested day
+        window_days (int): Maximum window length
+
+    Returns:
+        tuple: (windows to fetch, weekend-only windows that need no fetch)
+    """
+    fetch_windows = []
+    empty_windows = []
+    for gap_start, gap_end in missing_ranges(covered, start, end):
+        for window in split_range(gap_start, gap_end, window_days):
+            if has_trading_days(*window):
+                fetch_windows.append(window)
+            else:
+                empty_windows.append(window)
+    return fetch_windows, empty_windows
+
+
+def normalize_bars(df):
+    """
+    Bring a frame from either data source to the store's layout
+
+    Dates become tz-naive midnight timestamps, rows are sorted oldest first
+    and duplicate dates are dropped.
+    """
+    df = df[BAR_COLUMNS].copy()
+    dates = pd.to_datetime(df["Date"], errors='coerce')
+    if getattr(dates.dt, 'tz', None) is not None:
+        dates = dates.dt.tz_localize(None)
+    df["Date"] = dates.dt.normalize()
+    df = df.dropna(subset=["Date"])
+    return df.drop_duplicates(subset="Date", keep="last").sort_values("Date").reset_index(drop=True)
+
+
+def merge_bars(existing, new):
+    """Combine two normalized bar frames, preferring rows from the newer one"""
+    if existing is None or existing.empty:
+        return new
+    if new is None or new.empty:
+        return existing
+    combined = pd.concat([existing, new], ignore_index=True)
+    return combined.drop_duplicates(subset="Date", keep="last").sort_values("Date").reset_index(drop=True)
+
+
+class BarStore:
+    """
+    Per-ticker daily bar store on top of the Flask-Caching backend
+
+    Args:
+        cache: Flask-Caching Cache instance used for storage
+        timeout (int): Seconds a ticker entry stays cached (0 never expires, the live tail has its own TTL)
+        engine (FetchEngine): Engine used to fetch missing windows concurrently
+    """
+
+    def __init__(self, cache, timeout=0, engine=None):
+        self.cache = cache
+        self.timeout = timeout
+        self.engine = engine or default_engine
+
+    @staticmethod
+    def _key(ticker):
+        return f"bars_{ticker}"
+
+    def load(self, ticker):
+        """
+        Return the stored entry for a ticker
+
+        The entry is {'bars': DataFrame, 'covered': [(start, end), ...],
+        'tail_from': first day that was not settled when fetched,
+        'tail_expires': epoch seconds when that tail goes stale,
+        'empty': [(start, end, expires), ...] windows covered because they came back empty}.
+        """
+        with phase("cache"):
+            entry = self.cache.get(self._key(ticker))
+        if entry is None:
+            return {'bars': None, 'covered': [], 'tail_from': None, 'tail_expires': 0, 'empty': []}
+        return entry
+
+    @staticmethod
+    def _empty_windows(entry):
+        """Empty-window coverage that hasn't expired yet"""
+        now = time.time()
+        return [window for window in entry.get('empty', []) if window[2] > now]
+
+    def coverage(self, entry):
+        """Covered intervals including the empty windows that are still valid"""
+        empty = self._empty_windows(entry)
+        if not empty:
+            return entry['covered']
+        return merge_intervals(entry['covered'] + [(start, end) for start, end, _ in empty])
+
+    @staticmethod
+    def _tail_from(entry):
+        # Entries written before tails were tracked treat every unsettled day as tail
+        return entry.get('tail_from') or settled_through() + datetime.timedelta(days=1)
+
+    def _clip_stale_tail(self, entry, intervals):
+        if time.time() < entry.get('tail_expires', 0):
+            return intervals
+        return clip_intervals(intervals, self._tail_from(entry))
+
+    def fresh_coverage(self, entry):
+        """Covered intervals without the live tail when it has gone stale"""
+        return self._clip_stale_tail(entry, self.coverage(entry))
+
+    def store(self, ticker, df, start, end, empty=False):
+        """
+        Merge freshly fetched bars for [start, end] into the ticker's entry
+
+        The entry is re-read right before writing so that concurrent updates
+        from other workers are kept. Storing a window that reaches into the
+        unsettled days restarts the live tail's TTL.
+
+        Args:
+            empty (bool): The window is covered only because it came back empty,
+                keep it for EMPTY_COVERAGE_TTL instead of for good
+        """
+        start, end = _to_date(start), _to_date(end)
+        entry = self.load(ticker)
+        bars = merge_bars(entry['bars'], normalize_bars(df) if df is not None and not df.empty else None)
+        covered = entry['covered']
+        empty_windows = self._empty_windows(entry)
+        tail_from, tail_expires = entry.get('tail_from'), entry.get('tail_expires', 0)
+
+        if empty:
+            empty_windows.append((start, end, time.time() + EMPTY_COVERAGE_TTL))
+        else:
+            live_from = settled_through() + datetime.timedelta(days=1)
+            if end >= live_from or (tail_from is not None and end >= tail_from):
+                # Stale tail days this window doesn't re-fetch must not pass as fresh
+                covered = self._clip_stale_tail(entry, covered)
+                tail_from, tail_expires = live_from, time.time() + tail_ttl()
+            covered = merge_intervals(covered + [(start, end)])
+
+        with phase("cache"):
+            self.cache.set(self._key(ticker), {'bars': bars, 'covered': covered,
+                                               'tail_from': tail_from, 'tail_expires': tail_expires,
+                                               'empty': empty_windows},
+                           timeout=self.timeout)
+        return bars
+
+    def store_window(self, ticker, df, start, end):
+        """
+        Store the bars fetched for one window, covering it only from its first bar when it looks truncated
+
+        Args:
+            df (DataFrame): Non-empty bars returned for [start, end]
+
+        Returns:
+            tuple: (the ticker's stored bars, first bar date if the window was truncated, else None)
+        """
+        start = _to_date(start)
+        first_bar = pd.to_datetime(df["Date"]).min().date()
+        if (first_bar - start).days <= TRUNCATION_TOLERANCE_DAYS:
+            return self.store(ticker, df, start, end), None
+        logger.warning(f"Bar store for {ticker}: window {start} to {end} "
+                       f"only returned bars from {first_bar}, keeping the rest uncovered")
+        return self.store(ticker, df, first_bar, end), first_bar
+
+    @staticmethod
+    def _events_key(ticker):
+        return f"events_{ticker}"
+
+    def store_events(self, ticker, events):
+        """
+        Merge dividend/split events (Date, Dividends, Stock Splits) into the ticker's event list
+
+        Events are kept under their own key, next to the bars rather than in them.
+        The read-modify-write holds a lock in the cache, so merges from other
+        workers can't overwrite each other.
+        """
+        if events is None or events.empty:
+            return
+        events = events.assign(Date=pd.to_datetime(events["Date"]).dt.normalize())
+        lock_key = f"events_lock_{ticker}"
+        deadline = time.monotonic() + EVENTS_LOCK_TIMEOUT
+        with phase("cache"):
+            locked = self.cache.add(lock_key, os.getpid(), timeout=EVENTS_LOCK_TIMEOUT)
+            while not locked and time.monotonic() < deadline:
+                time.sleep(0.05)
+                locked = self.cache.add(lock_key, os.getpid(), timeout=EVENTS_LOCK_TIMEOUT)
+            if not locked:
+                logger.warning(f"Bar store for {ticker}: events lock still held, merging without it")
+            try:
+                existing = self.cache.get(self._events_key(ticker))
+                if existing is not None and not existing.empty:
+                    events = pd.concat([existing, events], ignore_index=True)
+                events = events.drop_duplicates(subset="Date", keep="last").sort_values("Date", ascending=False)
+                self.cache.set(self._events_key(ticker), events.reset_index(drop=True), timeout=self.timeout)
+            finally:
+                if locked:
+                    self.cache.delete(lock_key)
+
+    def get_events(self, ticker, start_date, end_date):
+        """
+        Return the known dividend/split events of a ticker within a range
+
+        Returns:
+            DataFrame: Date, Dividends and Stock Splits, newest first (empty if none are known)
+        """
+        start, end = clamp_range(start_date, end_date)
+        with phase("cache"):
+            events = self.cache.get(self._events_key(ticker))
+        if events is None or events.empty:
+            return pd.DataFrame(columns=["Date", "Dividends", "Stock Splits"])
+        mask = (events["Date"] >= pd.Timestamp(start)) & (events["Date"] <= pd.Timestamp(end))
+        return events.loc[mask].reset_index(drop=True)
+
+    def is_covered(self, ticker, start_date, end_date, fresh=False):
+        """
+        Return True when the whole requested range can be served from the store
+
+        Args:
+            fresh (bool): Require the live tail to be fresh too (by default a stale tail counts as covered)
+        """
+        start, end = clamp_range(start_date, end_date)
+        entry = self.load(ticker)
+        covered = self.fresh_coverage(entry) if fresh else self.coverage(entry)
+        return not missing_ranges(covered, start, end)
+
+    def revalidate(self, ticker, start, end, fetch):
+        """
+        Refresh [start, end] in the background unless a worker is already doing it
+
+        Returns:
+            bool: True if a refresh was scheduled
+        """
+        lock_key = f"revalidate_{ticker}"
+        if not self.cache.add(lock_key, os.getpid(), timeout=REVALIDATE_LOCK_TIMEOUT):
+            return False
+
+        def refresh():
+            try:
+                self.get_bars(ticker, start, end, fetch, refresh=True)
+            finally:
+                self.cache.delete(lock_key)
+
+        logger.debug(f"Bar store for {ticker}: serving stale tail, refreshing {start} to {end} in the background")
+        self.engine.submit(refresh)
+        return True
+
+    def _cover_before_listing(self, ticker, bars, empty_windows, truncated):
+        """
+        Mark windows that came back empty as covered when they lie before the ticker's first bar
+
+        A valid empty answer for a window before the first known bar means the
+        ticker wasn't listed yet, so asking again would never return anything.
+        In case the empty answer was a failure after all, the windows are only
+        covered for EMPTY_COVERAGE_TTL. Empty windows after the first bar
+        (halts, delistings) stay uncovered.
+
+        Args:
+            bars (DataFrame): The ticker's stored bars
+            empty_windows (list): (start, end) date pairs that returned no bars
+            truncated (dict): Window start -> first bar of windows that were only partly marked covered
+        """
+        first_bar = bars["Date"].min().date()
+        before = sorted(window for window in empty_windows if window[1] < first_bar)
+        if not before:
+            return bars
+        logger.info(f"Bar store for {ticker}: no bars before {first_bar}, marking {len(before)} empty window(s) covered")
+        for window_start, window_end in before:
+            bars = self.store(ticker, None, window_start, window_end, empty=True)
+
+        # The window holding the first bar was kept uncovered below it in case it was
+        # truncated; an empty window right before it shows those days predate the listing
+        next_start = before[-1][1] + datetime.timedelta(days=1)
+        if truncated.get(next_start) == first_bar:
+            bars = self.store(ticker, None, next_start, first_bar - datetime.timedelta(days=1), empty=True)
+        return bars
+
+    def get_bars(self, ticker, start_date, end_date, fetch, refresh=False):
+        """
+        Return daily bars for a ticker, fetching only the uncovered date ranges
+
+        Args:
+            ticker (str): Stock ticker symbol
+            start_date (str): Start date in YYYY-MM-DD format
+            end_date (str): End date in YYYY-MM-DD format (inclusive)
+            fetch (callable): fetch(ticker, start_date, end_date) -> (DataFrame or None, source, events or None)
+            refresh (bool): Fetch the whole range again even where it is covered
+
+        Returns:
+            tuple: (DataFrame sorted newest first or None, source description)
+        """
+        start, end = clamp_range(start_date, end_date)
+
+        entry = self.load(ticker)
+        fresh = [] if refresh else self.fresh_coverage(entry)
+        stale_gaps = missing_ranges(fresh, start, end)
+        if not refresh and stale_gaps and not missing_ranges(self.coverage(entry), start, end):
+            # Everything is cached but the tail is stale: serve it and refresh behind the response
+            self.revalidate(ticker, stale_gaps[0][0].strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'), fetch)
+            fresh = self.coverage(entry)
+
+        windows, empty_windows = plan_windows(fresh, start, end)
+        partly_cached = missing_ranges(fresh, start, end) != [(start, end)]
+        CACHE_REQUESTS.inc(kind="bars", result="partial" if windows and partly_cached else "miss" if windows else "hit")
+        bars = entry['bars']
+        sources = []
+
+        if windows:
+            logger.debug(f"Bar store for {ticker}: fetching {len(windows)} window(s) {windows}")
+        else:
+            logger.debug(f"Bar store for {ticker}: {start} to {end} fully cached")
+
+        for window_start, window_end in empty_windows:
+            # Weekends never have bars, remember them without asking upstream
+            bars = self.store(ticker, None, window_start, window_end)
+
+        # Fetch the windows concurrently and merge each one (and its dividend/split
+        # events) into the cache as soon as it lands, one at a time in this thread;
+        # overlapping boundary rows are de-duplicated by date
+        jobs = [(ticker, window_start.strftime('%Y-%m-%d'), window_end.strftime('%Y-%m-%d'))
+                for window_start, window_end in windows]
+        empty_results = []
+        truncated = {}
+        for (_, window_start, window_end), result in self.engine.imap_unordered(fetch, jobs):
+            df, source, events = result if result is not None else (None, None, None)
+            if df is not None and source not in sources:
+                sources.append(source)
+            if df is None:
+                logger.warning(f"Bar store for {ticker}: fetching {window_start} to {window_end} failed")
+                continue
+            self.store_events(ticker, events)
+            if df.empty:
+                empty_results.append((_to_date(window_start), _to_date(window_end)))
+                continue
+
+            bars, first_bar = self.store_window(ticker, df, window_start, window_end)
+            if first_bar is not None:
+                truncated[_to_date(window_start)] = first_bar
+
+        if empty_results and bars is not None and not bars.empty:
+            bars = self._cover_before_listing(ticker, bars, empty_results, truncated)
+
+        if bars is None or bars.empty:
+            return None, "+".join(sources) or "unavailable"
+
+        mask = (bars["Date"] >= pd.Timestamp(start)) & (bars["Date"] <= pd.Timestamp(end))
+        result = bars.loc[mask].sort_values("Date", ascending=False).reset_index(drop=True)
+
+        if not sources:
+            source = "cache"
+        else:
+            source = "+".join(sources)
+            if partly_cached:
+                source = f"cache+{source}"
+        return result, source
@@ -0,0 +1 @@
+"""Offline micro-benchmarks for the scraper and export hot paths."""
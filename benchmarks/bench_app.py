@@ -0,0 +1,153 @@
+"""
+End-to-end latency of /scrape and /download through the Flask test client, fully offline.
+
+Usage:
+    python -m benchmarks.bench_app [--repeat N] [--days 30,365,1825] [--latency SECONDS]
+
+Both data sources are replaced by the fakes in benchmarks/fake_yfinance.py and
+the app uses a throwaway cache, so the numbers cover our own code path:
+cache lookups, window planning, parsing, cleaning, rendering and exports.
+
+Scenarios per date range:
+    scrape_cold   /scrape for a ticker that isn't cached (scraper first)
+    scrape_warm   /scrape for the same ticker again (served from the bar store)
+    api_cold      /scrape for an uncached ticker with the yfinance API first
+    download_xlsx /download of the scraped range, streaming and in-memory workbook
+"""
+
+import os
+import argparse
+import datetime
+import logging
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+DEFAULT_DAYS = (30, 365, 1825)
+
+# Fixed end date, so every run requests the same (settled) history
+END_DATE = datetime.date(2025, 4, 8)
+
+
+def _percentile(timings, fraction):
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _summary(scenario, days, timings, **extra):
+    result = {
+        'scenario': scenario,
+        'days': days,
+        'median_ms': round(statistics.median(timings) * 1000, 2),
+        'p95_ms': round(_percentile(timings, 0.95) * 1000, 2)
+    }
+    result.update(extra)
+    return result
+
+
+def load_app(latency=0.0):
+    """
+    Import the app against the offline fakes and a throwaway cache
+
+    Returns:
+        module: The app module
+    """
+    workdir = tempfile.mkdtemp(prefix="yf-bench-")
+    os.environ.setdefault('CACHE_TYPE', 'SQLiteCache')
+    os.environ['CACHE_SQLITE_PATH'] = os.path.join(workdir, "cache.sqlite3")
+    os.environ['METRICS_DB_PATH'] = os.path.join(workdir, "metrics.sqlite3")
+
+    from benchmarks.fake_yfinance import install
+    install(latency)
+
+    import app
+    return app
+
+
+def _post_scrape(client, ticker, start_date, end_date):
+    start = time.perf_counter()
+    response = client.post('/scrape', data={'ticker': ticker, 'start_date': start_date, 'end_date': end_date})
+    elapsed = time.perf_counter() - start
+    if response.status_code != 200:
+        raise RuntimeError(f"/scrape returned {response.status_code} for {ticker}")
+    return elapsed
+
+
+def _download(app_module, client, mode):
+    app_module.EXCEL_EXPORT_MODE = mode
+    start = time.perf_counter()
+    response = client.get('/download')
+    body = response.get_data()
+    elapsed = time.perf_counter() - start
+    if response.status_code != 200:
+        raise RuntimeError(f"/download returned {response.status_code}")
+    return elapsed, len(body)
+
+
+def run(repeat=5, days_list=DEFAULT_DAYS, latency=0.0):
+    """
+    Benchmark the app's request paths for each date range
+
+    Returns:
+        list: One dict per (scenario, days) with median and p95 latency
+    """
+    app_module = load_app(latency)
+    app_module.app.config['TESTING'] = True
+    previous_level = logging.root.manager.disable
+    logging.disable(logging.INFO)
+
+    results = []
+    try:
+        end_date = END_DATE.strftime('%Y-%m-%d')
+        for days in days_list:
+            start_date = (END_DATE - datetime.timedelta(days=days)).strftime('%Y-%m-%d')
+            client = app_module.app.test_client()
+
+            # Untimed run so the fake pages for these windows are generated up front
+            _post_scrape(client, f"WARMUP{days}", start_date, end_date)
+
+            app_module.PREFER_API_OVER_SCRAPING = False
+            timings = [_post_scrape(client, f"COLD{days}X{i}", start_date, end_date) for i in range(repeat)]
+            results.append(_summary('scrape_cold', days, timings))
+
+            timings = [_post_scrape(client, f"COLD{days}X0", start_date, end_date) for _ in range(repeat)]
+            results.append(_summary('scrape_warm', days, timings))
+
+            app_module.PREFER_API_OVER_SCRAPING = True
+            timings = [_post_scrape(client, f"API{days}X{i}", start_date, end_date) for i in range(repeat)]
+            results.append(_summary('api_cold', days, timings))
+            app_module.PREFER_API_OVER_SCRAPING = False
+
+            # The session now points at the last scraped range
+            for mode in ('streaming', 'memory'):
+                timings = []
+                size = 0
+                for _ in range(repeat):
+                    elapsed, size = _download(app_module, client, mode)
+                    timings.append(elapsed)
+                tracemalloc.start()
+                _download(app_module, client, mode)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                results.append(_summary(f'download_xlsx_{mode}', days, timings,
+                                        file_kb=round(size / 1024, 1), peak_kb=round(peak / 1024, 1)))
+    finally:
+        logging.disable(previous_level)
+    return results
+
+
+def print_results(results):
+    print(f"{'scenario':<26}{'days':>6}{'median ms':>12}{'p95 ms':>10}{'peak KB':>11}")
+    for r in results:
+        print(f"{r['scenario']:<26}{r['days']:>6}{r['median_ms']:>12}{r['p95_ms']:>10}{r.get('peak_kb', ''):>11}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5, help="timed requests per scenario and range")
+    parser.add_argument("--days", default=",".join(str(d) for d in DEFAULT_DAYS),
+                        help="comma separated range lengths in days")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated upstream latency in seconds")
+    args = parser.parse_args()
+    print_results(run(args.repeat, [int(d) for d in args.days.split(",")], args.latency))
@@ -0,0 +1,87 @@
+"""
+Compare the per-column table cleaning with the vectorized single-pass cleaning.
+
+Usage:
+    python -m benchmarks.bench_cleaning [--repeat N] [--rows 250,1000,5000,20000]
+
+Both paths start from the cell texts extract_table_rows returns for synthetic
+history tables (with dividend rows) and produce the typed price frame.
+"""
+
+import argparse
+import statistics
+import time
+
+import pandas as pd
+
+from benchmarks.fixtures import generate_history_rows
+from yahoo_scraper import clean_history_rows, HISTORY_COLUMNS
+
+DEFAULT_SIZES = (250, 1000, 5000, 20000)
+
+
+def clean_per_column(rows):
+    """The previous cleaning: a regex replace and to_numeric per column, then an unformatted to_datetime"""
+    data = [cells for cells in rows if len(cells) >= 7]
+    df = pd.DataFrame(data, columns=HISTORY_COLUMNS)
+    for col in ["Open", "High", "Low", "Close", "Adj Close"]:
+        df[col] = df[col].replace('[^0-9.-]', '', regex=True)
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    df["Volume"] = df["Volume"].replace('[^0-9]', '', regex=True)
+    df["Volume"] = pd.to_numeric(df["Volume"], errors='coerce')
+    df["Date"] = pd.to_datetime(df["Date"], errors='coerce')
+    return df.dropna()
+
+
+METHODS = {
+    'per_column': clean_per_column,
+    'vectorized': clean_history_rows,
+}
+
+
+def median_seconds(func, rows, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(rows)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def run(repeat=5, sizes=DEFAULT_SIZES):
+    """
+    Benchmark both cleaning methods over synthetic tables of several sizes
+
+    Returns:
+        list: One dict per (rows, method) with timing figures
+    """
+    results = []
+    for size in sizes:
+        rows = generate_history_rows(size)
+        baseline = None
+        for method, func in METHODS.items():
+            seconds = median_seconds(func, rows, repeat)
+            baseline = baseline or seconds
+            results.append({
+                'rows': size,
+                'method': method,
+                'median_ms': round(seconds * 1000, 2),
+                'rows_per_s': round(size / seconds) if seconds else 0,
+                'speedup': round(baseline / seconds, 2) if seconds else 0
+            })
+    return results
+
+
+def print_results(results):
+    print(f"{'rows':>7}  {'method':<12}{'median ms':>12}{'rows/s':>12}{'speedup':>9}")
+    for r in results:
+        print(f"{r['rows']:>7}  {r['method']:<12}{r['median_ms']:>12}{r['rows_per_s']:>12}{r['speedup']:>9}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per size and method")
+    parser.add_argument("--rows", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="comma-separated table sizes")
+    args = parser.parse_args()
+    print_results(run(args.repeat, [int(size) for size in args.rows.split(",")]))
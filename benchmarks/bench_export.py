@@ -0,0 +1,94 @@
+"""
+Compare the in-memory and streaming (constant-memory) Excel exports.
+
+Usage:
+    python -m benchmarks.bench_export [--repeat N] [--sizes 250,2500,25000]
+
+Peak memory is the tracemalloc peak for producing the whole response body,
+including reading every streamed chunk, on top of the already cached frame.
+"""
+
+import argparse
+import statistics
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from exporters import build_excel_in_memory, write_excel_streaming, iter_file_chunks
+
+DEFAULT_SIZES = (250, 2500, 25000)
+
+
+def make_frame(rows, seed=0):
+    """Synthetic history frame shaped like the scraper's output"""
+    rng = np.random.default_rng(seed)
+    close = 150 + rng.standard_normal(rows).cumsum()
+    return pd.DataFrame({
+        "Date": pd.bdate_range(end="2025-04-08", periods=rows)[::-1],
+        "Open": close + rng.uniform(-1, 1, rows),
+        "High": close + rng.uniform(0, 2, rows),
+        "Low": close - rng.uniform(0, 2, rows),
+        "Close": close,
+        "Adj Close": close * 0.99,
+        "Volume": rng.integers(10**6, 10**8, rows)
+    })
+
+
+def export_memory(df):
+    return len(build_excel_in_memory(df, "SYN"))
+
+
+def export_streaming(df):
+    return sum(len(chunk) for chunk in iter_file_chunks(write_excel_streaming(df, "SYN")))
+
+
+MODES = {'memory': export_memory, 'streaming': export_streaming}
+
+
+def run(repeat=3, sizes=DEFAULT_SIZES):
+    """
+    Benchmark both export modes for each frame size
+
+    Returns:
+        list: One dict per (rows, mode) with timing, output size and peak memory
+    """
+    results = []
+    for rows in sizes:
+        df = make_frame(rows)
+        for mode, export in MODES.items():
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                size = export(df)
+                timings.append(time.perf_counter() - start)
+
+            tracemalloc.start()
+            export(df)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            results.append({
+                'rows': rows,
+                'mode': mode,
+                'file_kb': round(size / 1024, 1),
+                'median_ms': round(statistics.median(timings) * 1000, 1),
+                'peak_kb': round(peak / 1024, 1)
+            })
+    return results
+
+
+def print_results(results):
+    print(f"{'rows':>8}  {'mode':<10}{'file KB':>10}{'median ms':>12}{'peak KB':>12}")
+    for r in results:
+        print(f"{r['rows']:>8}  {r['mode']:<10}{r['file_kb']:>10}{r['median_ms']:>12}{r['peak_kb']:>12}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per size and mode")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="comma separated row counts")
+    args = parser.parse_args()
+    print_results(run(args.repeat, [int(s) for s in args.sizes.split(",")]))
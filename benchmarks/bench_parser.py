@@ -0,0 +1,87 @@
+"""
+Compare HTML parsing backends for the Yahoo history table and the embedded JSON path.
+
+Usage:
+    python -m benchmarks.bench_parser [--repeat N]
+
+For every fixture and parser mode the benchmark reports the median parse
+time, row throughput and peak Python heap allocation (tracemalloc does not
+see memory allocated inside lxml's C code, so lxml numbers are a lower bound).
+"""
+
+import argparse
+import statistics
+import time
+import tracemalloc
+
+from benchmarks.fixtures import load_fixtures
+from yahoo_scraper import extract_embedded_history, extract_table_rows, LXML_AVAILABLE
+
+# Table parser modes plus the embedded JSON extraction path
+MODES = ["full"] + (["lxml"] if LXML_AVAILABLE else []) + ["json"]
+
+
+def parse(html, mode):
+    """Run one extraction mode and return its rows (a list or DataFrame)"""
+    if mode == "json":
+        return extract_embedded_history(html)[0]
+    return extract_table_rows(html, mode)
+
+
+def measure(func, repeat):
+    """
+    Time func over several runs and measure the peak memory of one extra run
+
+    Returns:
+        tuple: (median seconds, peak bytes, last result)
+    """
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak, result
+
+
+def run(repeat=5):
+    """
+    Benchmark every parser mode over every fixture
+
+    Returns:
+        list: One dict per (fixture, mode) with timing and memory figures
+    """
+    results = []
+    for name, html in load_fixtures().items():
+        for mode in MODES:
+            seconds, peak, rows = measure(lambda: parse(html, mode), repeat)
+            row_count = 0 if rows is None else len(rows)
+            results.append({
+                'fixture': name,
+                'mode': mode,
+                'page_kb': round(len(html) / 1024, 1),
+                'rows': row_count,
+                'median_ms': round(seconds * 1000, 2),
+                'rows_per_s': round(row_count / seconds) if seconds else 0,
+                'peak_kb': round(peak / 1024, 1)
+            })
+    return results
+
+
+def print_results(results):
+    print(f"{'fixture':<28}{'mode':<7}{'page KB':>10}{'rows':>7}{'median ms':>12}{'rows/s':>10}{'peak KB':>11}")
+    for r in results:
+        print(f"{r['fixture']:<28}{r['mode']:<7}{r['page_kb']:>10}{r['rows']:>7}"
+              f"{r['median_ms']:>12}{r['rows_per_s']:>10}{r['peak_kb']:>11}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per fixture and mode")
+    args = parser.parse_args()
+    print_results(run(args.repeat))
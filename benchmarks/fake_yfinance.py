@@ -0,0 +1,136 @@
+"""
+Offline stand-ins for the upstream data sources used by the benchmarks.
+
+FakeYFinance replaces the yfinance module: download() returns deterministic
+synthetic bars for the requested range, shaped like yfinance's output (one
+column level for a single ticker, (ticker, field) columns with
+group_by='ticker'), and records tickers without bars in shared._ERRORS. FakeYahooSession replaces the scraper's pooled HTTP
+session and answers history URLs with synthetic (or recorded) pages for the
+requested period. Both can add a fixed latency to mimic the network.
+"""
+
+import sys
+import time
+import types
+import zlib
+import datetime
+from functools import lru_cache
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.fixtures import generate_history_page
+
+PRICE_FIELDS = ["Open", "High", "Low", "Close", "Adj Close", "Volume"]
+
+
+def synthetic_bars(ticker, start, end):
+    """
+    Business-day bars for [start, end) as yfinance returns them (Date index)
+
+    The values are seeded by ticker, so repeated runs produce the same data.
+    """
+    index = pd.DatetimeIndex(pd.bdate_range(start, end, inclusive='left'), name='Date')
+    rng = np.random.default_rng(zlib.crc32(ticker.encode()))
+    close = 150 + rng.standard_normal(len(index)).cumsum()
+    return pd.DataFrame({
+        "Open": close + rng.uniform(-1, 1, len(index)),
+        "High": close + rng.uniform(0, 2, len(index)),
+        "Low": close - rng.uniform(0, 2, len(index)),
+        "Close": close,
+        "Adj Close": close * 0.99,
+        "Volume": rng.integers(10**6, 10**8, len(index))
+    }, index=index)
+
+
+class FakeYFinance(types.ModuleType):
+    """
+    Module object standing in for yfinance
+
+    Args:
+        latency (float): Seconds each download() call sleeps first
+    """
+
+    def __init__(self, latency=0.0):
+        super().__init__("yfinance")
+        self.latency = latency
+        self.calls = 0
+        self.shared = types.SimpleNamespace(_ERRORS={})
+
+    def download(self, tickers, start=None, end=None, group_by=None, **kwargs):
+        self.calls += 1
+        self.shared._ERRORS = {}
+        if self.latency:
+            time.sleep(self.latency)
+        symbols = [tickers] if isinstance(tickers, str) else tickers
+        frames = {ticker: synthetic_bars(ticker, start, end) for ticker in symbols}
+        for ticker, frame in frames.items():
+            if frame.empty:
+                # What yfinance records for a range without bars
+                self.shared._ERRORS[ticker] = f"YFPricesMissingError('possibly delisted; no price data found (1d {start} -> {end})')"
+        if isinstance(tickers, str):
+            return frames[tickers]
+        return pd.concat(frames, axis=1, names=['Ticker', 'Price'])
+
+
+class _Response:
+    def __init__(self, text, status_code=200):
+        self.text = text
+        self.status_code = status_code
+
+
+class FakeYahooSession:
+    """
+    Session standing in for the scraper's requests.Session
+
+    Args:
+        latency (float): Seconds each get() call sleeps first
+        embed_json (bool): Serve pages with the embedded chart JSON (False forces table parsing)
+        page (str): Serve this recorded page for every request instead of generating one
+    """
+
+    def __init__(self, latency=0.0, embed_json=True, page=None):
+        self.latency = latency
+        self.embed_json = embed_json
+        self.page = page
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.page is not None:
+            return _Response(self.page)
+        query = parse_qs(urlparse(url).query)
+        period1 = int(query.get('period1', [0])[0])
+        period2 = int(query.get('period2', [0])[0])
+        return _Response(self._history_page(period1, period2))
+
+    @lru_cache(maxsize=256)
+    def _history_page(self, period1, period2):
+        start = datetime.date.fromtimestamp(period1)
+        end = datetime.date.fromtimestamp(period2) - datetime.timedelta(days=1)
+        rows = max(1, len(pd.bdate_range(start, end)))
+        return generate_history_page(rows, seed=period1 % 1000, embed_json=self.embed_json, end_date=end)
+
+
+def install(latency=0.0, embed_json=True, page=None):
+    """
+    Route both data sources to the fakes
+
+    Must run before the app modules are imported, so that the app sees a
+    yfinance module even where the real one isn't installed.
+
+    Returns:
+        tuple: (FakeYFinance, FakeYahooSession)
+    """
+    fake_yf = FakeYFinance(latency)
+    sys.modules['yfinance'] = fake_yf
+
+    import alternative_api
+    import yahoo_scraper
+    fake_session = FakeYahooSession(latency, embed_json, page)
+    alternative_api.yf = fake_yf
+    yahoo_scraper.get_session = lambda: fake_session
+    return fake_yf, fake_session
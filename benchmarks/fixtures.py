@@ -0,0 +1,167 @@
+"""
+HTML fixtures for the offline benchmarks.
+
+Pages saved from finance.yahoo.com can be dropped into benchmarks/fixtures/
+as *.html files. Synthetic pages that mimic the size and layout of a Yahoo
+history page (large head with inline scripts, navigation, a history table
+with dividend rows, footer) are generated on the fly so the benchmarks also
+run on a fresh checkout.
+"""
+
+import calendar
+import datetime
+import glob
+import json
+import os
+import random
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Synthetic page sizes (number of daily rows in the history table)
+SYNTHETIC_SIZES = (20, 100, 250, 1000)
+
+
+def _script_blob(rng, size):
+    """Inline JavaScript of roughly size bytes, like Yahoo's bundled page state"""
+    chunk = 'window.__data=window.__data||{};window.__data["k%d"]={"v":"%s","n":%d};\n'
+    parts = []
+    total = 0
+    while total < size:
+        part = chunk % (rng.randint(0, 10**6), "x" * rng.randint(20, 120), rng.randint(0, 10**9))
+        parts.append(part)
+        total += len(part)
+    return "".join(parts)
+
+
+def _navigation(rng, links):
+    items = "".join(
+        f'<li class="nav-item yf-1"><a href="/quote/T{i}" class="link yf-2" data-ylk="slk:{i}">Item {i}</a></li>'
+        for i in range(links)
+    )
+    return f'<nav class="nav yf-3"><ul>{items}</ul></nav>'
+
+
+def generate_history_rows(rows, seed=0, end_date=None):
+    """
+    Generate synthetic daily bars as the cell texts Yahoo renders
+
+    Args:
+        rows (int): Number of price rows
+        seed (int): Random seed so fixtures are reproducible
+        end_date (date): Date of the newest row (defaults to 2025-04-08)
+
+    Returns:
+        list: Rows newest first; price rows have 7 cells, dividend rows have 2
+    """
+    rng = random.Random(seed)
+    day = end_date or datetime.date(2025, 4, 8)
+    price = 150.0
+    result = []
+    while len([r for r in result if len(r) == 7]) < rows:
+        if day.weekday() < 5:
+            open_ = price * (1 + rng.uniform(-0.01, 0.01))
+            close = price * (1 + rng.uniform(-0.02, 0.02))
+            high = max(open_, close) * (1 + rng.uniform(0, 0.01))
+            low = min(open_, close) * (1 - rng.uniform(0, 0.01))
+            volume = rng.randint(10**6, 10**8)
+            label = day.strftime('%b %d, %Y').replace(' 0', ' ')
+            result.append([label, f"{open_:,.2f}", f"{high:,.2f}", f"{low:,.2f}",
+                           f"{close:,.2f}", f"{close * 0.99:,.2f}", f"{volume:,}"])
+            if rng.random() < 0.015:
+                result.append([label, "0.25 Dividend"])
+            price = close
+        day -= datetime.timedelta(days=1)
+    return result
+
+
+def chart_response(rows_data, symbol="SYN"):
+    """
+    v8 chart API response body for rows from generate_history_rows
+
+    Returns:
+        dict: {"chart": {"result": [...], "error": None}} with the price rows oldest first
+    """
+    bars = [cells for cells in reversed(rows_data) if len(cells) == 7]
+    timestamps, columns = [], {name: [] for name in ("open", "high", "low", "close", "adjclose", "volume")}
+    for cells in bars:
+        day = datetime.datetime.strptime(cells[0], '%b %d, %Y')
+        timestamps.append(calendar.timegm(day.timetuple()) + 13 * 3600 + 1800)
+        values = [float(c.replace(",", "")) for c in cells[1:]]
+        for name, value in zip(("open", "high", "low", "close", "adjclose"), values[:5]):
+            columns[name].append(value)
+        columns["volume"].append(int(values[5]))
+    return {"chart": {"result": [{
+        "meta": {"symbol": symbol, "gmtoffset": -14400},
+        "timestamp": timestamps,
+        "indicators": {
+            "quote": [{name: columns[name] for name in ("open", "high", "low", "close", "volume")}],
+            "adjclose": [{"adjclose": columns["adjclose"]}]
+        }
+    }], "error": None}}
+
+
+def _chart_script(rows_data):
+    """Embedded v8 chart API response, the way SvelteKit pages inline it"""
+    payload = {"status": 200, "statusText": "OK", "headers": {}, "body": json.dumps(chart_response(rows_data))}
+    return ('<script type="application/json" data-sveltekit-fetched '
+            'data-url="https://query1.finance.yahoo.com/v8/finance/chart/SYN?interval=1d">'
+            f'{json.dumps(payload)}</script>')
+
+
+def generate_history_page(rows, seed=0, embed_json=True, end_date=None):
+    """
+    Build a synthetic Yahoo Finance history page
+
+    Args:
+        rows (int): Number of price rows in the history table
+        seed (int): Random seed so fixtures are reproducible
+        embed_json (bool): Also embed the chart API response like current Yahoo pages
+        end_date (date): Date of the newest row (defaults to 2025-04-08)
+
+    Returns:
+        str: Page HTML
+    """
+    rng = random.Random(seed)
+    rows_data = generate_history_rows(rows, seed, end_date)
+    body_rows = []
+    for cells in rows_data:
+        if len(cells) == 7:
+            tds = "".join(f'<td class="yf-ewueuo">{cell}</td>' for cell in cells)
+        else:
+            value, kind = cells[1].split(" ", 1)
+            tds = (f'<td class="yf-ewueuo">{cells[0]}</td>'
+                   f'<td colspan="6" class="yf-ewueuo"><strong>{value}</strong> <span>{kind}</span></td>')
+        body_rows.append(f'<tr class="yf-ewueuo">{tds}</tr>')
+
+    header = "".join(f'<th class="yf-ewueuo">{name}</th>' for name in
+                     ["Date", "Open", "High", "Low", "Close", "Adj Close", "Volume"])
+    scripts = "".join(
+        f'<script type="text/javascript">{_script_blob(rng, 40_000)}</script>' for _ in range(12)
+    )
+    return (
+        '<!DOCTYPE html><html lang="en-US"><head><meta charset="utf-8">'
+        '<title>Synthetic (SYN) Stock Historical Prices &amp; Data - Yahoo Finance</title>'
+        f'<style>{"." + "yf-x{color:red}" * 2000}</style>{scripts}</head><body>'
+        f'{_navigation(rng, 400)}'
+        '<main><section class="gridLayout yf-1"><div class="table-container yf-2">'
+        f'<table class="table yf-ewueuo"><thead><tr>{header}</tr></thead>'
+        f'<tbody>{"".join(body_rows)}</tbody></table></div></section></main>'
+        f'<footer>{_navigation(rng, 200)}</footer>'
+        f'{_chart_script(rows_data) if embed_json else ""}</body></html>'
+    )
+
+
+def load_fixtures(sizes=SYNTHETIC_SIZES):
+    """
+    Return the benchmark pages: saved *.html fixtures plus synthetic pages
+
+    Returns:
+        dict: Fixture name -> page HTML
+    """
+    fixtures = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.html"))):
+        with open(path, encoding="utf-8") as f:
+            fixtures[os.path.basename(path)] = f.read()
+    for rows in sizes:
+        fixtures[f"synthetic_{rows}_rows"] = generate_history_page(rows, seed=rows)
+    return fixtures
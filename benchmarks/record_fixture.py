@@ -0,0 +1,57 @@
+"""
+Save a live Yahoo Finance history page as a benchmark fixture (needs network access).
+
+Usage:
+    python -m benchmarks.record_fixture TICKER START_DATE END_DATE [--name NAME]
+
+The page is fetched with the scraper's own session and written to
+benchmarks/fixtures/<name>.html, where bench_parser picks it up. Record a few
+range sizes (a month, a year, two years) so the benchmarks cover both small
+pages and the largest ones the scraper requests.
+"""
+
+import os
+import sys
+import argparse
+
+from benchmarks.fixtures import FIXTURE_DIR
+from yahoo_scraper import get_period_timestamps, get_session, history_url
+
+# Browser-like headers, Yahoo serves a consent or block page to bare clients
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9'
+}
+
+
+def record(ticker, start_date, end_date, name=None):
+    """
+    Fetch one history page and store it in the fixture directory
+
+    Returns:
+        str: Path of the saved fixture
+    """
+    period1, period2 = get_period_timestamps(start_date, end_date)
+    response = get_session().get(history_url(ticker, period1, period2), headers=HEADERS, timeout=30)
+    response.raise_for_status()
+
+    name = name or f"{ticker.lower()}_{start_date}_{end_date}"
+    path = os.path.join(FIXTURE_DIR, f"{name}.html")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(response.text)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("ticker")
+    parser.add_argument("start_date", help="YYYY-MM-DD")
+    parser.add_argument("end_date", help="YYYY-MM-DD")
+    parser.add_argument("--name", help="fixture file name without extension")
+    args = parser.parse_args()
+    try:
+        print(record(args.ticker.upper(), args.start_date, args.end_date, args.name))
+    except Exception as e:
+        print(f"Could not record fixture: {str(e)}", file=sys.stderr)
+        sys.exit(1)
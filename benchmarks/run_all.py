@@ -0,0 +1,161 @@
+"""
+Run every benchmark, save the results and compare them with an earlier run.
+
+Usage:
+    python -m benchmarks.run_all [--repeat N] [--baseline FILE] [--threshold PCT] [--fail-on-regression]
+
+Each run is written to benchmarks/results/<timestamp>.json together with the
+Python/pandas versions and git commit. Unless --baseline names a file, the
+most recent earlier result file is used for the comparison. A timing or
+memory figure that grew by more than --threshold percent is reported as a
+regression (and makes the command exit with status 1 with --fail-on-regression).
+"""
+
+import os
+import sys
+import json
+import glob
+import argparse
+import platform
+import datetime
+import subprocess
+
+import pandas as pd
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# Suite name -> fields identifying one measurement
+SUITES = {
+    'parser': ('fixture', 'mode'),
+    'cleaning': ('rows', 'method'),
+    'export': ('rows', 'mode'),
+    'app': ('scenario', 'days')
+}
+
+# Figures compared between runs (lower is better)
+COMPARED_FIELDS = ('median_ms', 'peak_kb')
+
+# Differences below these absolute amounts are noise, whatever the percentage
+NOISE_FLOOR = {'median_ms': 1.0, 'peak_kb': 64.0}
+
+
+def run_suite(name, repeat):
+    # Imported lazily: bench_app has to install the fakes before the app is imported
+    if name == 'parser':
+        from benchmarks import bench_parser
+        return bench_parser.run(repeat)
+    if name == 'cleaning':
+        from benchmarks import bench_cleaning
+        return bench_cleaning.run(repeat)
+    if name == 'export':
+        from benchmarks import bench_export
+        return bench_export.run(repeat)
+    from benchmarks import bench_app
+    return bench_app.run(repeat)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(RESULTS_DIR), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def save_results(results, path=None):
+    """
+    Write a run to the results directory
+
+    Returns:
+        str: Path of the written file
+    """
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = path or os.path.join(RESULTS_DIR, f"{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, default=str)
+    return path
+
+
+def latest_results(exclude=None):
+    """Path of the most recent saved run other than exclude, or None"""
+    paths = [p for p in sorted(glob.glob(os.path.join(RESULTS_DIR, "*.json"))) if p != exclude]
+    return paths[-1] if paths else None
+
+
+def _index(suite, rows):
+    fields = SUITES[suite]
+    return {tuple(row.get(field) for field in fields): row for row in rows}
+
+
+def compare(current, baseline, threshold=10.0):
+    """
+    Find measurements that got slower or bigger than in the baseline run
+
+    Args:
+        current (dict): Results of this run
+        baseline (dict): Results of the earlier run
+        threshold (float): Allowed growth in percent
+
+    Returns:
+        list: (suite, key, field, old, new, change %) for each regression
+    """
+    regressions = []
+    for suite, rows in current['suites'].items():
+        old_rows = _index(suite, baseline.get('suites', {}).get(suite, []))
+        for key, row in _index(suite, rows).items():
+            old = old_rows.get(key)
+            if old is None:
+                continue
+            for field in COMPARED_FIELDS:
+                before, after = old.get(field), row.get(field)
+                if not before or after is None or after - before < NOISE_FLOOR[field]:
+                    continue
+                change = (after - before) / before * 100
+                if change > threshold:
+                    regressions.append((suite, key, field, before, after, round(change, 1)))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per measurement")
+    parser.add_argument("--suites", default=",".join(SUITES), help="comma separated suites to run")
+    parser.add_argument("--baseline", help="results file to compare with (default: the previous run)")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed growth in percent")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit with status 1 on regressions")
+    args = parser.parse_args(argv)
+
+    current = {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'repeat': args.repeat,
+        'suites': {}
+    }
+    for name in args.suites.split(","):
+        print(f"Running {name} benchmarks...", file=sys.stderr)
+        current['suites'][name] = run_suite(name, args.repeat)
+
+    path = save_results(current)
+    print(f"Results written to {path}")
+
+    baseline_path = args.baseline or latest_results(exclude=path)
+    if baseline_path is None:
+        print("No earlier results to compare with")
+        return 0
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    regressions = compare(current, baseline, args.threshold)
+    print(f"Compared with {baseline_path} (commit {baseline.get('commit')})")
+    if not regressions:
+        print(f"No regressions above {args.threshold:g}%")
+        return 0
+    for suite, key, field, before, after, change in regressions:
+        print(f"REGRESSION {suite} {'/'.join(map(str, key))} {field}: {before} -> {after} (+{change}%)")
+    return 1 if args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,565 @@
+"""
+Cache backends for the Flask-Caching layer.
+
+Flask-Caching's built-in SimpleCache keeps a private dict per gunicorn worker,
+so every worker (and every restart) starts cold. This module provides:
+
+- InstrumentedSimpleCache: the old per-process behaviour, with hit/miss stats
+- SQLiteCache: an on-disk cache shared by all workers on the same host that
+  survives restarts; values (usually DataFrames) are stored pickled
+- MemoryBudgetCache: a per-process in-memory cache bounded by bytes instead
+  of entry count, storing frames with compact dtypes and evicting by LRU
+
+All backends can be selected with the CACHE_TYPE environment variable and
+report their statistics through stats().
+"""
+
+import os
+import sys
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+import logging
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from flask_caching.backends.base import BaseCache
+from flask_caching.backends.simplecache import SimpleCache
+
+logger = logging.getLogger(__name__)
+
+# Default location of the shared cache database
+DEFAULT_SQLITE_PATH = os.path.join(tempfile.gettempdir(), "yahoo_finance_cache.sqlite3")
+
+# Size limit of the shared SQLite cache; the least recently written rows are evicted beyond it
+CACHE_SQLITE_MAX_MB = float(os.environ.get('CACHE_SQLITE_MAX_MB', 512))
+
+# Memory budget per worker process for MemoryBudgetCache
+CACHE_MEMORY_BUDGET_MB = float(os.environ.get('CACHE_MEMORY_BUDGET_MB', 64))
+
+# Columns stored as float32 by MemoryBudgetCache
+PRICE_COLUMNS = ("Open", "High", "Low", "Close", "Adj Close")
+
+# Decimals kept when float32 prices are widened back to float64 on read
+PRICE_DECIMALS = 4
+
+
+class CacheStats:
+    """Thread-safe hit/miss counters for a cache backend"""
+
+    def __init__(self, backend_name):
+        self.backend_name = backend_name
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.deletes = 0
+
+    def record_get(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def record_set(self):
+        with self._lock:
+            self.sets += 1
+
+    def record_delete(self):
+        with self._lock:
+            self.deletes += 1
+
+    def as_dict(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': self.backend_name,
+                'pid': os.getpid(),
+                'hits': self.hits,
+                'misses': self.misses,
+                'sets': self.sets,
+                'deletes': self.deletes,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+def _factory_options(kwargs):
+    """Keep only the options our backends understand (they differ between Flask-Caching versions)"""
+    return {'default_timeout': kwargs.get('default_timeout', 300)}
+
+
+class InstrumentedSimpleCache(SimpleCache):
+    """Per-process in-memory cache (Flask-Caching SimpleCache) with hit/miss stats"""
+
+    def __init__(self, threshold=500, default_timeout=300):
+        super().__init__(threshold=threshold, default_timeout=default_timeout)
+        self.cache_stats = CacheStats("SimpleCache")
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        return cls(threshold=config.get("CACHE_THRESHOLD", 500), **_factory_options(kwargs))
+
+    def get(self, key):
+        value = super().get(key)
+        self.cache_stats.record_get(value is not None)
+        return value
+
+    def set(self, key, value, timeout=None):
+        self.cache_stats.record_set()
+        return super().set(key, value, timeout=timeout)
+
+    def delete(self, key):
+        self.cache_stats.record_delete()
+        return super().delete(key)
+
+    def touch(self, key, timeout=None):
+        """Extend a live entry's expiry to at least timeout seconds from now, without rewriting it"""
+        try:
+            expires, value = self._cache[key]
+        except KeyError:
+            return False
+        if expires != 0 and expires <= time.time():
+            return False
+        new_expires = self._normalize_timeout(timeout)
+        if expires != 0 and (new_expires == 0 or new_expires > expires):
+            self._cache[key] = (new_expires, value)
+        return True
+
+    def stats(self):
+        stats = self.cache_stats.as_dict()
+        stats['entries'] = len(self._cache)
+        return stats
+
+
+class SQLiteCache(BaseCache):
+    """
+    Cache stored in a local SQLite database shared by all worker processes.
+
+    The database runs in WAL mode so readers never block the single writer,
+    and each thread gets its own connection. Expired rows are ignored on read
+    and pruned periodically on write, when the least recently written rows
+    are also evicted if the stored values exceed max_bytes (bars and events
+    never expire on their own). Rows that no longer unpickle, e.g. written by
+    an older version of the code, are dropped on read.
+
+    Args:
+        path (str): Location of the database file
+        default_timeout (int): Default timeout in seconds (0 means never expire)
+        max_bytes (int): Limit for the total size of the stored values
+    """
+
+    PRUNE_EVERY = 100  # sets between expired-row cleanups
+
+    def __init__(self, path=DEFAULT_SQLITE_PATH, default_timeout=300,
+                 max_bytes=int(CACHE_SQLITE_MAX_MB * 1024 * 1024)):
+        super().__init__(default_timeout=default_timeout)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.cache_stats = CacheStats("SQLiteCache")
+        self._local = threading.local()
+        self._sets_since_prune = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)"
+        )
+        logger.info(f"Using shared SQLite cache at {path}")
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        path = config.get("CACHE_SQLITE_PATH") or DEFAULT_SQLITE_PATH
+        max_mb = float(config.get("CACHE_SQLITE_MAX_MB") or CACHE_SQLITE_MAX_MB)
+        return cls(path=path, max_bytes=int(max_mb * 1024 * 1024), **_factory_options(kwargs))
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _expiry(self, timeout):
+        timeout = self._normalize_timeout(timeout)
+        return time.time() + timeout if timeout > 0 else None
+
+    def _maybe_prune(self):
+        self._sets_since_prune += 1
+        if self._sets_since_prune >= self.PRUNE_EVERY:
+            self._sets_since_prune = 0
+            self.prune()
+
+    def prune(self):
+        """Delete expired rows, then the least recently written ones until the values fit in max_bytes"""
+        conn = self._connection()
+        conn.execute("DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?", (time.time(),))
+        total = conn.execute("SELECT COALESCE(SUM(LENGTH(value)), 0) FROM cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # INSERT OR REPLACE gives a rewritten row a new rowid, so rowid order is write order
+        evict = []
+        for key, size in conn.execute("SELECT key, LENGTH(value) FROM cache ORDER BY rowid"):
+            if total <= self.max_bytes:
+                break
+            evict.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM cache WHERE key = ?", evict)
+        logger.info(f"SQLite cache over {self.max_bytes} bytes, evicted {len(evict)} entries")
+
+    def get(self, key):
+        try:
+            row = self._connection().execute(
+                "SELECT value FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)",
+                (key, time.time())
+            ).fetchone()
+            if row is None:
+                self.cache_stats.record_get(False)
+                return None
+        except sqlite3.Error as e:
+            logger.warning(f"SQLite cache read failed for {key}: {str(e)}")
+            self.cache_stats.record_get(False)
+            return None
+        try:
+            value = pickle.loads(row[0])
+        except Exception as e:
+            # Unpickling can fail in many ways (e.g. AttributeError for a class that moved)
+            logger.warning(f"Dropping unreadable SQLite cache entry {key}: {type(e).__name__}: {str(e)}")
+            self.cache_stats.record_get(False)
+            self.delete(key)
+            return None
+        self.cache_stats.record_get(True)
+        return value
+
+    def set(self, key, value, timeout=None):
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            self._connection().execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+                (key, sqlite3.Binary(blob), self._expiry(timeout))
+            )
+            self.cache_stats.record_set()
+            self._maybe_prune()
+            return True
+        except (sqlite3.Error, pickle.PickleError) as e:
+            logger.warning(f"SQLite cache write failed for {key}: {str(e)}")
+            return False
+
+    def add(self, key, value, timeout=None):
+        """Store the value only if the key is missing or expired (atomic across workers)"""
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "DELETE FROM cache WHERE key = ? AND expires IS NOT NULL AND expires <= ?",
+                    (key, time.time())
+                )
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+                    (key, sqlite3.Binary(blob), self._expiry(timeout))
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            added = cursor.rowcount == 1
+            if added:
+                self.cache_stats.record_set()
+            return added
+        except (sqlite3.Error, pickle.PickleError) as e:
+            logger.warning(f"SQLite cache add failed for {key}: {str(e)}")
+            return False
+
+    def delete(self, key):
+        try:
+            cursor = self._connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+            self.cache_stats.record_delete()
+            return cursor.rowcount > 0
+        except sqlite3.Error as e:
+            logger.warning(f"SQLite cache delete failed for {key}: {str(e)}")
+            return False
+
+    def touch(self, key, timeout=None):
+        """Extend a live entry's expiry to at least timeout seconds from now, without rewriting the value"""
+        expires = self._expiry(timeout)
+        try:
+            cursor = self._connection().execute(
+                "UPDATE cache SET expires = CASE WHEN expires IS NULL OR ? IS NULL THEN NULL "
+                "ELSE MAX(expires, ?) END WHERE key = ? AND (expires IS NULL OR expires > ?)",
+                (expires, expires, key, time.time())
+            )
+            return cursor.rowcount > 0
+        except sqlite3.Error as e:
+            logger.warning(f"SQLite cache touch failed for {key}: {str(e)}")
+            return False
+
+    def has(self, key):
+        try:
+            row = self._connection().execute(
+                "SELECT 1 FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)",
+                (key, time.time())
+            ).fetchone()
+            return row is not None
+        except sqlite3.Error:
+            return False
+
+    def clear(self):
+        try:
+            self._connection().execute("DELETE FROM cache")
+            return True
+        except sqlite3.Error as e:
+            logger.warning(f"SQLite cache clear failed: {str(e)}")
+            return False
+
+    def stats(self):
+        stats = self.cache_stats.as_dict()
+        try:
+            stats['entries'] = self._connection().execute(
+                "SELECT COUNT(*) FROM cache WHERE expires IS NULL OR expires > ?", (time.time(),)
+            ).fetchone()[0]
+            stats['file_bytes'] = os.path.getsize(self.path)
+        except (sqlite3.Error, OSError):
+            pass
+        stats['max_bytes'] = self.max_bytes
+        stats['path'] = self.path
+        return stats
+
+
+def compact_frame(df):
+    """
+    Downcast a history frame for storage: float32 prices, int64 volume, datetime64 dates
+
+    Returns:
+        DataFrame: A compact copy (other columns are kept as they are)
+    """
+    df = df.copy()
+    for col in PRICE_COLUMNS:
+        if col in df.columns and pd.api.types.is_float_dtype(df[col]):
+            df[col] = df[col].astype('float32')
+    if "Volume" in df.columns and not df["Volume"].isna().any():
+        df["Volume"] = df["Volume"].astype('int64')
+    if "Date" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["Date"]):
+        df["Date"] = pd.to_datetime(df["Date"], errors='coerce')
+    return df
+
+
+def widen_frame(df):
+    """Turn float32 columns back into float64, rounded so 150.23 doesn't come out as 150.22999572753906"""
+    float32_columns = [col for col in df.columns if df[col].dtype == np.float32]
+    if not float32_columns:
+        return df
+    df = df.copy()
+    for col in float32_columns:
+        df[col] = df[col].astype('float64').round(PRICE_DECIMALS)
+    return df
+
+
+def _map_frames(value, func):
+    """Apply func to a DataFrame value or to the DataFrames in a dict value (e.g. bar store entries)"""
+    if isinstance(value, pd.DataFrame):
+        return func(value)
+    if isinstance(value, dict):
+        return {k: func(v) if isinstance(v, pd.DataFrame) else v for k, v in value.items()}
+    return value
+
+
+def estimate_size(value):
+    """
+    Approximate the memory held by a cached value in bytes
+
+    DataFrames are measured with memory_usage(deep=True); dicts, lists and
+    tuples are measured recursively, anything else with sys.getsizeof.
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class MemoryBudgetCache(BaseCache):
+    """
+    Per-process in-memory cache bounded by a memory budget
+
+    Frames are stored with compact dtypes (see compact_frame) and their
+    actual byte size is accounted for. When the budget is exceeded, the least
+    recently used entries are evicted. Values are widened back to float64 on
+    read, so callers see the same dtypes as before.
+
+    Args:
+        budget_bytes (int): Maximum bytes held by cached values
+        default_timeout (int): Default timeout in seconds (0 means never expire)
+    """
+
+    def __init__(self, budget_bytes=int(CACHE_MEMORY_BUDGET_MB * 1024 * 1024), default_timeout=300):
+        super().__init__(default_timeout=default_timeout)
+        self.budget_bytes = budget_bytes
+        self.cache_stats = CacheStats("MemoryBudgetCache")
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, expires, size), least recently used first
+        self.bytes_used = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.rejected = 0
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        budget_mb = float(config.get("CACHE_MEMORY_BUDGET_MB") or CACHE_MEMORY_BUDGET_MB)
+        return cls(budget_bytes=int(budget_mb * 1024 * 1024), **_factory_options(kwargs))
+
+    def _expiry(self, timeout):
+        timeout = self._normalize_timeout(timeout)
+        return time.time() + timeout if timeout > 0 else None
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self.bytes_used -= size
+
+    def _live_entry(self, key):
+        """Return the entry for key, dropping it if expired (caller holds the lock)"""
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.time():
+            self._remove(key)
+            self.expirations += 1
+            return None
+        return entry
+
+    def _store(self, key, value, timeout):
+        value = _map_frames(value, compact_frame)
+        size = estimate_size(value)
+        if size > self.budget_bytes:
+            self.rejected += 1
+            logger.warning(f"Not caching {key}: {size} bytes exceed the {self.budget_bytes} byte budget")
+            return False
+
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (value, self._expiry(timeout), size)
+        self.bytes_used += size
+
+        while self.bytes_used > self.budget_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+            logger.debug(f"Evicted {oldest} from the memory cache")
+        return True
+
+    def get(self, key):
+        with self._lock:
+            entry = self._live_entry(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        self.cache_stats.record_get(entry is not None)
+        if entry is None:
+            return None
+        return _map_frames(entry[0], widen_frame)
+
+    def set(self, key, value, timeout=None):
+        with self._lock:
+            stored = self._store(key, value, timeout)
+        if stored:
+            self.cache_stats.record_set()
+        return stored
+
+    def add(self, key, value, timeout=None):
+        with self._lock:
+            if self._live_entry(key) is not None:
+                return False
+            stored = self._store(key, value, timeout)
+        if stored:
+            self.cache_stats.record_set()
+        return stored
+
+    def delete(self, key):
+        with self._lock:
+            existed = key in self._entries
+            if existed:
+                self._remove(key)
+        self.cache_stats.record_delete()
+        return existed
+
+    def has(self, key):
+        with self._lock:
+            return self._live_entry(key) is not None
+
+    def touch(self, key, timeout=None):
+        """Extend a live entry's expiry to at least timeout seconds from now, without rewriting it"""
+        with self._lock:
+            entry = self._live_entry(key)
+            if entry is None:
+                return False
+            value, expires, size = entry
+            new_expires = self._expiry(timeout)
+            if expires is not None and (new_expires is None or new_expires > expires):
+                self._entries[key] = (value, new_expires, size)
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes_used = 0
+        return True
+
+    def stats(self):
+        stats = self.cache_stats.as_dict()
+        with self._lock:
+            stats.update({
+                'entries': len(self._entries),
+                'bytes_used': self.bytes_used,
+                'budget_bytes': self.budget_bytes,
+                'budget_used_ratio': round(self.bytes_used / self.budget_bytes, 4) if self.budget_bytes else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'rejected': self.rejected
+            })
+        return stats
+
+
+# Short names accepted in the CACHE_TYPE environment variable
+CACHE_BACKENDS = {
+    "SimpleCache": "cache_backends.InstrumentedSimpleCache",
+    "SQLiteCache": "cache_backends.SQLiteCache",
+    "MemoryBudgetCache": "cache_backends.MemoryBudgetCache",
+}
+
+
+# Backends whose entries live in one process, so other gunicorn workers can't see them
+PROCESS_LOCAL_BACKENDS = {
+    CACHE_BACKENDS["SimpleCache"],
+    CACHE_BACKENDS["MemoryBudgetCache"],
+    "flask_caching.backends.SimpleCache",
+    "flask_caching.backends.NullCache",
+    "NullCache",
+}
+
+
+def is_shared_cache(cache_type):
+    """Return True when a resolved CACHE_TYPE is visible to every worker process"""
+    return cache_type not in PROCESS_LOCAL_BACKENDS
+
+
+def resolve_cache_type(name):
+    """
+    Map a CACHE_TYPE setting to an importable Flask-Caching backend
+
+    Args:
+        name (str): Short backend name (SimpleCache, SQLiteCache, MemoryBudgetCache) or a dotted import path
+
+    Returns:
+        str: Import path that Flask-Caching can load
+    """
+    if not name:
+        return CACHE_BACKENDS["SQLiteCache"]
+    return CACHE_BACKENDS.get(name, name)
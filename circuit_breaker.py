@@ -0,0 +1,193 @@
+"""
+Circuit breakers for the upstream data sources.
+
+Each source (scraper, yfinance API) gets a breaker that tracks the outcome
+and latency of its recent calls. When most recent calls fail, for example
+because Yahoo serves "Access Denied" to our IPs, the breaker opens and the
+source is skipped immediately instead of burning retries and backoff on
+every request. After a cool-down one probe call is let through (half-open);
+if it succeeds the breaker closes again.
+
+Only exceptions and a None result (blocked, unusable or failed responses)
+count as failures. The sources return an empty frame only when the range
+verifiably has no bars (e.g. before a ticker's listing date), which counts
+as a success, so long-range requests for young tickers can't open the
+breakers. Empty yfinance downloads that carry an error (rate limits,
+network or HTTP errors) come back as None and count as failures.
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Failure ratio over the recent window that opens the breaker
+CIRCUIT_FAILURE_THRESHOLD = float(os.environ.get('CIRCUIT_FAILURE_THRESHOLD', 0.5))
+
+# Calls needed in the window before the breaker can open
+CIRCUIT_MIN_CALLS = int(os.environ.get('CIRCUIT_MIN_CALLS', 5))
+
+# Seconds an open breaker waits before letting a probe through
+CIRCUIT_RECOVERY_SECONDS = float(os.environ.get('CIRCUIT_RECOVERY_SECONDS', 60))
+
+# Only calls from the last CIRCUIT_WINDOW_SECONDS count towards the failure ratio
+CIRCUIT_WINDOW_SECONDS = float(os.environ.get('CIRCUIT_WINDOW_SECONDS', 600))
+
+
+class CircuitBreaker:
+    """
+    Track recent success rate and latency of one data source
+
+    Args:
+        name (str): Source name shown in the health report
+        failure_threshold (float): Failure ratio that opens the breaker
+        min_calls (int): Minimum calls in the window before it can open
+        recovery_timeout (float): Seconds to stay open before probing
+        window_seconds (float): Age limit of the calls that are considered
+        max_samples (int): Maximum calls kept in the window
+    """
+
+    def __init__(self, name, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, min_calls=CIRCUIT_MIN_CALLS,
+                 recovery_timeout=CIRCUIT_RECOVERY_SECONDS, window_seconds=CIRCUIT_WINDOW_SECONDS,
+                 max_samples=100):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.min_calls = min_calls
+        self.recovery_timeout = recovery_timeout
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=max_samples)  # (timestamp, success, latency)
+        self._state = CLOSED
+        self._opened_at = None
+        self._probe_in_flight = False
+        self._times_opened = 0
+        self._rejected = 0
+
+    def _prune(self, now):
+        while self._samples and now - self._samples[0][0] > self.window_seconds:
+            self._samples.popleft()
+
+    def _failure_ratio(self):
+        if not self._samples:
+            return 0.0
+        failures = sum(1 for _, success, _ in self._samples if not success)
+        return failures / len(self._samples)
+
+    def _open(self, now):
+        self._state = OPEN
+        self._opened_at = now
+        self._times_opened += 1
+        logger.warning(f"Circuit for {self.name} opened (failure ratio {self._failure_ratio():.0%})")
+
+    def allow_request(self):
+        """
+        Decide whether a call to the source may go ahead
+
+        Returns:
+            bool: False while the breaker is open (or a half-open probe is already running)
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._state == OPEN and now - self._opened_at >= self.recovery_timeout:
+                self._state = HALF_OPEN
+                self._probe_in_flight = False
+                logger.info(f"Circuit for {self.name} half-open, sending a probe")
+
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+
+            self._rejected += 1
+            return False
+
+    def record(self, success, latency):
+        """
+        Record the outcome of a call
+
+        Args:
+            success (bool): Whether the source answered (a verified empty frame counts as an answer)
+            latency (float): Call duration in seconds
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._samples.append((now, success, latency))
+            self._prune(now)
+
+            if self._state == HALF_OPEN:
+                self._probe_in_flight = False
+                if success:
+                    logger.info(f"Circuit for {self.name} closed after successful probe")
+                    self._state = CLOSED
+                    self._samples.clear()
+                    self._samples.append((now, success, latency))
+                else:
+                    self._open(now)
+            elif (self._state == CLOSED and not success
+                  and len(self._samples) >= self.min_calls
+                  and self._failure_ratio() >= self.failure_threshold):
+                self._open(now)
+
+    def call(self, fn, *args):
+        """
+        Run fn(*args) through the breaker
+
+        Returns:
+            The function's result, or None without calling it when the breaker is open
+        """
+        if not self.allow_request():
+            logger.info(f"Circuit for {self.name} is open, skipping the call")
+            return None
+
+        start = time.monotonic()
+        try:
+            result = fn(*args)
+        except Exception:
+            self.record(False, time.monotonic() - start)
+            raise
+        self.record(result is not None, time.monotonic() - start)
+        return result
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def snapshot(self):
+        """Current state, recent success rate and latency of the source"""
+        with self._lock:
+            self._prune(time.monotonic())
+            latencies = sorted(latency for _, _, latency in self._samples)
+            calls = len(self._samples)
+            failure_ratio = self._failure_ratio()
+
+        report = {
+            'source': self.name,
+            'state': self.state,
+            'recent_calls': calls,
+            'success_rate': round(1 - failure_ratio, 4) if calls else None,
+            'avg_latency_s': round(sum(latencies) / calls, 3) if calls else None,
+            'p95_latency_s': round(latencies[min(calls - 1, int(calls * 0.95))], 3) if calls else None,
+            'times_opened': self._times_opened,
+            'rejected_calls': self._rejected
+        }
+        if self._state == OPEN:
+            report['retry_in_s'] = round(max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at)), 1)
+        return report
+
+
+# One breaker per data source, per worker process
+breakers = {
+    "scrape": CircuitBreaker("scrape"),
+    "api": CircuitBreaker("api"),
+}
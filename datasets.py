@@ -0,0 +1,127 @@
+"""
+Content-addressed store for the datasets behind download ids.
+
+Every results page gets its own download id, but most of them show the same
+data (many users looking at the same AAPL range). The frame is therefore
+stored once under a key derived from its content, and a download id is only
+a small handle pointing at it. Creating or using a handle extends the
+dataset's expiry to outlive the handle, so memory grows with the number of
+distinct datasets rather than with page views.
+"""
+
+import os
+import uuid
+import hashlib
+import logging
+
+import pandas as pd
+
+from cache_backends import compact_frame, widen_frame
+from metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# How long a download id stays valid after it was created or last used
+DOWNLOAD_TTL_SECONDS = int(os.environ.get('DOWNLOAD_TTL_SECONDS', 1800))
+
+
+def canonical_frame(df):
+    """
+    The form a frame is hashed in, independent of how it was stored
+
+    Prices go through the float32 round trip MemoryBudgetCache applies (which
+    leaves already round-tripped values unchanged) and dates use one
+    resolution, so a fresh upstream frame and its cached copy hash the same.
+    """
+    df = widen_frame(compact_frame(df))
+    if "Date" in df.columns and pd.api.types.is_datetime64_any_dtype(df["Date"]):
+        df = df.assign(Date=df["Date"].astype('datetime64[ns]'))
+    return df
+
+
+def dataset_key(df, ticker):
+    """
+    Key a frame by its content, so identical results share one cache entry
+
+    Args:
+        df (DataFrame): The dataset
+        ticker (str): Ticker symbol, kept in the key for readability
+
+    Returns:
+        str: Cache key like dataset_AAPL_<hash>
+    """
+    row_hashes = pd.util.hash_pandas_object(canonical_frame(df), index=False).to_numpy()
+    digest = hashlib.blake2b(row_hashes.tobytes(), digest_size=16)
+    digest.update(",".join(map(str, df.columns)).encode())
+    return f"dataset_{ticker}_{digest.hexdigest()}"
+
+
+class DatasetStore:
+    """
+    Download handles referencing shared, immutable datasets
+
+    Args:
+        cache: Flask-Caching Cache used for handles and datasets
+        timeout (int): Lifetime of a handle in seconds, refreshed on use
+    """
+
+    def __init__(self, cache, timeout=DOWNLOAD_TTL_SECONDS):
+        self.cache = cache
+        self.timeout = timeout
+
+    @staticmethod
+    def _handle_key(download_id):
+        return f"download_{download_id}"
+
+    def _extend(self, key, value=None):
+        """Make sure an entry lives at least as long as a fresh handle"""
+        backend = self.cache.cache
+        if hasattr(backend, 'touch'):
+            return backend.touch(key, self.timeout)
+        # Backends without touch() have to rewrite the value
+        value = value if value is not None else self.cache.get(key)
+        return value is not None and self.cache.set(key, value, timeout=self.timeout)
+
+    def publish(self, df, meta):
+        """
+        Store a dataset (once per distinct content) and create a new handle for it
+
+        Args:
+            df (DataFrame): Historical stock data
+            meta (dict): ticker, start_date, end_date and source of the data
+
+        Returns:
+            str: The download id
+        """
+        key = dataset_key(df, meta['ticker'])
+        if not self.cache.add(key, df, timeout=self.timeout):
+            # Already stored by an earlier request, just keep it alive for the new handle
+            if not self._extend(key, df):
+                self.cache.set(key, df, timeout=self.timeout)
+            logger.debug(f"Reusing cached dataset {key}")
+
+        download_id = str(uuid.uuid4())
+        self.cache.set(self._handle_key(download_id), dict(meta, dataset=key), timeout=self.timeout)
+        return download_id
+
+    def load(self, download_id, touch=True):
+        """
+        Resolve a download id
+
+        Args:
+            download_id (str): Handle returned by publish()
+            touch (bool): Extend the handle and its dataset for another timeout
+
+        Returns:
+            tuple: (DataFrame, meta dict), or (None, None) if the handle or dataset expired
+        """
+        handle = self.cache.get(self._handle_key(download_id))
+        df = self.cache.get(handle['dataset']) if handle is not None else None
+        CACHE_REQUESTS.inc(kind="dataset", result="miss" if df is None else "hit")
+        if df is None:
+            return None, None
+        if touch:
+            self._extend(self._handle_key(download_id), handle)
+            self._extend(handle['dataset'], df)
+        meta = {k: v for k, v in handle.items() if k != 'dataset'}
+        return df, meta
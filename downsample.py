@@ -0,0 +1,80 @@
+"""
+Largest-Triangle-Three-Buckets (LTTB) downsampling for the price chart.
+
+LTTB keeps the visual shape of a line chart with a fixed number of points by
+picking, in each bucket, the point that forms the largest triangle with the
+point chosen in the previous bucket and the average of the next bucket.
+"""
+
+import numpy as np
+
+
+def lttb_indices(x, y, threshold):
+    """
+    Pick the indices of the points LTTB keeps
+
+    Each bucket's choice depends on the previous bucket's, so buckets are
+    walked in order, but everything inside a bucket (triangle areas over all
+    candidate points) is computed with vectorized NumPy operations.
+
+    Args:
+        x (ndarray): Monotonic x values (e.g. dates as integers)
+        y (ndarray): Values of the series to preserve
+        threshold (int): Number of points to keep (at least 3)
+
+    Returns:
+        ndarray: Sorted indices into x/y, first and last point always included
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+
+    # Bucket boundaries for the n - 2 inner points
+    edges = np.linspace(1, n - 1, threshold - 1).astype('int64')
+
+    # Average point of every bucket, used as the third triangle corner
+    counts = np.diff(edges)
+    sums_x = np.add.reduceat(x[:n - 1], edges[:-1])
+    sums_y = np.add.reduceat(y[:n - 1], edges[:-1])
+    avg_x = np.append(sums_x / counts, x[-1])
+    avg_y = np.append(sums_y / counts, y[-1])
+
+    selected = np.empty(threshold, dtype='int64')
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_x, next_y = avg_x[bucket + 1], avg_y[bucket + 1]
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+
+    return selected
+
+
+def downsample_frame(df, x_column, y_column, threshold):
+    """
+    Downsample a frame with LTTB on one column, keeping whole rows
+
+    Args:
+        df (DataFrame): Data sorted by x_column
+        x_column (str): Column used as x (datetime or numeric)
+        y_column (str): Column whose shape is preserved
+        threshold (int): Number of rows to keep
+
+    Returns:
+        DataFrame: The selected rows
+    """
+    x = df[x_column].to_numpy()
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.astype('datetime64[s]').astype('int64')
+    indices = lttb_indices(x, df[y_column].to_numpy(dtype='float64'), threshold)
+    return df.iloc[indices]
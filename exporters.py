@@ -0,0 +1,222 @@
+"""
+Export helpers for the /download route.
+
+The original export builds the whole workbook in a BytesIO and copies it into
+a bytes object. The streaming export writes rows one by one with xlsxwriter's
+constant_memory mode into a spooled temporary file (kept in memory while
+small, moved to disk when large) and streams the response in chunks, so peak
+memory stays flat for multi-year or multi-ticker workbooks.
+
+Besides xlsx, the data can be exported as CSV (streamed by a generator),
+Parquet and Arrow IPC; the last two are written with pyarrow straight from
+the frame's column buffers.
+"""
+
+import io
+import os
+import tempfile
+import logging
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+# pyarrow is optional: it is only needed for the Parquet and Arrow exports
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+EXCEL_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# streaming (constant memory) or memory (the original BytesIO export)
+EXCEL_EXPORT_MODE = os.environ.get('EXCEL_EXPORT_MODE', 'streaming')
+
+# Size of the chunks streamed to the client
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+# Spooled files above this size are moved from memory to disk
+SPOOL_MAX_SIZE = 1024 * 1024
+
+# Rows per chunk in the CSV stream
+CSV_CHUNK_ROWS = 5000
+
+# Export format -> (file extension, mimetype)
+EXPORT_FORMATS = {
+    'xlsx': ('xlsx', EXCEL_MIMETYPE),
+    'csv': ('csv', 'text/csv'),
+    'parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'arrow': ('arrow', 'application/vnd.apache.arrow.file'),
+}
+
+# Formats that need pyarrow
+ARROW_FORMATS = ('parquet', 'arrow')
+
+
+def _sheet_name(ticker):
+    # Excel limits sheet names to 31 characters
+    return f"{ticker} History"[:31]
+
+
+def build_excel_in_memory(df, ticker):
+    """
+    Build the workbook with pandas in a BytesIO (the original export path)
+
+    Args:
+        df (DataFrame): Historical stock data
+        ticker (str): Ticker symbol used for the sheet name
+
+    Returns:
+        bytes: The xlsx file
+    """
+    sheet_name = _sheet_name(ticker)
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        df.to_excel(writer, sheet_name=sheet_name, index=False)
+
+        # Configure workbook
+        workbook = writer.book
+        worksheet = writer.sheets[sheet_name]
+
+        # Format for dates
+        date_format = workbook.add_format({'num_format': 'yyyy-mm-dd'})
+        worksheet.set_column('A:A', 12, date_format)
+
+        # Format for numbers
+        number_format = workbook.add_format({'num_format': '0.00'})
+        worksheet.set_column('B:F', 12, number_format)
+
+        # Format for volume
+        volume_format = workbook.add_format({'num_format': '#,##0'})
+        worksheet.set_column('G:G', 15, volume_format)
+
+    output.seek(0)
+    return output.read()
+
+
+def write_excel_streaming(df, ticker):
+    """
+    Write the workbook row by row in constant-memory mode to a spooled temp file
+
+    Args:
+        df (DataFrame): Historical stock data with a Date column first
+        ticker (str): Ticker symbol used for the sheet name
+
+    Returns:
+        SpooledTemporaryFile: The xlsx file, positioned at the start
+    """
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True,
+                                            'tmpdir': tempfile.gettempdir()})
+    worksheet = workbook.add_worksheet(_sheet_name(ticker))
+
+    header_format = workbook.add_format({'bold': True, 'border': 1, 'align': 'center'})
+    date_format = workbook.add_format({'num_format': 'yyyy-mm-dd'})
+    number_format = workbook.add_format({'num_format': '0.00'})
+    volume_format = workbook.add_format({'num_format': '#,##0'})
+
+    worksheet.set_column('A:A', 12, date_format)
+    worksheet.set_column('B:F', 12, number_format)
+    worksheet.set_column('G:G', 15, volume_format)
+
+    # constant_memory mode flushes each row once the next one starts, so rows
+    # have to be written strictly in order
+    columns = list(df.columns)
+    worksheet.write_row(0, 0, columns, header_format)
+
+    arrays = []
+    for name in columns:
+        series = df[name]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            # to_pydatetime() returns a Series in pandas 3, index it by position like the other columns
+            arrays.append(('date', np.asarray(series.dt.to_pydatetime(), dtype=object)))
+        elif pd.api.types.is_numeric_dtype(series):
+            arrays.append(('number', series.to_numpy(dtype='float64', na_value=np.nan)))
+        else:
+            arrays.append(('string', series.astype(object).to_numpy()))
+
+    for row in range(len(df)):
+        for col, (kind, values) in enumerate(arrays):
+            value = values[row]
+            if kind == 'number':
+                if np.isnan(value):
+                    worksheet.write_blank(row + 1, col, None)
+                else:
+                    worksheet.write_number(row + 1, col, value)
+            elif kind == 'date':
+                if pd.isna(value):
+                    worksheet.write_blank(row + 1, col, None)
+                else:
+                    worksheet.write_datetime(row + 1, col, value, date_format)
+            else:
+                worksheet.write(row + 1, col, value)
+
+    workbook.close()
+    output.seek(0)
+    return output
+
+
+def iter_file_chunks(fileobj, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield a file's content in chunks and close it when done"""
+    try:
+        while True:
+            chunk = fileobj.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        fileobj.close()
+
+
+def iter_csv(df, chunk_rows=CSV_CHUNK_ROWS):
+    """
+    Yield the frame as CSV text, a chunk of rows at a time
+
+    Args:
+        df (DataFrame): Historical stock data
+        chunk_rows (int): Rows formatted per yielded chunk
+
+    Yields:
+        str: The header line first, then blocks of CSV rows
+    """
+    yield ",".join(str(column) for column in df.columns) + "\n"
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows].to_csv(header=False, index=False,
+                                                       date_format='%Y-%m-%d')
+
+
+def _arrow_table(df):
+    # Built from the frame's column buffers, numeric columns are not copied
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def write_parquet(df):
+    """
+    Write the frame as Parquet into a spooled temp file
+
+    Returns:
+        SpooledTemporaryFile: The Parquet file, positioned at the start
+    """
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    pq.write_table(_arrow_table(df), output, compression='snappy')
+    output.seek(0)
+    return output
+
+
+def write_arrow_ipc(df):
+    """
+    Write the frame as an Arrow IPC file into a spooled temp file
+
+    Returns:
+        SpooledTemporaryFile: The Arrow file, positioned at the start
+    """
+    table = _arrow_table(df)
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    with pa.ipc.new_file(output, table.schema) as writer:
+        writer.write_table(table)
+    output.seek(0)
+    return output
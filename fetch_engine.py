@@ -0,0 +1,141 @@
+"""
+Concurrent fetch engine for ticker/range jobs.
+
+Jobs run in a bounded, process-wide thread pool and results are handed back
+as they complete. Independently of the pool size, HostLimiter caps how many
+requests are in flight to each upstream host (finance.yahoo.com and the
+yfinance query hosts) so fan-out doesn't get us blocked.
+"""
+
+import os
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+
+from request_timing import worker_thread
+
+logger = logging.getLogger(__name__)
+
+# Size of the shared worker pool
+FETCH_MAX_WORKERS = int(os.environ.get('FETCH_MAX_WORKERS', 8))
+
+# Maximum concurrent requests to a single upstream host
+MAX_CONNECTIONS_PER_HOST = int(os.environ.get('YAHOO_MAX_CONNECTIONS_PER_HOST', 4))
+
+
+class HostLimiter:
+    """Per-host semaphores that cap in-flight requests to each upstream host"""
+
+    def __init__(self, limit=MAX_CONNECTIONS_PER_HOST):
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._semaphores = {}
+
+    def _semaphore(self, host):
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.limit)
+            return self._semaphores[host]
+
+    @contextmanager
+    def slot(self, url_or_host):
+        """
+        Hold one of the host's request slots for the duration of the block
+
+        Args:
+            url_or_host (str): Full URL or bare host name
+        """
+        host = urlparse(url_or_host).netloc or url_or_host
+        semaphore = self._semaphore(host)
+        semaphore.acquire()
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+
+class FetchEngine:
+    """
+    Bounded thread pool that runs fetch jobs and yields results as they complete
+
+    Calls made from inside one of the engine's own worker threads run inline,
+    so nested fan-out (e.g. a batch of tickers that each split into date
+    windows) can't deadlock the pool.
+
+    Args:
+        max_workers (int): Number of worker threads
+    """
+
+    def __init__(self, max_workers=FETCH_MAX_WORKERS):
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _get_executor(self):
+        # Created lazily so gunicorn's pre-fork master never owns the threads
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix="fetch")
+            return self._executor
+
+    def _run(self, fn, item):
+        self._local.in_worker = True
+        try:
+            with worker_thread():
+                return fn(*item)
+        finally:
+            self._local.in_worker = False
+
+    def _submit(self, executor, fn, item):
+        # Each job runs in a copy of the caller's context, so request timing follows it into the pool
+        return executor.submit(contextvars.copy_context().run, self._run, fn, item)
+
+    def _run_safely(self, fn, item):
+        try:
+            return fn(*item)
+        except Exception as e:
+            logger.error(f"Fetch job {item} failed: {str(e)}")
+            return None
+
+    def imap_unordered(self, fn, jobs):
+        """
+        Run fn(*job) for every job and yield (job, result) as each one finishes
+
+        Args:
+            fn (callable): Function to run for each job
+            jobs (iterable): Argument tuples, one per job
+
+        Yields:
+            tuple: (job, result), with result None if the job raised
+        """
+        jobs = [tuple(job) for job in jobs]
+
+        if len(jobs) <= 1 or getattr(self._local, 'in_worker', False):
+            for job in jobs:
+                yield job, self._run_safely(fn, job)
+            return
+
+        executor = self._get_executor()
+        futures = {self._submit(executor, fn, job): job for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error(f"Fetch job {job} failed: {str(e)}")
+                result = None
+            yield job, result
+
+    def submit(self, fn, *args):
+        """Schedule a single job on the pool and return its Future"""
+        return self._submit(self._get_executor(), fn, args)
+
+
+# Process-wide instances shared by the scraper, the API layer and the app
+host_limiter = HostLimiter()
+engine = FetchEngine()
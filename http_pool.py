@@ -0,0 +1,103 @@
+"""
+Process-wide pooled HTTP session for the HTML scraper.
+
+A single requests.Session per worker process keeps TCP/TLS connections to
+Yahoo alive between fetches and retries, and holds on to cookies (including
+Yahoo's consent cookies) so later requests look like the same browser.
+"""
+
+import os
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from fetch_engine import MAX_CONNECTIONS_PER_HOST
+
+logger = logging.getLogger(__name__)
+
+# Connections kept alive per host, defaults to the per-host concurrency limit
+SCRAPER_POOL_SIZE = int(os.environ.get('SCRAPER_POOL_SIZE', MAX_CONNECTIONS_PER_HOST))
+
+# Number of distinct hosts to keep pools for
+SCRAPER_POOL_HOSTS = int(os.environ.get('SCRAPER_POOL_HOSTS', 10))
+
+_session = None
+_session_pid = None
+_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Return the process-wide pooled session, creating it on first use
+
+    The session is recreated after a fork so gunicorn workers never share
+    sockets with the master process.
+
+    Returns:
+        requests.Session: Shared session with keep-alive connection pools
+    """
+    global _session, _session_pid
+    with _lock:
+        if _session is None or _session_pid != os.getpid():
+            session = requests.Session()
+            # Retries are handled by the scraper so it can back off and rotate user agents
+            adapter = HTTPAdapter(pool_connections=SCRAPER_POOL_HOSTS,
+                                  pool_maxsize=SCRAPER_POOL_SIZE,
+                                  max_retries=0)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+            _session_pid = os.getpid()
+            logger.info(f"Created pooled HTTP session (pool size {SCRAPER_POOL_SIZE})")
+        return _session
+
+
+def reset_session():
+    """Drop the shared session and its cookies, e.g. after being blocked"""
+    global _session
+    with _lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def session_stats():
+    """
+    Report connection reuse for the shared session
+
+    Returns:
+        dict: Per-host request and new-connection counts plus overall reuse ratio
+    """
+    with _lock:
+        session = _session
+
+    stats = {'pid': os.getpid(), 'pool_size': SCRAPER_POOL_SIZE, 'hosts': {},
+             'requests': 0, 'connections_opened': 0, 'cookies': 0}
+    if session is None:
+        stats['reuse_ratio'] = 0.0
+        return stats
+
+    stats['cookies'] = len(session.cookies)
+    seen = set()
+    for adapter in session.adapters.values():
+        if id(adapter) in seen:
+            continue
+        seen.add(id(adapter))
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host = f"{pool.scheme}://{pool.host}"
+            stats['hosts'][host] = {
+                'requests': pool.num_requests,
+                'connections_opened': pool.num_connections
+            }
+            stats['requests'] += pool.num_requests
+            stats['connections_opened'] += pool.num_connections
+
+    reused = stats['requests'] - stats['connections_opened']
+    stats['reuse_ratio'] = round(reused / stats['requests'], 4) if stats['requests'] else 0.0
+    return stats
@@ -0,0 +1,102 @@
+"""
+Background fetch jobs.
+
+In async mode /scrape doesn't do network I/O in the request: it enqueues the
+fetch on an in-process executor and returns a job id right away, and the page
+polls /jobs/<job_id> until the result is in the cache. Job state lives in the
+shared cache, so a poll served by any gunicorn worker sees it.
+"""
+
+import os
+import time
+import uuid
+import logging
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Threads per worker process that run background fetches
+JOB_MAX_WORKERS = int(os.environ.get('JOB_MAX_WORKERS', 4))
+
+# How long finished job records stay pollable
+JOB_TTL_SECONDS = int(os.environ.get('JOB_TTL_SECONDS', 3600))
+
+
+class JobQueue:
+    """
+    Run functions in the background and track their status in the cache
+
+    The function must return a JSON-serializable dict, which becomes the job's
+    result; raising an exception marks the job as failed.
+
+    Args:
+        cache: Flask-Caching Cache used to store job records
+        max_workers (int): Number of background threads
+    """
+
+    def __init__(self, cache, max_workers=JOB_MAX_WORKERS):
+        self.cache = cache
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # Created on first use so threads are started in the worker, not the gunicorn master
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+            return self._executor
+
+    @staticmethod
+    def _key(job_id):
+        return f"job_{job_id}"
+
+    def _update(self, job_id, **fields):
+        record = self.cache.get(self._key(job_id)) or {}
+        record.update(fields, updated=time.time())
+        self.cache.set(self._key(job_id), record, timeout=JOB_TTL_SECONDS)
+
+    def submit(self, fn, *args, description=""):
+        """
+        Enqueue fn(*args) and return the job id immediately
+
+        Args:
+            fn (callable): Work to run in the background
+            description (str): Short label shown while polling
+
+        Returns:
+            str: Job id
+        """
+        job_id = str(uuid.uuid4())
+        self.cache.set(self._key(job_id), {
+            'id': job_id,
+            'status': PENDING,
+            'description': description,
+            'created': time.time(),
+            'updated': time.time()
+        }, timeout=JOB_TTL_SECONDS)
+        self._get_executor().submit(self._run, job_id, fn, args)
+        logger.info(f"Queued job {job_id}: {description}")
+        return job_id
+
+    def _run(self, job_id, fn, args):
+        self._update(job_id, status=RUNNING)
+        try:
+            result = fn(*args)
+            self._update(job_id, status=DONE, result=result)
+            logger.info(f"Job {job_id} finished")
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {str(e)}")
+            logger.error(traceback.format_exc())
+            self._update(job_id, status=FAILED, error=str(e))
+
+    def get(self, job_id):
+        """Return the job record (status, result or error), or None if unknown or expired"""
+        return self.cache.get(self._key(job_id))
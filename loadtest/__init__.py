@@ -0,0 +1 @@
+"""Load-test harness: a local Yahoo Finance stand-in and a concurrent load generator."""
@@ -0,0 +1,201 @@
+"""
+Local stand-in for Yahoo Finance, so load tests never hit the real site.
+
+Usage:
+    python -m loadtest.mock_yahoo [--port 8900] [--latency 0.2] [--jitter 0.1]
+                                  [--error-rate 0.01] [--block-rate 0.01] [--throttle-rate 0.01]
+
+Serves:
+    /quote/<TICKER>/history/?period1=..&period2=..    history page (table plus embedded chart JSON)
+    /v8/finance/chart/<TICKER>?period1=..&period2=..  chart API JSON
+    /stats                                            request counts by kind and outcome
+
+Point the app at it with YAHOO_BASE_URL and YAHOO_CHART_BASE_URL set to
+http://127.0.0.1:<port>. Every request sleeps for the latency plus a uniform
+random jitter, then fails with the configured probabilities: a 500, a 200 page
+saying "Access Denied" (what the scraper treats as a block) or a 429. The bars
+are synthetic and deterministic per ticker and period.
+"""
+
+import json
+import zlib
+import random
+import time
+import logging
+import argparse
+import datetime
+import threading
+from collections import Counter
+from functools import lru_cache
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+import pandas as pd
+
+from benchmarks.fixtures import generate_history_page, generate_history_rows, chart_response
+
+logger = logging.getLogger(__name__)
+
+BLOCKED_PAGE = "<html><head><title>Access Denied</title></head><body>Access Denied</body></html>"
+
+
+def _period(query):
+    """Rows and newest date for the period1/period2 query parameters (period2 is exclusive)"""
+    period1 = int(query.get('period1', [0])[0])
+    period2 = int(query.get('period2', [period1])[0])
+    start = datetime.datetime.fromtimestamp(period1, datetime.timezone.utc).date()
+    end = datetime.datetime.fromtimestamp(period2, datetime.timezone.utc).date() - datetime.timedelta(days=1)
+    rows = len(pd.bdate_range(start, end)) if end >= start else 0
+    return rows, end
+
+
+@lru_cache(maxsize=512)
+def history_page(ticker, rows, end, embed_json=True):
+    return generate_history_page(rows, seed=zlib.crc32(ticker.encode()), embed_json=embed_json, end_date=end)
+
+
+@lru_cache(maxsize=512)
+def chart_body(ticker, rows, end):
+    rows_data = generate_history_rows(rows, seed=zlib.crc32(ticker.encode()), end_date=end)
+    return json.dumps(chart_response(rows_data, ticker))
+
+
+class MockYahooServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server answering history page and chart API requests
+
+    Args:
+        address (tuple): (host, port) to listen on
+        latency (float): Seconds every response is delayed
+        jitter (float): Extra random delay of up to this many seconds
+        error_rate (float): Probability of a 500 response
+        block_rate (float): Probability of an "Access Denied" page
+        throttle_rate (float): Probability of a 429 response
+        embed_json (bool): Embed the chart JSON in history pages (False makes the scraper parse the table)
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, jitter=0.0, error_rate=0.0, block_rate=0.0,
+                 throttle_rate=0.0, embed_json=True):
+        super().__init__(address, MockYahooHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.block_rate = block_rate
+        self.throttle_rate = throttle_rate
+        self.embed_json = embed_json
+        self.stats = Counter()
+        self._stats_lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record(self, kind, outcome):
+        with self._stats_lock:
+            self.stats[f"{kind}_{outcome}"] += 1
+
+    def injected_failure(self):
+        """Pick an injected failure for one request, or None"""
+        roll = random.random()
+        for outcome, rate in (('error', self.error_rate), ('blocked', self.block_rate),
+                              ('throttled', self.throttle_rate)):
+            if roll < rate:
+                return outcome
+            roll -= rate
+        return None
+
+
+class MockYahooHandler(BaseHTTPRequestHandler):
+    # Keep-alive like the real site, so the app's connection pool is exercised
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split('/') if part]
+
+        if parts == ['stats']:
+            with self.server._stats_lock:
+                self._send(200, json.dumps(self.server.stats), 'application/json')
+            return
+        if len(parts) == 3 and parts[0] == 'quote' and parts[2] == 'history':
+            kind = 'history'
+        elif len(parts) == 4 and parts[:3] == ['v8', 'finance', 'chart']:
+            kind = 'chart'
+        else:
+            self._send(404, "Not Found", 'text/plain')
+            return
+
+        delay = self.server.latency + random.uniform(0, self.server.jitter)
+        if delay:
+            time.sleep(delay)
+
+        failure = self.server.injected_failure()
+        if failure:
+            self.server.record(kind, failure)
+            if failure == 'blocked':
+                self._send(200, BLOCKED_PAGE, 'text/html')
+            else:
+                status = 500 if failure == 'error' else 429
+                self._send(status, f"Injected {failure} response", 'text/plain')
+            return
+
+        ticker = parts[1].upper() if kind == 'history' else parts[3].upper()
+        rows, end = _period(parse_qs(url.query))
+        if kind == 'history':
+            self._send(200, history_page(ticker, rows, end, self.server.embed_json), 'text/html; charset=utf-8')
+        else:
+            self._send(200, chart_body(ticker, rows, end), 'application/json')
+        self.server.record(kind, 'ok')
+
+    def _send(self, status, body, content_type):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+def start_server(host="127.0.0.1", port=0, **options):
+    """
+    Run a mock server in a background thread
+
+    Args:
+        host (str): Interface to listen on
+        port (int): Port to listen on (0 picks a free one)
+        **options: MockYahooServer options
+
+    Returns:
+        MockYahooServer: The running server; call shutdown() to stop it
+    """
+    server = MockYahooServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, name="mock-yahoo", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds every response is delayed")
+    parser.add_argument("--jitter", type=float, default=0.1, help="extra random delay of up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability of a 500 response")
+    parser.add_argument("--block-rate", type=float, default=0.0, help="probability of an Access Denied page")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="probability of a 429 response")
+    parser.add_argument("--table-only", action="store_true", help="serve history pages without embedded JSON")
+    args = parser.parse_args()
+
+    server = MockYahooServer((args.host, args.port), latency=args.latency, jitter=args.jitter,
+                             error_rate=args.error_rate, block_rate=args.block_rate,
+                             throttle_rate=args.throttle_rate, embed_json=not args.table_only)
+    print(f"Mock Yahoo Finance listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
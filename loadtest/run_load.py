@@ -0,0 +1,239 @@
+"""
+Drive the app with concurrent users and report throughput and latency percentiles.
+
+Usage:
+    # Against an app that is already running (pointed at a mock or not)
+    python -m loadtest.run_load --url http://127.0.0.1:5000 [--concurrency 16] [--duration 30]
+
+    # Start the mock upstream and gunicorn for every worker/cache combination
+    python -m loadtest.run_load --workers 1,2,4 --cache SimpleCache,SQLiteCache [--latency 0.2]
+
+Each simulated user keeps its own session and loops: POST /scrape for a random
+ticker out of --tickers symbols (a small pool means mostly cache hits, a large
+one mostly upstream fetches), then with probability --download-ratio GET
+/download of the result. For every endpoint the report lists the request
+count, throughput, outcomes and p50/p95/p99 latency; --json saves it.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import datetime
+import tempfile
+import threading
+import subprocess
+from collections import Counter, defaultdict
+
+import requests
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Seconds to wait for a spawned gunicorn to answer
+STARTUP_TIMEOUT = 60
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, int(round(len(ordered) * fraction)) - 1))]
+
+
+def _scrape_outcome(response):
+    if response.status_code != 200:
+        return str(response.status_code)
+    if 'id="results-table"' in response.text:
+        return 'results'
+    if 'id="job-status"' in response.text:
+        return 'pending'
+    return 'no_data'
+
+
+class LoadRun:
+    """
+    Latencies and outcomes of one load run, recorded by all user threads
+
+    Args:
+        base_url (str): Root URL of the app
+        tickers (int): Size of the ticker pool users pick from
+        range_days (int): Length of the requested date range
+        download_ratio (float): Probability that a scrape is followed by a download
+    """
+
+    def __init__(self, base_url, tickers=50, range_days=365, download_ratio=0.2):
+        self.base_url = base_url.rstrip('/')
+        self.tickers = [f"LT{i:03d}" for i in range(tickers)]
+        self.range_days = range_days
+        self.download_ratio = download_ratio
+        self.latencies = defaultdict(list)
+        self.outcomes = defaultdict(Counter)
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, seconds, outcome):
+        with self._lock:
+            self.latencies[endpoint].append(seconds)
+            self.outcomes[endpoint][outcome] += 1
+
+    def _timed(self, endpoint, send, classify):
+        start = time.perf_counter()
+        try:
+            response = send()
+            outcome = classify(response)
+        except requests.RequestException as e:
+            response, outcome = None, type(e).__name__
+        self.record(endpoint, time.perf_counter() - start, outcome)
+        return response, outcome
+
+    def user(self, deadline):
+        """One simulated user, looping until the deadline"""
+        session = requests.Session()
+        end = datetime.date.today() - datetime.timedelta(days=1)
+        start = end - datetime.timedelta(days=self.range_days)
+        while time.monotonic() < deadline:
+            form = {'ticker': random.choice(self.tickers), 'start_date': start.isoformat(),
+                    'end_date': end.isoformat()}
+            _, outcome = self._timed(
+                'scrape', lambda: session.post(f"{self.base_url}/scrape", data=form, timeout=120), _scrape_outcome)
+            if outcome == 'results' and random.random() < self.download_ratio:
+                self._timed('download', lambda: session.get(f"{self.base_url}/download", timeout=120),
+                            lambda response: str(response.status_code))
+
+    def run(self, concurrency, duration):
+        """
+        Run the users for a fixed time
+
+        Returns:
+            dict: Report with per-endpoint throughput, outcomes and latency percentiles
+        """
+        deadline = time.monotonic() + duration
+        started = time.monotonic()
+        threads = [threading.Thread(target=self.user, args=(deadline,), daemon=True) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        report = {'concurrency': concurrency, 'duration_s': round(elapsed, 1), 'endpoints': {}}
+        for endpoint, timings in self.latencies.items():
+            report['endpoints'][endpoint] = {
+                'requests': len(timings),
+                'throughput_rps': round(len(timings) / elapsed, 2),
+                'outcomes': dict(self.outcomes[endpoint]),
+                'p50_ms': round(percentile(timings, 0.50) * 1000, 1),
+                'p95_ms': round(percentile(timings, 0.95) * 1000, 1),
+                'p99_ms': round(percentile(timings, 0.99) * 1000, 1),
+                'max_ms': round(max(timings) * 1000, 1)
+            }
+        return report
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def spawn_app(workers, cache_type, upstream_url, workdir):
+    """
+    Start gunicorn serving main:app against the mock upstream
+
+    Returns:
+        tuple: (Popen, base URL)
+    """
+    port = _free_port()
+    env = dict(os.environ,
+               CACHE_TYPE=cache_type,
+               CACHE_SQLITE_PATH=os.path.join(workdir, f"cache-{cache_type}-{workers}.sqlite3"),
+               METRICS_DB_PATH=os.path.join(workdir, f"metrics-{cache_type}-{workers}.sqlite3"),
+               YAHOO_BASE_URL=upstream_url,
+               YAHOO_CHART_BASE_URL=upstream_url,
+               LOG_LEVEL=os.environ.get('LOG_LEVEL', 'WARNING'),
+               FLASK_ENV='production')
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--workers", str(workers), "--bind", f"127.0.0.1:{port}", "main:app"],
+        cwd=PROJECT_DIR, env=env)
+    base_url = f"http://127.0.0.1:{port}"
+
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with status {process.returncode}")
+        try:
+            requests.get(base_url, timeout=2)
+            return process, base_url
+        except requests.RequestException:
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f"gunicorn did not answer within {STARTUP_TIMEOUT}s")
+
+
+def print_report(label, report):
+    print(f"\n{label} (concurrency {report['concurrency']}, {report['duration_s']}s)")
+    print(f"{'endpoint':<10}{'requests':>10}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}  outcomes")
+    for endpoint, r in report['endpoints'].items():
+        outcomes = ", ".join(f"{k}={v}" for k, v in sorted(r['outcomes'].items()))
+        print(f"{endpoint:<10}{r['requests']:>10}{r['throughput_rps']:>9}{r['p50_ms']:>10}"
+              f"{r['p95_ms']:>10}{r['p99_ms']:>10}{r['max_ms']:>10}  {outcomes}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", help="app to load (otherwise gunicorn is started per configuration)")
+    parser.add_argument("--workers", default="2", help="comma separated gunicorn worker counts")
+    parser.add_argument("--cache", default="SQLiteCache", help="comma separated CACHE_TYPE values")
+    parser.add_argument("--concurrency", type=int, default=16, help="simulated users")
+    parser.add_argument("--duration", type=float, default=30, help="seconds per run")
+    parser.add_argument("--tickers", type=int, default=50, help="ticker pool size")
+    parser.add_argument("--range-days", type=int, default=365, help="length of the requested date range")
+    parser.add_argument("--download-ratio", type=float, default=0.2, help="share of results that are downloaded")
+    parser.add_argument("--latency", type=float, default=0.2, help="mock upstream latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.1, help="mock upstream latency jitter in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="mock upstream 500 probability")
+    parser.add_argument("--block-rate", type=float, default=0.0, help="mock upstream Access Denied probability")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="mock upstream 429 probability")
+    parser.add_argument("--json", help="write the reports to this file")
+    args = parser.parse_args(argv)
+
+    def load(base_url):
+        run = LoadRun(base_url, args.tickers, args.range_days, args.download_ratio)
+        return run.run(args.concurrency, args.duration)
+
+    reports = []
+    if args.url:
+        report = dict(load(args.url), target=args.url)
+        print_report(args.url, report)
+        reports.append(report)
+    else:
+        from loadtest.mock_yahoo import start_server
+        upstream = start_server(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                                block_rate=args.block_rate, throttle_rate=args.throttle_rate)
+        workdir = tempfile.mkdtemp(prefix="yf-loadtest-")
+        try:
+            for cache_type in args.cache.split(","):
+                for workers in [int(w) for w in args.workers.split(",")]:
+                    process, base_url = spawn_app(workers, cache_type, upstream.base_url, workdir)
+                    try:
+                        report = dict(load(base_url), workers=workers, cache=cache_type)
+                    finally:
+                        process.terminate()
+                        process.wait(timeout=30)
+                    print_report(f"{workers} workers, {cache_type}", report)
+                    reports.append(report)
+            print(f"\nUpstream requests: {dict(upstream.stats)}")
+        finally:
+            upstream.shutdown()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(reports, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -27,7 +27,10 @@ logger.info(f"Current timestamp: {timestamp_now}")
 logger.info(f"Current date: {time.strftime('%Y-%m-%d', time.localtime())}")
 
 # Import app after setting environment variables
-from app import app
+from app import app, cache_warmer
+
+# Keep the WARM_WATCHLIST tickers cached; with several workers only one warms per interval
+cache_warmer.start()
 
 # Set debug mode based on environment
 debug_mode = os.environ.get('FLASK_ENV', 'development') != 'production'
@@ -0,0 +1,92 @@
+"""
+US market session helpers for cache expiry.
+
+A daily bar is final once its session has closed, so cached history only
+needs refreshing for the live tail: the days whose bar can still change.
+How long that tail may be cached depends on where we are in the session:
+a few minutes while the market is open, until the next open while it is
+closed. Exchange holidays are not modelled; on those days the tail is simply
+refreshed a little more often than necessary.
+"""
+
+import os
+import datetime
+from zoneinfo import ZoneInfo
+
+NEW_YORK = ZoneInfo("America/New_York")
+
+MARKET_OPEN = datetime.time(9, 30)
+MARKET_CLOSE = datetime.time(16, 0)
+
+# Minutes after the close before the day's bar counts as final (late prints, adjusted close)
+TAIL_SETTLE_MINUTES = int(os.environ.get('TAIL_SETTLE_MINUTES', 30))
+
+# Seconds the live tail is cached while the market is open
+TAIL_TTL_OPEN_SECONDS = int(os.environ.get('TAIL_TTL_OPEN_SECONDS', 300))
+
+
+def _now(now=None):
+    return now.astimezone(NEW_YORK) if now is not None else datetime.datetime.now(NEW_YORK)
+
+
+def _settle_time(day):
+    """Moment the bar for a trading day becomes final"""
+    close = datetime.datetime.combine(day, MARKET_CLOSE, tzinfo=NEW_YORK)
+    return close + datetime.timedelta(minutes=TAIL_SETTLE_MINUTES)
+
+
+def is_trading_day(day):
+    return day.weekday() < 5
+
+
+def settled_through(now=None):
+    """
+    Last date whose daily bar is final
+
+    Args:
+        now (datetime): Current time (timezone-aware), defaults to now
+
+    Returns:
+        date: Today (New York) once today's session has settled, otherwise yesterday
+    """
+    now = _now(now)
+    today = now.date()
+    if now >= _settle_time(today):
+        return today
+    return today - datetime.timedelta(days=1)
+
+
+def next_open(now=None):
+    """Start of the next trading session after now"""
+    now = _now(now)
+    day = now.date()
+    while True:
+        opening = datetime.datetime.combine(day, MARKET_OPEN, tzinfo=NEW_YORK)
+        if is_trading_day(day) and opening > now:
+            return opening
+        day += datetime.timedelta(days=1)
+
+
+def tail_ttl(now=None):
+    """
+    Seconds the live tail fetched now may be served before it is refreshed
+
+    While a session is running (open until settled) the tail is refreshed
+    every TAIL_TTL_OPEN_SECONDS, and at the latest when the day's bar settles.
+    Outside the session nothing changes until the next open.
+
+    Args:
+        now (datetime): Current time (timezone-aware), defaults to now
+
+    Returns:
+        int: TTL in seconds (at least 1)
+    """
+    now = _now(now)
+    today = now.date()
+    opening = datetime.datetime.combine(today, MARKET_OPEN, tzinfo=NEW_YORK)
+    settle = _settle_time(today)
+    if is_trading_day(today) and opening <= now < settle:
+        ttl = min(TAIL_TTL_OPEN_SECONDS, (settle - now).total_seconds())
+    else:
+        ttl = (next_open(now) - now).total_seconds()
+    return max(1, int(ttl))
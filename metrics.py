@@ -0,0 +1,334 @@
+"""
+Prometheus-style metrics aggregated across gunicorn workers.
+
+Each worker process records counters and histograms in memory and writes a
+snapshot of them (keyed by pid) to a small SQLite file every few seconds.
+The /metrics route flushes its own worker, sums the snapshots of all workers
+and renders them in the Prometheus text format, so whichever worker answers
+the scrape reports the whole service.
+
+Snapshots are tagged with the run they belong to (the gunicorn master, or the
+process itself outside gunicorn). Workers that exit during a run are folded into a per-run retired
+row, so the service's counters don't drop when gunicorn recycles a worker;
+snapshots of earlier runs are discarded, so a restart starts from zero.
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import sqlite3
+import logging
+import tempfile
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Shared file holding each worker's latest snapshot
+METRICS_DB_PATH = os.environ.get('METRICS_DB_PATH',
+                                 os.path.join(tempfile.gettempdir(), "yahoo_finance_metrics.sqlite3"))
+
+# Seconds between snapshot writes of a worker
+METRICS_FLUSH_SECONDS = float(os.environ.get('METRICS_FLUSH_SECONDS', 5))
+
+# Default latency buckets in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _label_key(labels):
+    return json.dumps(sorted(labels.items()))
+
+
+def _format_labels(pairs, extra=None):
+    pairs = list(pairs) + (extra or [])
+    if not pairs:
+        return ""
+    escaped = [(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+               for name, value in pairs]
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _start_time(pid):
+    # Tells a process apart from a later one that got the same pid (Linux only)
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(')', 1)[1].split()[19]
+    except (OSError, IndexError):
+        return ""
+
+
+def _run_id():
+    """Identify the current run: the gunicorn master, or this process when not under gunicorn"""
+    pid = os.getppid() if 'gunicorn' in sys.modules else os.getpid()
+    return f"{pid}:{_start_time(pid)}"
+
+
+def _run_alive(run):
+    pid, start = run.split(':', 1)
+    return _pid_alive(int(pid)) and _start_time(int(pid)) == start
+
+
+def _merge(merged, values):
+    """Add one snapshot's values into merged"""
+    for name, series in values.items():
+        target = merged.setdefault(name, {})
+        for key, value in series.items():
+            if isinstance(value, dict):
+                total = target.setdefault(key, {'buckets': [0] * len(value['buckets']), 'sum': 0.0, 'count': 0})
+                total['buckets'] = [a + b for a, b in zip(total['buckets'], value['buckets'])]
+                total['sum'] += value['sum']
+                total['count'] += value['count']
+            else:
+                target[key] = target.get(key, 0) + value
+    return merged
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Counter:
+    """Monotonic counter with labels"""
+
+    kind = "counter"
+
+    def __init__(self, registry, name, help_text):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+
+    def inc(self, amount=1, **labels):
+        self.registry._add(self.name, _label_key(labels), amount)
+
+
+class Histogram:
+    """Histogram with fixed buckets and labels"""
+
+    kind = "histogram"
+
+    def __init__(self, registry, name, help_text, buckets=LATENCY_BUCKETS):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        self.registry._observe(self.name, _label_key(labels), value, self.buckets)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the with-block in seconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+
+class MetricsRegistry:
+    """
+    Per-process metric values plus the shared snapshot file
+
+    Args:
+        path (str): SQLite file the worker snapshots are written to
+        flush_interval (float): Seconds between snapshot writes
+    """
+
+    def __init__(self, path=METRICS_DB_PATH, flush_interval=METRICS_FLUSH_SECONDS):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._values = {}
+        self._pid = os.getpid()
+        self._run = _run_id()
+        self._last_flush = time.monotonic()
+        atexit.register(self.flush)
+
+    def counter(self, name, help_text):
+        self._metrics[name] = Counter(self, name, help_text)
+        return self._metrics[name]
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self._metrics[name] = Histogram(self, name, help_text, buckets)
+        return self._metrics[name]
+
+    def _check_fork(self):
+        # Values inherited from a parent process belong to the parent's snapshot
+        if os.getpid() != self._pid:
+            self._pid = os.getpid()
+            self._run = _run_id()
+            self._values = {}
+
+    def _add(self, name, key, amount):
+        with self._lock:
+            self._check_fork()
+            series = self._values.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+        self._maybe_flush()
+
+    def _observe(self, name, key, value, buckets):
+        with self._lock:
+            self._check_fork()
+            series = self._values.setdefault(name, {})
+            data = series.get(key)
+            if data is None:
+                data = series[key] = {'buckets': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+            index = bisect_left(buckets, value)
+            if index < len(buckets):
+                data['buckets'][index] += 1
+            data['sum'] += value
+            data['count'] += 1
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(snapshots)")]
+        if columns and 'run' not in columns:
+            # Snapshots written before runs were tracked can't be told apart, start over
+            conn.execute("DROP TABLE snapshots")
+        conn.execute("CREATE TABLE IF NOT EXISTS snapshots "
+                     "(pid INTEGER PRIMARY KEY, run TEXT, updated REAL, data TEXT)")
+        conn.execute("CREATE TABLE IF NOT EXISTS retired (run TEXT PRIMARY KEY, data TEXT)")
+        return conn
+
+    def flush(self):
+        """Write this worker's current values to the shared file"""
+        with self._lock:
+            self._check_fork()
+            self._last_flush = time.monotonic()
+            data = json.dumps(self._values)
+        try:
+            conn = self._connect()
+            try:
+                conn.execute("INSERT OR REPLACE INTO snapshots (pid, run, updated, data) VALUES (?, ?, ?, ?)",
+                             (self._pid, self._run, time.time(), data))
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not write metrics snapshot: {str(e)}")
+
+    def _retire(self, conn):
+        """
+        Fold snapshots of exited workers into their run's retired row
+
+        Snapshots and retired rows of runs that have ended are deleted.
+        """
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            retired = {}
+            for pid, run, data in conn.execute("SELECT pid, run, data FROM snapshots").fetchall():
+                if pid == self._pid:
+                    continue
+                run_alive = run == self._run or _run_alive(run)
+                if run_alive and _pid_alive(pid):
+                    continue
+                if run_alive:
+                    _merge(retired.setdefault(run, {}), json.loads(data))
+                conn.execute("DELETE FROM snapshots WHERE pid = ?", (pid,))
+            for run, data in conn.execute("SELECT run, data FROM retired").fetchall():
+                if run in retired:
+                    _merge(retired[run], json.loads(data))
+                elif run != self._run and not _run_alive(run):
+                    conn.execute("DELETE FROM retired WHERE run = ?", (run,))
+            for run, values in retired.items():
+                conn.execute("INSERT OR REPLACE INTO retired (run, data) VALUES (?, ?)", (run, json.dumps(values)))
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+
+    def collect(self):
+        """
+        Sum the latest snapshots of all live workers and the retired ones of running masters
+
+        Returns:
+            dict: metric name -> label key -> value (counters) or bucket data (histograms)
+        """
+        self.flush()
+        try:
+            conn = self._connect()
+            try:
+                self._retire(conn)
+                rows = conn.execute("SELECT data FROM snapshots UNION ALL SELECT data FROM retired").fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not read metrics snapshots: {str(e)}")
+            rows = [(json.dumps(self._values),)]
+
+        merged = {}
+        for (data,) in rows:
+            _merge(merged, json.loads(data))
+        return merged
+
+    def render(self):
+        """Render all workers' metrics in the Prometheus text exposition format"""
+        merged = self.collect()
+        lines = []
+        for name, metric in self._metrics.items():
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for key, value in sorted(merged.get(name, {}).items()):
+                labels = [tuple(pair) for pair in json.loads(key)]
+                if metric.kind == "counter":
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.buckets, value['buckets']):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels, [('le', _format_value(bound))])} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {value['count']}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value['sum'])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {value['count']}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# Upstream fetches
+FETCH_SECONDS = registry.histogram(
+    "yahoo_fetch_seconds", "Duration of a history fetch from one data source (scrape or api)")
+FETCHES = registry.counter(
+    "yahoo_fetches_total", "History fetches by data source and outcome (ok, empty, error)")
+FETCH_ROWS = registry.counter(
+    "yahoo_fetch_rows_total", "Daily bars returned by each data source")
+HTTP_ATTEMPTS = registry.counter(
+    "yahoo_http_attempts_total", "Upstream request attempts by data source and status")
+RETRIES = registry.counter(
+    "yahoo_retries_total", "Upstream request retries by data source")
+BLOCKED = registry.counter(
+    "yahoo_blocked_total", "Responses detected as anti-scraping blocks")
+
+# Request paths
+HISTORY_SECONDS = registry.histogram(
+    "history_request_seconds", "Duration of a history lookup by path (cache or upstream)")
+RESULT_ROWS = registry.histogram(
+    "history_result_rows", "Rows returned per history lookup",
+    buckets=(1, 10, 50, 100, 250, 500, 1000, 2500, 5000))
+EXPORT_SECONDS = registry.histogram(
+    "export_seconds", "Time to generate a download file by format (xlsx, parquet, arrow; CSV is streamed)")
+
+# Cache
+CACHE_REQUESTS = registry.counter(
+    "cache_requests_total", "Bar and dataset lookups by kind (bars, dataset) and result (hit, partial, miss)")
@@ -0,0 +1,254 @@
+"""
+Per-request phase timing and an opt-in sampling profiler.
+
+Code paths mark their phases (cache lookup, HTTP fetch, HTML parse, ...)
+with `with phase("http"):`. The timer for the current request lives in a
+context variable, which the fetch engine copies into its worker threads, so
+phases that run in parallel windows are attributed to the request that
+started them (their durations add up, so they can exceed the wall time).
+
+Timed requests get a Server-Timing header and a structured log line. With
+?profile=<PROFILE_TOKEN> or PROFILE_REQUESTS=true, a sampling profiler built
+on sys._current_frames records the request's threads and writes folded stacks
+(for flamegraph.pl or speedscope) when the request is slow. Only the newest
+PROFILE_MAX_FILES profiles are kept.
+"""
+
+import os
+import sys
+import hmac
+import json
+import time
+import logging
+import tempfile
+import threading
+import contextvars
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+# Endpoints that get phase timing
+TIMED_ENDPOINTS = ('scrape', 'download', 'results')
+
+# Profile every timed request (otherwise only those with a valid ?profile= token)
+PROFILE_REQUESTS = os.environ.get('PROFILE_REQUESTS') == 'true'
+
+# Secret that ?profile= must match to profile a single request; unset disables the parameter
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')
+
+# Profiles of requests faster than this are discarded (requests with a valid token are always kept)
+PROFILE_SLOW_MS = float(os.environ.get('PROFILE_SLOW_MS', 1000))
+
+# Seconds between stack samples
+PROFILE_INTERVAL = float(os.environ.get('PROFILE_INTERVAL', 0.005))
+
+# Where folded stack files are written
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(tempfile.gettempdir(), "yahoo_finance_profiles"))
+
+# Newest profile files kept in PROFILE_DIR, older ones are deleted
+PROFILE_MAX_FILES = int(os.environ.get('PROFILE_MAX_FILES', 50))
+
+_current = contextvars.ContextVar('request_timer', default=None)
+
+
+class RequestTimer:
+    """Accumulated phase durations of one request, shared by all threads working on it"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self.phases = {}  # name -> [seconds, calls]
+        self.threads = {threading.get_ident()}
+
+    def add(self, name, seconds):
+        with self._lock:
+            entry = self.phases.setdefault(name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Format the phases and total duration as a Server-Timing header value"""
+        with self._lock:
+            phases = list(self.phases.items())
+        parts = []
+        for name, (seconds, calls) in phases:
+            part = f"{name};dur={seconds * 1000:.1f}"
+            if calls > 1:
+                part += f';desc="{calls} calls"'
+            parts.append(part)
+        parts.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(parts)
+
+    def as_dict(self):
+        with self._lock:
+            return {name: round(seconds * 1000, 2) for name, (seconds, _) in self.phases.items()}
+
+
+def current_timer():
+    """The timer of the request being handled in this context, or None"""
+    return _current.get()
+
+
+@contextmanager
+def phase(name):
+    """Time a block as one phase of the current request (no-op outside timed requests)"""
+    timer = _current.get()
+    if timer is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(name, time.perf_counter() - start)
+
+
+@contextmanager
+def worker_thread():
+    """Register the calling thread as working for the current request, so the profiler samples it"""
+    timer = _current.get()
+    if timer is None:
+        yield
+        return
+    ident = threading.get_ident()
+    timer.threads.add(ident)
+    try:
+        yield
+    finally:
+        timer.threads.discard(ident)
+
+
+def _folded_stack(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    """
+    Sample the stacks of a request's threads in a background thread
+
+    Args:
+        timer (RequestTimer): Timer whose registered threads are sampled
+        interval (float): Seconds between samples
+    """
+
+    def __init__(self, timer, interval=PROFILE_INTERVAL):
+        self.timer = timer
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.samples
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for ident in list(self.timer.threads):
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.samples[_folded_stack(frame)] += 1
+
+    def dump(self, label):
+        """
+        Write the samples as folded stacks ("frame;frame;frame count" per line)
+
+        Returns:
+            str: Path of the written file
+        """
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{label}.folded")
+        with open(path, 'w') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        _prune_profiles()
+        return path
+
+
+def _prune_profiles():
+    """Delete the oldest profiles beyond PROFILE_MAX_FILES"""
+    try:
+        entries = [entry for entry in os.scandir(PROFILE_DIR) if entry.name.endswith('.folded')]
+        entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+        for entry in entries[PROFILE_MAX_FILES:]:
+            os.remove(entry.path)
+    except OSError as e:
+        # Another worker may be pruning at the same time
+        logger.debug(f"Could not prune profiles: {str(e)}")
+
+
+def _profile_requested():
+    """Whether the request carries the profiling token"""
+    token = request.args.get('profile')
+    return bool(PROFILE_TOKEN and token) and hmac.compare_digest(token.encode(), PROFILE_TOKEN.encode())
+
+
+def _start_request():
+    if request.endpoint not in TIMED_ENDPOINTS:
+        return
+    timer = RequestTimer()
+    g.request_timer_token = _current.set(timer)
+    g.request_timer = timer
+    g.profile_requested = _profile_requested()
+    if PROFILE_REQUESTS or g.profile_requested:
+        g.request_profiler = SamplingProfiler(timer).start()
+
+
+def _finish_request(response):
+    timer = g.pop('request_timer', None)
+    if timer is None:
+        return response
+
+    elapsed_ms = timer.elapsed() * 1000
+    response.headers['Server-Timing'] = timer.server_timing()
+    record = {
+        'event': 'request_timing',
+        'endpoint': request.endpoint,
+        'method': request.method,
+        'status': response.status_code,
+        'total_ms': round(elapsed_ms, 2),
+        'phases_ms': timer.as_dict()
+    }
+
+    profiler = g.pop('request_profiler', None)
+    if profiler is not None:
+        profiler.stop()
+        if g.get('profile_requested') or elapsed_ms >= PROFILE_SLOW_MS:
+            record['profile'] = profiler.dump(f"{request.endpoint}-{elapsed_ms:.0f}ms")
+
+    logger.info(json.dumps(record))
+    return response
+
+
+def _reset_context(exc):
+    token = g.pop('request_timer_token', None)
+    if token is not None:
+        _current.reset(token)
+    profiler = g.pop('request_profiler', None)
+    if profiler is not None:
+        # The request failed before after_request ran
+        profiler.stop()
+
+
+def init_app(app):
+    """Install the timing hooks on a Flask app"""
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_reset_context)
@@ -0,0 +1,108 @@
+"""
+Single-flight de-duplication of concurrent identical fetches.
+
+When several requests miss the cache for the same key at the same moment,
+only the first one (the leader) runs the fetch. Other requests in the same
+worker wait for the leader and reuse its result. Requests in other workers
+see the leader's lock in the shared cache, wait until it is released and then
+run the (cache-aware) function themselves, which by then is a cache hit.
+"""
+
+import os
+import time
+import uuid
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# How long a cross-worker lock is held at most (covers retries and backoff)
+SINGLE_FLIGHT_LOCK_TIMEOUT = int(os.environ.get('SINGLE_FLIGHT_LOCK_TIMEOUT', 60))
+
+
+class _Call:
+    """A fetch in progress that other threads can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key into one execution
+
+    Args:
+        cache: Flask-Caching Cache used for cross-worker locks (None for in-process only)
+        lock_timeout (int): Seconds before a cross-worker lock expires on its own
+        poll_interval (float): Seconds between checks while waiting on another worker
+    """
+
+    def __init__(self, cache=None, lock_timeout=SINGLE_FLIGHT_LOCK_TIMEOUT, poll_interval=0.2):
+        self.cache = cache
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, *args):
+        """
+        Run fn(*args) once for all concurrent callers using the same key
+
+        Args:
+            key (str): Identity of the work, e.g. ticker and date range
+            fn (callable): Function to run, should read and fill the cache itself
+
+        Returns:
+            The leader's result (exceptions are re-raised in every waiter)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            logger.debug(f"Single-flight: waiting for in-flight fetch of {key}")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._run_with_shared_lock(key, fn, *args)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def _run_with_shared_lock(self, key, fn, *args):
+        """Run fn while holding the cross-worker lock for key"""
+        if self.cache is None:
+            return fn(*args)
+
+        lock_key = f"inflight_{key}"
+        token = f"{os.getpid()}-{uuid.uuid4()}"
+        deadline = time.monotonic() + self.lock_timeout
+
+        while not self.cache.add(lock_key, token, timeout=self.lock_timeout):
+            if time.monotonic() >= deadline:
+                logger.warning(f"Single-flight: gave up waiting for another worker on {key}")
+                return fn(*args)
+            time.sleep(self.poll_interval)
+            if self.cache.get(lock_key) is None:
+                # The other worker finished; its result is in the cache now
+                logger.debug(f"Single-flight: another worker fetched {key}")
+                return fn(*args)
+
+        try:
+            return fn(*args)
+        finally:
+            if self.cache.get(lock_key) == token:
+                self.cache.delete(lock_key)
@@ -26,6 +26,11 @@ document.addEventListener('DOMContentLoaded', function() {
     const resultsTable = document.getElementById('results-table');
     if (resultsTable) {
         const dataTable = new DataTable('#results-table', {
+            // Rows are sorted, filtered and paged on the server
+            serverSide: true,
+            processing: true,
+            ajax: resultsTable.dataset.source,
+            searchDelay: 400,
             order: [[0, 'desc']], // Sort by date (first column) in descending order
             responsive: true,
             pageLength: 50, // Default to 50 records per page
@@ -46,8 +51,31 @@ document.addEventListener('DOMContentLoaded', function() {
     if (chartCanvas) {
         createStockChart();
     }
+    
+    // Poll a background fetch job if this is the pending page
+    const jobStatus = document.getElementById('job-status');
+    if (jobStatus) {
+        pollJob(jobStatus.dataset.source);
+    }
 });
 
+function pollJob(url, interval = 1000) {
+    fetch(url)
+        .then(response => response.json())
+        .then(job => {
+            if (job.status === 'done') {
+                window.location.href = job.results_url;
+            } else if (job.status === 'failed' || job.status === 'unknown') {
+                document.querySelector('#job-status .spinner-border').classList.add('d-none');
+                document.getElementById('job-message').textContent = job.error || 'The fetch failed. Please try again.';
+                document.getElementById('job-back').classList.remove('d-none');
+            } else {
+                setTimeout(() => pollJob(url, interval), interval);
+            }
+        })
+        .catch(() => setTimeout(() => pollJob(url, interval), interval * 2));
+}
+
 function showAlert(message, type = 'info') {
     const alertContainer = document.getElementById('alert-container');
     if (!alertContainer) return;
@@ -70,102 +98,169 @@ function showAlert(message, type = 'info') {
     }, 5000);
 }
 
+let stockChart = null;
+let zoomTimer = null;
+let reloadingChart = false;
+
+function chartPointTarget(canvas) {
+    // Roughly one point per horizontal pixel is all the canvas can show
+    return Math.max(100, Math.min(2000, Math.round(canvas.clientWidth || 500)));
+}
+
+function fetchChartData(params = {}) {
+    const chartCanvas = document.getElementById('price-chart');
+    const query = new URLSearchParams({ points: chartPointTarget(chartCanvas), ...params });
+    return fetch(`${chartCanvas.dataset.source}?${query}`).then(response => {
+        if (!response.ok) {
+            throw new Error(`Chart data request failed (${response.status})`);
+        }
+        return response.json();
+    });
+}
+
+function applyChartData(payload) {
+    stockChart.data.labels = payload.dates;
+    stockChart.data.datasets[0].data = payload.close;
+    stockChart.data.datasets[1].data = payload.high;
+    stockChart.data.datasets[2].data = payload.low;
+    stockChart.update('none');
+}
+
+function onChartZoom({ chart }) {
+    if (reloadingChart) return;
+    
+    // Wait for wheel zooming to settle, then load the visible range at full resolution
+    clearTimeout(zoomTimer);
+    zoomTimer = setTimeout(() => {
+        const labels = chart.data.labels;
+        const first = Math.max(0, Math.floor(chart.scales.x.min));
+        const last = Math.min(labels.length - 1, Math.ceil(chart.scales.x.max));
+        
+        fetchChartData({ start: labels[first], end: labels[last] }).then(payload => {
+            reloadingChart = true;
+            chart.resetZoom('none');
+            applyChartData(payload);
+            reloadingChart = false;
+            document.getElementById('reset-zoom-btn').classList.remove('d-none');
+        }).catch(error => showAlert(error.message, 'danger'));
+    }, 300);
+}
+
+function resetChartZoom() {
+    fetchChartData().then(payload => {
+        reloadingChart = true;
+        stockChart.resetZoom('none');
+        applyChartData(payload);
+        reloadingChart = false;
+        document.getElementById('reset-zoom-btn').classList.add('d-none');
+    }).catch(error => showAlert(error.message, 'danger'));
+}
+
 function createStockChart() {
     const chartCanvas = document.getElementById('price-chart');
     if (!chartCanvas) return;
     
-    const labels = chartData.map(item => item.Date);
-    const closeData = chartData.map(item => item.Close);
-    const highData = chartData.map(item => item.High);
-    const lowData = chartData.map(item => item.Low);
-    
-    const ctx = chartCanvas.getContext('2d');
-    const chart = new Chart(ctx, {
-        type: 'line',
-        data: {
-            labels: labels,
-            datasets: [
-                {
-                    label: 'Close',
-                    data: closeData,
-                    borderColor: 'rgba(75, 192, 192, 1)',
-                    backgroundColor: 'rgba(75, 192, 192, 0.2)',
-                    tension: 0.1,
-                    fill: false
-                },
-                {
-                    label: 'High',
-                    data: highData,
-                    borderColor: 'rgba(54, 162, 235, 1)',
-                    backgroundColor: 'rgba(54, 162, 235, 0.2)',
-                    tension: 0.1,
-                    fill: false,
-                    hidden: true
-                },
-                {
-                    label: 'Low',
-                    data: lowData,
-                    borderColor: 'rgba(255, 99, 132, 1)',
-                    backgroundColor: 'rgba(255, 99, 132, 0.2)',
-                    tension: 0.1,
-                    fill: false,
-                    hidden: true
-                }
-            ]
-        },
-        options: {
-            responsive: true,
-            maintainAspectRatio: false,
-            plugins: {
-                title: {
-                    display: true,
-                    text: `${ticker} Price History`,
-                    font: {
-                        size: 16
-                    }
-                },
-                tooltip: {
-                    mode: 'index',
-                    intersect: false,
-                    callbacks: {
-                        label: function(context) {
-                            let label = context.dataset.label || '';
-                            if (label) {
-                                label += ': ';
-                            }
-                            if (context.parsed.y !== null) {
-                                label += new Intl.NumberFormat('en-US', { 
-                                    style: 'currency', 
-                                    currency: 'USD',
-                                    minimumFractionDigits: 2
-                                }).format(context.parsed.y);
-                            }
-                            return label;
-                        }
+    // Columnar, downsampled series from the server instead of one object per row
+    fetchChartData().then(payload => {
+        const ctx = chartCanvas.getContext('2d');
+        stockChart = new Chart(ctx, {
+            type: 'line',
+            data: {
+                labels: payload.dates,
+                datasets: [
+                    {
+                        label: 'Close',
+                        data: payload.close,
+                        borderColor: 'rgba(75, 192, 192, 1)',
+                        backgroundColor: 'rgba(75, 192, 192, 0.2)',
+                        tension: 0.1,
+                        pointRadius: 0,
+                        fill: false
+                    },
+                    {
+                        label: 'High',
+                        data: payload.high,
+                        borderColor: 'rgba(54, 162, 235, 1)',
+                        backgroundColor: 'rgba(54, 162, 235, 0.2)',
+                        tension: 0.1,
+                        pointRadius: 0,
+                        fill: false,
+                        hidden: true
+                    },
+                    {
+                        label: 'Low',
+                        data: payload.low,
+                        borderColor: 'rgba(255, 99, 132, 1)',
+                        backgroundColor: 'rgba(255, 99, 132, 0.2)',
+                        tension: 0.1,
+                        pointRadius: 0,
+                        fill: false,
+                        hidden: true
                     }
-                }
+                ]
             },
-            scales: {
-                x: {
-                    display: true,
+            options: {
+                responsive: true,
+                maintainAspectRatio: false,
+                plugins: {
+                    zoom: {
+                        zoom: {
+                            drag: { enabled: true },
+                            wheel: { enabled: true },
+                            mode: 'x',
+                            onZoomComplete: onChartZoom
+                        }
+                    },
                     title: {
                         display: true,
-                        text: 'Date'
+                        text: `${ticker} Price History`,
+                        font: {
+                            size: 16
+                        }
                     },
-                    ticks: {
-                        maxTicksLimit: 10
+                    tooltip: {
+                        mode: 'index',
+                        intersect: false,
+                        callbacks: {
+                            label: function(context) {
+                                let label = context.dataset.label || '';
+                                if (label) {
+                                    label += ': ';
+                                }
+                                if (context.parsed.y !== null) {
+                                    label += new Intl.NumberFormat('en-US', { 
+                                        style: 'currency', 
+                                        currency: 'USD',
+                                        minimumFractionDigits: 2
+                                    }).format(context.parsed.y);
+                                }
+                                return label;
+                            }
+                        }
                     }
                 },
-                y: {
-                    display: true,
-                    title: {
+                scales: {
+                    x: {
                         display: true,
-                        text: 'Price ($)'
+                        title: {
+                            display: true,
+                            text: 'Date'
+                        },
+                        ticks: {
+                            maxTicksLimit: 10
+                        }
+                    },
+                    y: {
+                        display: true,
+                        title: {
+                            display: true,
+                            text: 'Price ($)'
+                        }
                     }
                 }
             }
-        }
-    });
+        });
+    }).catch(error => showAlert(error.message, 'danger'));
 }
 
 function toggleDataTable() {
@@ -0,0 +1,42 @@
+import pandas as pd
+import pytest
+
+yf = pytest.importorskip("yfinance")
+
+import alternative_api
+from circuit_breaker import CircuitBreaker, CLOSED, OPEN
+
+
+@pytest.fixture
+def download(monkeypatch):
+    """Make yf.download return an empty frame and record the given error for the ticker"""
+    errors = {}
+
+    def fake_download(tickers, start=None, end=None, **kwargs):
+        yf.shared._ERRORS = dict(errors)
+        return pd.DataFrame()
+
+    monkeypatch.setattr(alternative_api, "YAHOO_CHART_BASE_URL", "")
+    monkeypatch.setattr(yf, "download", fake_download)
+    monkeypatch.setattr(alternative_api.time, "sleep", lambda seconds: None)
+    return errors
+
+
+def test_empty_download_without_price_data_is_valid(download):
+    download["YOUNG"] = "YFPricesMissingError('possibly delisted; no price data found (1d 2006-01-01 -> 2007-01-01)')"
+    df = alternative_api.get_stock_data_from_api("YOUNG", "2006-01-01", "2006-12-31")
+    assert df is not None and df.empty
+
+
+def test_rate_limited_empty_download_opens_the_breaker(download):
+    download["AAPL"] = "YFRateLimitError('Too Many Requests. Rate limited. Try after a while.')"
+    breaker = CircuitBreaker("api", min_calls=2)
+    for _ in range(3):
+        assert breaker.call(alternative_api.get_stock_data_from_api, "AAPL", "2024-01-01", "2024-02-01") is None
+    assert breaker.state == OPEN
+
+
+def test_empty_download_without_error_record_is_a_failure(download):
+    breaker = CircuitBreaker("api", min_calls=2)
+    assert breaker.call(alternative_api.get_stock_data_from_api, "AAPL", "2024-01-01", "2024-02-01") is None
+    assert breaker.state == CLOSED
@@ -0,0 +1,168 @@
+import datetime
+import threading
+import time
+
+import pandas as pd
+from flask_caching.backends import SimpleCache
+
+import bar_store
+from bar_store import (BarStore, BAR_COLUMNS, EMPTY_COVERAGE_TTL, MAX_HISTORY_YEARS, clamp_range,
+                       merge_intervals, missing_ranges, plan_windows)
+from fetch_engine import FetchEngine
+
+D = datetime.date
+
+
+class InlineEngine:
+    """Runs fetch windows one by one in the calling thread and keeps submitted background work"""
+
+    def __init__(self):
+        self.submitted = []
+
+    def imap_unordered(self, fn, jobs):
+        for job in jobs:
+            yield job, fn(*job)
+
+    def submit(self, fn, *args):
+        self.submitted.append((fn, args))
+
+
+def bars(start, end):
+    dates = pd.bdate_range(start, end)
+    return pd.DataFrame({"Date": dates, "Open": 1.0, "High": 1.0, "Low": 1.0,
+                         "Close": 1.0, "Adj Close": 1.0, "Volume": 100})
+
+
+def recording_fetch(calls, listed=None, first_bar_delay=None):
+    """Fetch returning business-day bars, empty before `listed`, starting late by `first_bar_delay` days"""
+    def fetch(ticker, start_date, end_date):
+        calls.append((start_date, end_date))
+        start = pd.Timestamp(start_date)
+        if listed is not None:
+            start = max(start, pd.Timestamp(listed))
+        if first_bar_delay is not None:
+            start += pd.Timedelta(days=first_bar_delay)
+        if start > pd.Timestamp(end_date):
+            return pd.DataFrame(columns=BAR_COLUMNS), "api", None
+        return bars(start, end_date), "api", None
+    return fetch
+
+
+def test_merge_intervals_joins_overlapping_and_adjacent():
+    intervals = [(D(2024, 1, 10), D(2024, 1, 20)), (D(2024, 1, 1), D(2024, 1, 5)),
+                 (D(2024, 1, 6), D(2024, 1, 8)), (D(2024, 1, 15), D(2024, 1, 25))]
+    assert merge_intervals(intervals) == [(D(2024, 1, 1), D(2024, 1, 8)), (D(2024, 1, 10), D(2024, 1, 25))]
+
+
+def test_missing_ranges():
+    covered = [(D(2024, 1, 5), D(2024, 1, 10)), (D(2024, 1, 20), D(2024, 1, 25))]
+    assert missing_ranges(covered, D(2024, 1, 1), D(2024, 1, 31)) == [
+        (D(2024, 1, 1), D(2024, 1, 4)), (D(2024, 1, 11), D(2024, 1, 19)), (D(2024, 1, 26), D(2024, 1, 31))]
+    assert missing_ranges(covered, D(2024, 1, 6), D(2024, 1, 9)) == []
+    assert missing_ranges([], D(2024, 1, 1), D(2024, 1, 2)) == [(D(2024, 1, 1), D(2024, 1, 2))]
+
+
+def test_plan_windows_splits_gaps_and_skips_weekends():
+    # 2024-01-06/07 is a weekend
+    covered = [(D(2024, 1, 1), D(2024, 1, 5)), (D(2024, 1, 8), D(2024, 1, 10))]
+    windows, empty = plan_windows(covered, D(2024, 1, 1), D(2024, 1, 31), window_days=10)
+    assert empty == [(D(2024, 1, 6), D(2024, 1, 7))]
+    assert windows == [(D(2024, 1, 11), D(2024, 1, 20)), (D(2024, 1, 21), D(2024, 1, 30)),
+                       (D(2024, 1, 31), D(2024, 1, 31))]
+
+
+def test_clamp_range_orders_caps_and_defaults():
+    today = datetime.date.today()
+    assert clamp_range("2024-03-01", "2024-01-01") == (D(2024, 1, 1), D(2024, 3, 1))
+    assert clamp_range("2024-01-01", (today + datetime.timedelta(days=30)).isoformat())[1] == today
+    assert clamp_range("1900-01-01", "2024-01-01")[0] == today - datetime.timedelta(days=MAX_HISTORY_YEARS * 365)
+    assert clamp_range("2024-13-45", None) == (today - datetime.timedelta(days=bar_store.DEFAULT_RANGE_DAYS), today)
+
+
+def test_get_bars_fetches_only_missing_windows():
+    calls = []
+    store = BarStore(SimpleCache(), engine=InlineEngine())
+    fetch = recording_fetch(calls)
+
+    df, source = store.get_bars("AAPL", "2023-01-01", "2023-03-31", fetch)
+    assert source == "api"
+    assert df["Date"].iloc[0] > df["Date"].iloc[-1]
+
+    calls.clear()
+    df, source = store.get_bars("AAPL", "2023-02-01", "2023-05-31", fetch)
+    assert calls == [("2023-04-01", "2023-05-31")]
+    assert source == "cache+api"
+    assert df["Date"].min() == pd.Timestamp("2023-02-01")
+
+    calls.clear()
+    df, source = store.get_bars("AAPL", "2023-01-15", "2023-05-15", fetch)
+    assert calls == [] and source == "cache"
+
+
+def test_truncated_window_is_covered_from_its_first_bar():
+    calls = []
+    store = BarStore(SimpleCache(), engine=InlineEngine())
+    store.get_bars("TRUNC", "2023-01-01", "2023-06-30", recording_fetch(calls, first_bar_delay=30))
+    assert store.load("TRUNC")['covered'] == [(D(2023, 1, 31), D(2023, 6, 30))]
+    assert not store.is_covered("TRUNC", "2023-01-01", "2023-06-30")
+
+
+def test_stale_tail_is_served_and_refreshed_in_the_background(monkeypatch):
+    calls = []
+    engine = InlineEngine()
+    store = BarStore(SimpleCache(), engine=engine)
+    fetch = recording_fetch(calls)
+    end = datetime.date.today()
+    start = end - datetime.timedelta(days=60)
+
+    store.get_bars("LIVE", start.isoformat(), end.isoformat(), fetch)
+    calls.clear()
+    store.get_bars("LIVE", start.isoformat(), end.isoformat(), fetch)
+    assert calls == [] and engine.submitted == []
+
+    real_time = time.time
+    monkeypatch.setattr(time, "time", lambda: real_time() + 10 * 86400)
+    df, source = store.get_bars("LIVE", start.isoformat(), end.isoformat(), fetch)
+    assert source == "cache" and not df.empty
+    assert calls == [] and len(engine.submitted) == 1
+
+    # The refresh only asks for the tail again (which may be weekend days only, then nothing at all)
+    tail_from = store.load("LIVE")['tail_from']
+    refresh, args = engine.submitted[0]
+    refresh(*args)
+    assert all(window_start >= tail_from.isoformat() for window_start, _ in calls)
+    assert store.is_covered("LIVE", start.isoformat(), end.isoformat(), fresh=True)
+
+
+def test_empty_coverage_before_listing_expires(monkeypatch):
+    calls = []
+    store = BarStore(SimpleCache(), engine=InlineEngine())
+    fetch = recording_fetch(calls, listed="2021-06-15")
+    store.get_bars("YOUNG", "2020-01-01", "2021-12-31", fetch)
+    assert store.is_covered("YOUNG", "2020-01-01", "2021-12-31")
+    assert store.load("YOUNG")['covered'][0][0] == D(2021, 6, 15)
+
+    real_time = time.time
+    monkeypatch.setattr(time, "time", lambda: real_time() + EMPTY_COVERAGE_TTL + 1)
+    assert not store.is_covered("YOUNG", "2020-01-01", "2021-12-31")
+    assert store.is_covered("YOUNG", "2021-06-15", "2021-12-31")
+
+
+def test_events_from_parallel_windows_are_all_kept():
+    engine = FetchEngine(max_workers=4)
+    store = BarStore(SimpleCache(), engine=engine)
+    started = threading.Barrier(4, timeout=5)
+
+    def fetch(ticker, start_date, end_date):
+        # Let the windows finish together, like parallel scrapes
+        try:
+            started.wait()
+        except threading.BrokenBarrierError:
+            pass
+        day = pd.bdate_range(start_date, end_date)[10]
+        events = pd.DataFrame({"Date": [day], "Dividends": [0.25], "Stock Splits": [None]})
+        return bars(start_date, end_date), "scrape", events
+
+    store.get_bars("DIV", "2019-01-01", "2022-12-31", fetch)
+    events = store.get_events("DIV", "2019-01-01", "2022-12-31")
+    assert len(events) == 4
@@ -0,0 +1,66 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from cache_backends import MemoryBudgetCache, SQLiteCache, compact_frame, estimate_size
+
+
+class Moved:
+    """Stands in for a class an older version of the code pickled"""
+
+
+def frame(rows=100, price=150.23):
+    return pd.DataFrame({"Date": pd.bdate_range("2024-01-01", periods=rows), "Open": price, "High": price,
+                         "Low": price, "Close": price, "Adj Close": price, "Volume": np.arange(rows)})
+
+
+def test_memory_cache_stores_compact_frames_and_widens_them_on_read():
+    cache = MemoryBudgetCache(budget_bytes=10 * 1024 * 1024)
+    df = frame()
+    cache.set("bars_AAPL", {'bars': df, 'covered': []})
+    stored = cache._entries["bars_AAPL"][0]['bars']
+    assert stored["Close"].dtype == np.float32
+    assert cache.bytes_used < estimate_size({'bars': df, 'covered': []})
+
+    read = cache.get("bars_AAPL")['bars']
+    assert read["Close"].dtype == np.float64
+    assert read["Close"].iloc[0] == 150.23
+
+
+def test_memory_cache_evicts_least_recently_used():
+    one = estimate_size(compact_frame(frame()))
+    cache = MemoryBudgetCache(budget_bytes=int(one * 2.5))
+    cache.set("a", frame())
+    cache.set("b", frame())
+    cache.get("a")
+    cache.set("c", frame())
+    assert cache.has("a") and cache.has("c")
+    assert not cache.has("b")
+    assert cache.evictions == 1
+    assert cache.bytes_used <= cache.budget_bytes
+
+
+def test_memory_cache_rejects_values_over_the_budget():
+    cache = MemoryBudgetCache(budget_bytes=1000)
+    assert not cache.set("big", frame(1000))
+    assert cache.rejected == 1 and cache.bytes_used == 0
+
+
+def test_sqlite_cache_drops_rows_that_no_longer_unpickle(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = SQLiteCache(path)
+    cache.set("old", Moved(), timeout=0)
+    monkeypatch.delattr(sys.modules[__name__], "Moved")
+    assert cache.get("old") is None
+    assert not cache.has("old")
+
+
+def test_sqlite_cache_prune_evicts_oldest_writes_over_the_limit(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite3"), max_bytes=10_000)
+    for i in range(20):
+        cache.set(f"bars_{i}", b"x" * 1000, timeout=0)
+    cache.set("bars_0", b"x" * 1000, timeout=0)
+    cache.prune()
+    assert cache.has("bars_0") and cache.has("bars_19")
+    assert not cache.has("bars_1")
@@ -0,0 +1,60 @@
+import datetime
+
+import pandas as pd
+from flask_caching.backends import SimpleCache
+
+from bar_store import BarStore, BAR_COLUMNS
+from circuit_breaker import CircuitBreaker, CLOSED, OPEN
+
+LISTED = datetime.date(2021, 6, 15)
+
+
+def young_ticker_fetch(calls):
+    """Fetch function for a ticker listed on LISTED: empty frames before, daily bars after"""
+    def fetch(ticker, start_date, end_date):
+        calls.append((start_date, end_date))
+        start = max(pd.Timestamp(start_date), pd.Timestamp(LISTED))
+        dates = pd.bdate_range(start, end_date)
+        if dates.empty:
+            return pd.DataFrame(columns=BAR_COLUMNS)
+        return pd.DataFrame({"Date": dates, "Open": 1.0, "High": 1.0, "Low": 1.0,
+                             "Close": 1.0, "Adj Close": 1.0, "Volume": 100})
+    return fetch
+
+
+def test_empty_frames_count_as_success():
+    breaker = CircuitBreaker("test", min_calls=2)
+    for _ in range(10):
+        breaker.call(lambda: pd.DataFrame(columns=BAR_COLUMNS))
+    assert breaker.state == CLOSED
+
+
+def test_none_results_open_the_breaker():
+    breaker = CircuitBreaker("test", min_calls=2)
+    for _ in range(3):
+        breaker.call(lambda: None)
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+
+
+def test_empty_windows_do_not_trip_the_breaker():
+    breaker = CircuitBreaker("api", min_calls=2)
+    calls = []
+    fetch = young_ticker_fetch(calls)
+
+    def fetch_through_breaker(ticker, start_date, end_date):
+        return breaker.call(fetch, ticker, start_date, end_date), "api", None
+
+    store = BarStore(SimpleCache())
+    end = (datetime.date.today() - datetime.timedelta(days=7)).isoformat()
+    df, source = store.get_bars("YOUNG", "2006-01-01", end, fetch_through_breaker)
+
+    assert breaker.state == CLOSED
+    assert df["Date"].min().date() == LISTED
+    assert len(calls) > 10
+
+    # The windows before the listing date are remembered, a repeat needs no upstream call
+    calls.clear()
+    df, source = store.get_bars("YOUNG", "2006-01-01", end, fetch_through_breaker)
+    assert calls == []
+    assert source == "cache"
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+from flask import Flask
+from flask_caching import Cache
+
+from cache_backends import resolve_cache_type
+from datasets import DatasetStore, dataset_key
+
+
+def memory_cache():
+    return Cache(Flask(__name__), config={"CACHE_TYPE": resolve_cache_type("MemoryBudgetCache")})
+
+
+def frame():
+    # Full-precision prices, as the API returns them
+    rng = np.random.default_rng(1)
+    close = 150 + rng.standard_normal(50).cumsum()
+    return pd.DataFrame({"Date": pd.bdate_range("2024-01-01", periods=50)[::-1], "Open": close, "High": close + 1,
+                         "Low": close - 1, "Close": close, "Adj Close": close * 0.99, "Volume": rng.integers(1, 10**6, 50)})
+
+
+def dataset_keys(cache):
+    return [key for key in cache.cache._entries if key.startswith("dataset_")]
+
+
+def test_identical_results_share_one_dataset():
+    cache = memory_cache()
+    store = DatasetStore(cache)
+    meta = {'ticker': 'AAPL', 'start_date': '2024-01-01', 'end_date': '2024-03-08', 'source': 'api'}
+    first = store.publish(frame(), meta)
+    second = store.publish(frame(), meta)
+    assert first != second
+    assert len(dataset_keys(cache)) == 1
+
+    df, loaded_meta = store.load(first)
+    assert loaded_meta == meta
+    assert len(df) == 50
+
+
+def test_cached_copy_hashes_like_the_fresh_frame():
+    cache = memory_cache()
+    store = DatasetStore(cache)
+    meta = {'ticker': 'AAPL', 'start_date': '2024-01-01', 'end_date': '2024-03-08', 'source': 'api'}
+    df, _ = store.load(store.publish(frame(), meta))
+    assert dataset_key(df, 'AAPL') == dataset_key(frame(), 'AAPL')
+    store.publish(df, dict(meta, source='cache'))
+    assert len(dataset_keys(cache)) == 1
+
+
+def test_unknown_or_expired_handle():
+    store = DatasetStore(memory_cache())
+    assert store.load("missing") == (None, None)
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from downsample import downsample_frame, lttb_indices
+
+
+def test_short_series_is_kept_whole():
+    x = np.arange(10)
+    assert list(lttb_indices(x, x * 2.0, 10)) == list(range(10))
+    assert list(lttb_indices(x, x * 2.0, 50)) == list(range(10))
+
+
+def test_keeps_threshold_points_including_the_ends():
+    x = np.arange(1000)
+    y = np.sin(x / 25.0)
+    indices = lttb_indices(x, y, 100)
+    assert len(indices) == 100
+    assert indices[0] == 0 and indices[-1] == 999
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_keeps_a_spike():
+    x = np.arange(500)
+    y = np.zeros(500)
+    y[123] = 50.0
+    assert 123 in lttb_indices(x, y, 20)
+
+
+def test_downsample_frame_keeps_whole_rows_by_date():
+    dates = pd.bdate_range("2020-01-01", periods=600)
+    df = pd.DataFrame({"Date": dates, "Close": np.linspace(100, 200, 600), "Volume": np.arange(600)})
+    sampled = downsample_frame(df, "Date", "Close", 60)
+    assert len(sampled) == 60
+    assert sampled["Date"].is_monotonic_increasing
+    assert (sampled["Volume"].to_numpy() == df.loc[sampled.index, "Volume"].to_numpy()).all()
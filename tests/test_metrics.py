@@ -0,0 +1,70 @@
+import os
+import sys
+import json
+import subprocess
+
+from metrics import MetricsRegistry, _label_key
+
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def snapshot(count, observed=None):
+    data = {"fetches_total": {_label_key({"source": "api"}): count}}
+    if observed is not None:
+        data["fetch_seconds"] = {_label_key({}): {'buckets': [observed, 0], 'sum': 0.5 * observed, 'count': observed}}
+    return json.dumps(data)
+
+
+def registry(tmp_path):
+    registry = MetricsRegistry(path=str(tmp_path / "metrics.sqlite3"))
+    registry.counter("fetches_total", "Fetches")
+    registry.histogram("fetch_seconds", "Fetch latency", buckets=(1, 5))
+    return registry
+
+
+def test_sums_workers_and_histograms(tmp_path):
+    reg = registry(tmp_path)
+    reg._metrics["fetches_total"].inc(source="api")
+    reg._metrics["fetch_seconds"].observe(0.5)
+    conn = reg._connect()
+    # Another live worker of this run (our parent process is certainly alive)
+    conn.execute("INSERT INTO snapshots VALUES (?, ?, 0, ?)", (os.getppid(), reg._run, snapshot(2, 3)))
+    conn.close()
+
+    merged = reg.collect()
+    assert merged["fetches_total"][_label_key({"source": "api"})] == 3
+    assert merged["fetch_seconds"][_label_key({})] == {'buckets': [4, 0], 'sum': 2.0, 'count': 4}
+    assert 'fetch_seconds_bucket{le="1"} 4' in reg.render()
+
+
+def test_exited_workers_are_retired_once(tmp_path):
+    reg = registry(tmp_path)
+    conn = reg._connect()
+    conn.execute("INSERT INTO snapshots VALUES (?, ?, 0, ?)", (dead_pid(), reg._run, snapshot(5)))
+    conn.close()
+
+    key = _label_key({"source": "api"})
+    assert reg.collect()["fetches_total"][key] == 5
+    assert reg.collect()["fetches_total"][key] == 5
+    conn = reg._connect()
+    assert conn.execute("SELECT COUNT(*) FROM retired").fetchone()[0] == 1
+    assert conn.execute("SELECT COUNT(*) FROM snapshots WHERE pid != ?", (reg._pid,)).fetchone()[0] == 0
+    conn.close()
+
+
+def test_previous_runs_are_dropped(tmp_path):
+    reg = registry(tmp_path)
+    old_run = f"{dead_pid()}:1"
+    conn = reg._connect()
+    conn.execute("INSERT INTO snapshots VALUES (?, ?, 0, ?)", (dead_pid(), old_run, snapshot(7)))
+    conn.execute("INSERT INTO retired VALUES (?, ?)", (old_run, snapshot(11)))
+    conn.close()
+
+    assert reg.collect().get("fetches_total", {}) == {}
+    conn = reg._connect()
+    assert conn.execute("SELECT COUNT(*) FROM retired").fetchone()[0] == 0
+    conn.close()
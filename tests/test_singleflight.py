@@ -0,0 +1,86 @@
+import threading
+import time
+
+import pytest
+from flask_caching.backends import SimpleCache
+
+from singleflight import SingleFlight
+
+
+def run_concurrently(count, target):
+    results = [None] * count
+    errors = [None] * count
+
+    def worker(i):
+        try:
+            results[i] = target()
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    return results, errors
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return "bars"
+
+    threading.Timer(0.2, release.set).start()
+    results, errors = run_concurrently(8, lambda: flight.do("AAPL", fetch))
+    assert calls == [1]
+    assert results == ["bars"] * 8
+    assert errors == [None] * 8
+
+
+def test_leader_errors_reach_every_waiter():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fetch():
+        release.wait(5)
+        raise RuntimeError("upstream down")
+
+    threading.Timer(0.2, release.set).start()
+    results, errors = run_concurrently(4, lambda: flight.do("AAPL", fetch))
+    assert all(isinstance(e, RuntimeError) for e in errors)
+    # The key is free again for the next call
+    assert flight.do("AAPL", lambda: "ok") == "ok"
+
+
+def test_waits_for_another_workers_lock():
+    cache = SimpleCache()
+    flight = SingleFlight(cache, poll_interval=0.01)
+    # Another worker holds the lock for this key
+    cache.add("inflight_AAPL", "other-worker", timeout=60)
+    released_at = []
+
+    def release():
+        released_at.append(time.monotonic())
+        cache.delete("inflight_AAPL")
+
+    threading.Timer(0.2, release).start()
+    ran_at = []
+    flight.do("AAPL", lambda: ran_at.append(time.monotonic()))
+    assert released_at and ran_at[0] >= released_at[0]
+
+
+def test_releases_its_own_lock():
+    cache = SimpleCache()
+    flight = SingleFlight(cache)
+
+    def fetch():
+        raise ValueError("bad ticker")
+
+    with pytest.raises(ValueError):
+        flight.do("AAPL", fetch)
+    assert cache.get("inflight_AAPL") is None
@@ -0,0 +1,124 @@
+"""
+Background cache warming for a watchlist of popular tickers.
+
+Most traffic is for the same few dozen tickers, and the first request for
+each of them after its live tail expires triggers an upstream refresh.
+The warmer refreshes a configured watchlist on a fixed interval through the
+normal fetch path, so those lookups are cache hits.
+
+Every gunicorn worker runs a warmer thread, but each round starts by taking a
+lease in the shared cache, so only one worker warms per interval.
+"""
+
+import os
+import time
+import uuid
+import logging
+import datetime
+import threading
+import traceback
+
+logger = logging.getLogger(__name__)
+
+# Comma-separated tickers to keep warm, e.g. "AAPL,MSFT,GOOG" (empty disables the warmer)
+WARM_WATCHLIST = [ticker.strip().upper() for ticker in os.environ.get('WARM_WATCHLIST', '').split(',')
+                  if ticker.strip()]
+
+# Seconds between warming rounds
+WARM_INTERVAL_SECONDS = int(os.environ.get('WARM_INTERVAL_SECONDS', 900))
+
+# History kept warm for each ticker, counted back from today
+WARM_LOOKBACK_DAYS = int(os.environ.get('WARM_LOOKBACK_DAYS', 365))
+
+# Most recent days re-fetched every round to pick up new bars
+WARM_REFRESH_DAYS = int(os.environ.get('WARM_REFRESH_DAYS', 7))
+
+LEASE_KEY = "warm_cache_lease"
+
+
+class CacheWarmer:
+    """
+    Periodically refresh a watchlist in a daemon thread
+
+    Args:
+        cache: Flask-Caching Cache holding the cross-worker lease
+        warm (callable): warm(ticker, start_date, end_date, refresh_from) refreshes one ticker
+        watchlist (list): Ticker symbols to keep warm
+        interval (int): Seconds between rounds
+        lookback_days (int): Days of history to keep warm
+        refresh_days (int): Most recent days fetched again every round
+    """
+
+    def __init__(self, cache, warm, watchlist=None, interval=WARM_INTERVAL_SECONDS,
+                 lookback_days=WARM_LOOKBACK_DAYS, refresh_days=WARM_REFRESH_DAYS):
+        self.cache = cache
+        self.warm = warm
+        self.watchlist = WARM_WATCHLIST if watchlist is None else watchlist
+        self.interval = interval
+        self.lookback_days = lookback_days
+        self.refresh_days = refresh_days
+        self._thread = None
+        self._stop = threading.Event()
+        self.last_run = None
+
+    def start(self):
+        """Start the warming thread (does nothing without a watchlist or when already running)"""
+        if not self.watchlist or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="cache-warmer", daemon=True)
+        self._thread.start()
+        logger.info(f"Cache warmer started for {len(self.watchlist)} tickers every {self.interval}s")
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Cache warming round failed: {str(e)}")
+                logger.error(traceback.format_exc())
+            self._stop.wait(self.interval)
+
+    def _acquire_lease(self):
+        # Expires a little before the next round so the same or another worker can take it then
+        token = f"{os.getpid()}-{uuid.uuid4()}"
+        return self.cache.add(LEASE_KEY, token, timeout=max(1, self.interval - 5))
+
+    def run_once(self, force=False):
+        """
+        Warm every ticker in the watchlist
+
+        Args:
+            force (bool): Skip the lease check
+
+        Returns:
+            dict: Ticker -> row count, or None when another worker holds the lease
+        """
+        if not force and not self._acquire_lease():
+            logger.debug("Cache warming skipped, another worker holds the lease")
+            return None
+
+        today = datetime.date.today()
+        start_date = (today - datetime.timedelta(days=self.lookback_days)).strftime('%Y-%m-%d')
+        refresh_from = (today - datetime.timedelta(days=self.refresh_days)).strftime('%Y-%m-%d')
+        end_date = today.strftime('%Y-%m-%d')
+
+        started = time.monotonic()
+        results = {}
+        for ticker in self.watchlist:
+            if self._stop.is_set():
+                break
+            try:
+                df = self.warm(ticker, start_date, end_date, refresh_from)
+                results[ticker] = 0 if df is None else len(df)
+            except Exception as e:
+                logger.warning(f"Cache warming failed for {ticker}: {str(e)}")
+                results[ticker] = 0
+
+        self.last_run = time.time()
+        logger.info(f"Warmed {sum(1 for rows in results.values() if rows)}/{len(results)} tickers "
+                    f"in {time.monotonic() - started:.1f}s")
+        return results
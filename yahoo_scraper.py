@@ -1,3 +1,6 @@
+import io
+import os
+import json
 import requests
 from bs4 import BeautifulSoup
 import pandas as pd
@@ -7,10 +10,47 @@ import time
 import logging
 import random  # For random user agent selection
 
+import numpy as np
+
+from fetch_engine import host_limiter
+from http_pool import get_session, reset_session
+from metrics import HTTP_ATTEMPTS, RETRIES, BLOCKED
+from request_timing import phase
+
+# lxml is optional: it speeds up HTML parsing when installed
+try:
+    import lxml.html
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# HTML parsing mode for the history table: lxml or full (BeautifulSoup, used when lxml isn't installed)
+HTML_PARSER_MODE = os.environ.get('HTML_PARSER_MODE', 'lxml' if LXML_AVAILABLE else 'full')
+
+# Longest range fetched in one request; longer ranges are split into windows by the bar store
+MAX_RANGE_DAYS = 730
+
+# Site the history pages are scraped from (point it at a local stand-in for load tests)
+YAHOO_BASE_URL = os.environ.get('YAHOO_BASE_URL', 'https://finance.yahoo.com').rstrip('/')
+
+def history_url(ticker, period1, period2):
+    """
+    Build the history page URL for a ticker and period
+
+    Args:
+        ticker (str): Stock ticker symbol
+        period1 (int): Start of the period in epoch seconds
+        period2 (int): End of the period in epoch seconds
+
+    Returns:
+        str: History page URL on YAHOO_BASE_URL
+    """
+    return f"{YAHOO_BASE_URL}/quote/{ticker}/history/?period1={period1}&period2={period2}"
+
 def get_period_timestamps(start_date, end_date):
     """
     Convert date strings to timestamps for Yahoo Finance URL
@@ -88,9 +128,9 @@ def get_period_timestamps(start_date, end_date):
             
             # Make sure date range is reasonable (not more than 2 years)
             date_diff = (end_dt - start_dt).days
-            if date_diff > 730:  # ~2 years
+            if date_diff > MAX_RANGE_DAYS:  # ~2 years
                 logger.warning(f"Date range too large: {date_diff} days, limiting to 2 years")
-                start_dt = end_dt - datetime.timedelta(days=730)
+                start_dt = end_dt - datetime.timedelta(days=MAX_RANGE_DAYS)
             
             logger.info(f"Using date range: {start_dt.strftime('%Y-%m-%d')} to {end_dt.strftime('%Y-%m-%d')}")
             
@@ -123,15 +163,285 @@ def get_period_timestamps(start_date, end_date):
         now_ts = int(time.time())
         return now_ts - (30 * 24 * 60 * 60), now_ts
 
+# Embedded chart API response in newer (SvelteKit) Yahoo pages
+CHART_SCRIPT_PATTERN = re.compile(
+    r'<script[^>]*data-url="[^"]*/v8/finance/chart/[^"]*"[^>]*>(.*?)</script>', re.DOTALL)
+
+HISTORY_COLUMNS = ["Date", "Open", "High", "Low", "Close", "Adj Close", "Volume"]
+
+def _history_frame(timestamps, opens, highs, lows, closes, adj_closes, volumes, gmt_offset=0):
+    """
+    Build a history DataFrame (newest first) from columnar arrays of the chart data
+    
+    Rows with a missing close (e.g. a trading halt) are dropped.
+    """
+    def column(values):
+        return np.array([np.nan if v is None else v for v in values], dtype='float64')
+    
+    closes = column(closes)
+    df = pd.DataFrame({
+        "Date": pd.to_datetime(np.asarray(timestamps, dtype='int64') + gmt_offset, unit='s').normalize(),
+        "Open": column(opens),
+        "High": column(highs),
+        "Low": column(lows),
+        "Close": closes,
+        "Adj Close": column(adj_closes) if adj_closes is not None else closes,
+        "Volume": column(volumes)
+    })
+    df = df.dropna()
+    if df.empty:
+        return None
+    df["Volume"] = df["Volume"].astype('int64')
+    return df.sort_values("Date", ascending=False).reset_index(drop=True)
+
+EVENT_COLUMNS = ["Date", "Dividends", "Stock Splits"]
+
+def _events_frame(dividends, splits):
+    """
+    Combine dividend and split events into one frame, like yfinance's actions
+    
+    Args:
+        dividends (DataFrame): Date and Dividends columns
+        splits (DataFrame): Date and Stock Splits columns
+        
+    Returns:
+        DataFrame: Date, Dividends and Stock Splits (0 where a day has no such event), newest first
+    """
+    events = pd.concat([dividends, splits], ignore_index=True)
+    events = events.reindex(columns=EVENT_COLUMNS).fillna({"Dividends": 0.0, "Stock Splits": 0.0})
+    if events.empty:
+        return events
+    events = events.groupby("Date", as_index=False)[["Dividends", "Stock Splits"]].sum()
+    return events.sort_values("Date", ascending=False).reset_index(drop=True)
+
+def _embedded_events(dividends, splits, gmt_offset=0):
+    """
+    Events frame from the (epoch seconds, value) pairs of the embedded data
+    
+    Args:
+        dividends (list): (epoch seconds, amount) pairs
+        splits (list): (epoch seconds, ratio) pairs
+    """
+    frames = []
+    for column, events in (('Dividends', dividends), ('Stock Splits', splits)):
+        frames.append(pd.DataFrame({
+            "Date": pd.to_datetime(np.array([ts for ts, _ in events], dtype='int64') + gmt_offset, unit='s').normalize(),
+            column: np.array([value for _, value in events], dtype='float64')
+        }))
+    return _events_frame(*frames)
+
+def chart_result_frame(result):
+    """
+    Build a history frame (newest first) and its events from one v8 chart API result
+
+    Args:
+        result (dict): An entry of chart.result in the chart API response
+
+    Returns:
+        tuple: (DataFrame of historical stock data or None if the result has no bars, events DataFrame)
+    """
+    if "timestamp" not in result:
+        return None, _events_frame(pd.DataFrame(), pd.DataFrame())
+    quote = result["indicators"]["quote"][0]
+    adj = result["indicators"].get("adjclose")
+    gmt_offset = result.get("meta", {}).get("gmtoffset", 0)
+    df = _history_frame(
+        result["timestamp"], quote.get("open", []), quote.get("high", []),
+        quote.get("low", []), quote.get("close", []),
+        adj[0].get("adjclose") if adj else None, quote.get("volume", []),
+        gmt_offset=gmt_offset
+    )
+    events = result.get("events") or {}
+    return df, _embedded_events(
+        [(e["date"], e["amount"]) for e in (events.get("dividends") or {}).values()],
+        [(e["date"], e["numerator"] / e["denominator"]) for e in (events.get("splits") or {}).values()],
+        gmt_offset=gmt_offset
+    )
+
+def _extract_chart_json(html):
+    """Extract history from the embedded v8 chart API response (SvelteKit pages)"""
+    for match in CHART_SCRIPT_PATTERN.finditer(html):
+        payload = json.loads(match.group(1))
+        body = payload.get("body")
+        if isinstance(body, str):
+            body = json.loads(body)
+        results = ((body or {}).get("chart") or {}).get("result") or []
+        if not results or "timestamp" not in results[0]:
+            continue
+        return chart_result_frame(results[0])
+    return None, None
+
+def _extract_price_store(html):
+    """Extract history from the HistoricalPriceStore blob (root.App.main pages)"""
+    store_index = html.find('"HistoricalPriceStore"')
+    if store_index == -1:
+        return None, None
+    prices_index = html.find('"prices":', store_index)
+    if prices_index == -1:
+        return None, None
+    
+    array_start = html.index('[', prices_index)
+    prices, _ = json.JSONDecoder().raw_decode(html, array_start)
+    
+    # Dividend/split events share the list but have no prices
+    bars = [p for p in prices if "open" in p]
+    if not bars:
+        return None, None
+    df = _history_frame(
+        [p["date"] for p in bars], [p.get("open") for p in bars], [p.get("high") for p in bars],
+        [p.get("low") for p in bars], [p.get("close") for p in bars],
+        [p.get("adjclose", p.get("close")) for p in bars], [p.get("volume") for p in bars]
+    )
+    return df, _embedded_events(
+        [(p["date"], p["amount"]) for p in prices if p.get("type") == "DIVIDEND"],
+        [(p["date"], p["numerator"] / p["denominator"]) for p in prices if p.get("type") == "SPLIT"]
+    )
+
+def extract_embedded_history(html):
+    """
+    Extract the full price series from the JSON embedded in a Yahoo Finance page
+    
+    This is preferred over the rendered table: it needs no HTML cell walking or
+    text cleaning, and it holds the whole requested range while the table only
+    renders a limited number of rows.
+    
+    Args:
+        html (str): Page HTML
+        
+    Returns:
+        tuple: (DataFrame of historical stock data, newest first, and the events DataFrame),
+            or (None, None) if no embedded data was found
+    """
+    for extractor in (_extract_chart_json, _extract_price_store):
+        try:
+            df, events = extractor(html)
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            logger.warning(f"Embedded JSON extraction with {extractor.__name__} failed: {str(e)}")
+            continue
+        if df is not None:
+            logger.info(f"Extracted {len(df)} rows from embedded page JSON")
+            return df, events
+    return None, None
+
+def extract_table_rows(html, mode=None):
+    """
+    Extract the cell texts of the history table rows from a Yahoo Finance page
+    
+    Args:
+        html (str): Page HTML
+        mode (str): 'lxml' uses lxml.html directly, 'full' builds the complete
+            BeautifulSoup tree (the only option without lxml)
+        
+    Returns:
+        list: One list of stripped cell texts per table row, or None if there is no table
+    """
+    mode = mode or HTML_PARSER_MODE
+    
+    if mode == 'lxml' and LXML_AVAILABLE:
+        document = lxml.html.fromstring(html)
+        table_body = document.find('.//tbody')
+        if table_body is None:
+            return None
+        return [[cell.text_content().strip() for cell in row.findall('td')]
+                for row in table_body.findall('tr')]
+    
+    soup = BeautifulSoup(html, 'html.parser')
+    table_body = soup.find('tbody')
+    if not table_body:
+        return None
+    return [[cell.text.strip() for cell in row.find_all('td')]
+            for row in table_body.find_all('tr')]
+
+# Date format of the history table, e.g. "Apr 8, 2025"
+TABLE_DATE_FORMAT = '%b %d, %Y'
+
+# Dividend and split rows span the price columns with a single cell, e.g. "0.24 Dividend" or "4:1 Stock Splits"
+DIVIDEND_PATTERN = r'^\s*([0-9.]+)\s+Dividend'
+SPLIT_PATTERN = r'^\s*([0-9.]+)\s*:\s*([0-9.]+)\s+Stock Split'
+
+def _parse_table_dates(values):
+    """
+    Parse the table's date cells with TABLE_DATE_FORMAT
+    
+    If not a single cell matches (Yahoo changed the format or served another
+    locale), the format is inferred per cell instead of losing every row.
+    """
+    labels = pd.Series(values, dtype=object)
+    dates = pd.to_datetime(labels, format=TABLE_DATE_FORMAT, errors='coerce')
+    if len(dates) and dates.isna().all():
+        logger.warning(f"No table date matches {TABLE_DATE_FORMAT!r} (e.g. {labels.iloc[0]!r}), inferring the format")
+        dates = pd.to_datetime(labels, format='mixed', errors='coerce')
+    return dates
+
+def _event_frames(rows):
+    """
+    Parse dividend and split rows of the history table
+    
+    Returns:
+        DataFrame: Date, Dividends and Stock Splits, newest first
+    """
+    dates = _parse_table_dates([cells[0] for cells in rows])
+    labels = pd.Series([cells[-1] for cells in rows], dtype=object)
+    
+    amounts = pd.to_numeric(labels.str.extract(DIVIDEND_PATTERN)[0], errors='coerce')
+    dividends = pd.DataFrame({"Date": dates, "Dividends": amounts}).dropna()
+    
+    ratio = labels.str.extract(SPLIT_PATTERN).apply(pd.to_numeric, errors='coerce')
+    splits = pd.DataFrame({"Date": dates, "Stock Splits": ratio[0] / ratio[1]}).dropna()
+    return _events_frame(dividends, splits)
+
+def clean_history_rows(rows):
+    """
+    Turn the history table's cell texts into a typed DataFrame in one vectorized pass
+    
+    All price and volume cells are joined into one block of text and parsed by
+    pandas' C CSV parser in a single pass (thousands separators and "-"
+    placeholders included), and dates are parsed with an explicit format.
+    Dividend and split rows are returned as a separate events frame instead of
+    being dropped.
+    
+    Args:
+        rows (list): Cell texts per table row (from extract_table_rows)
+        
+    Returns:
+        tuple: (DataFrame of historical stock data in table order or None if no
+            price row parsed, events DataFrame)
+    """
+    price_rows = [cells for cells in rows if len(cells) >= 7]
+    event_rows = [cells for cells in rows if 2 <= len(cells) < 7]
+    events = _event_frames(event_rows)
+    if event_rows:
+        logger.debug(f"Found {len(event_rows)} dividend/split rows")
+    if not price_rows:
+        return None, events
+    
+    text = "\n".join("\t".join(cells[1:7]) for cells in price_rows)
+    df = pd.read_csv(io.StringIO(text), sep='\t', header=None, names=HISTORY_COLUMNS[1:],
+                     thousands=',', na_values=['-', 'null', 'N/A'], keep_default_na=False)
+    for col in df.columns:
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            # Unexpected text in a cell, clean just this column the slow way
+            df[col] = pd.to_numeric(df[col].astype(str).str.replace(r'[^0-9.\-]', '', regex=True), errors='coerce')
+    
+    df.insert(0, "Date", _parse_table_dates([cells[0] for cells in price_rows]))
+    
+    df = df.dropna().reset_index(drop=True)
+    if df.empty:
+        logger.error("DataFrame is empty after cleaning")
+        return None, events
+    df["Volume"] = df["Volume"].astype('int64')
+    return df, events
+
 def scrape_yahoo_finance_history(url):
     """
-    Scrape historical data from Yahoo Finance and return as DataFrame
+    Scrape historical data and dividend/split events from Yahoo Finance
     
     Args:
         url (str): Yahoo Finance historical data URL
         
     Returns:
-        DataFrame: Historical stock data
+        tuple: (DataFrame of historical stock data, empty if the range has no bars,
+            and the events DataFrame), or (None, None) if the page could not be used
     """
     try:
         # List of user agents to rotate through (helps prevent blocking by Yahoo)
@@ -154,7 +464,7 @@ def scrape_yahoo_finance_history(url):
             'Accept-Language': 'en-US,en;q=0.9',
             'Accept-Encoding': 'gzip, deflate, br',
             'Connection': 'keep-alive',
-            'Referer': 'https://finance.yahoo.com/',
+            'Referer': f'{YAHOO_BASE_URL}/',
             'Upgrade-Insecure-Requests': '1',
             'DNT': '1',  # Do Not Track
             'Cache-Control': 'max-age=0',
@@ -173,30 +483,38 @@ def scrape_yahoo_finance_history(url):
         
         for attempt in range(max_retries):
             try:
-                response = requests.get(url, headers=headers, timeout=15)
+                # Cap the number of concurrent requests to Yahoo from this process
+                with host_limiter.slot(url):
+                    # Pooled keep-alive session: reuses connections and cookies between fetches
+                    with phase("http"):
+                        response = get_session().get(url, headers=headers, timeout=15)
                 
+                HTTP_ATTEMPTS.inc(source="scrape", status=str(response.status_code))
                 if response.status_code == 200:
                     break
                 
                 logger.warning(f"Attempt {attempt+1}/{max_retries} failed with status code {response.status_code}.")
                 
                 if attempt < max_retries - 1:
+                    RETRIES.inc(source="scrape")
                     time.sleep(retry_delay)
                     retry_delay *= 2  # Exponential backoff
             except requests.exceptions.RequestException as e:
+                HTTP_ATTEMPTS.inc(source="scrape", status="error")
                 logger.warning(f"Request exception on attempt {attempt+1}/{max_retries}: {str(e)}")
                 if attempt < max_retries - 1:
+                    RETRIES.inc(source="scrape")
                     time.sleep(retry_delay)
                     retry_delay *= 2
         
         # Check if we got a valid response
         if response is None:
             logger.error("All request attempts failed.")
-            return None
+            return None, None
             
         if response.status_code != 200:
             logger.error(f"Failed to retrieve page after {max_retries} attempts: Status code {response.status_code}")
-            return None
+            return None, None
         
         # Debug response content
         logger.debug(f"Response content length: {len(response.text)}")
@@ -205,73 +523,53 @@ def scrape_yahoo_finance_history(url):
         # Check for anti-scraping messages
         if "Please try again later" in response.text or "Access Denied" in response.text:
             logger.error("Detected anti-scraping message in response")
+            BLOCKED.inc(source="scrape")
             logger.error("The server may be blocking requests from Render.com's IP addresses")
-            return None
+            # Start the next fetch with a fresh cookie jar and connections
+            reset_session()
+            return None, None
         
-        # Parse the HTML content
-        soup = BeautifulSoup(response.text, 'html.parser')
+        # Prefer the JSON embedded in the page: faster and more complete than the table
+        with phase("parse"):
+            df, events = extract_embedded_history(response.text)
+        if df is not None:
+            return df, events
         
-        # Find the table - it comes after the marker in the HTML
-        table_body = soup.find('tbody')
+        # Extract the history table, with lxml when it is installed
+        with phase("parse"):
+            try:
+                rows = extract_table_rows(response.text, HTML_PARSER_MODE)
+            except Exception as parse_error:
+                logger.warning(f"{HTML_PARSER_MODE} parser failed ({str(parse_error)}), falling back to full parse")
+                rows = extract_table_rows(response.text, 'full')
         
-        if not table_body:
+        if rows is None:
             logger.error("Could not find the table body in the HTML")
             
-            # Check for alternative structures
-            # Sometimes the data might be embedded in JSON/JavaScript
-            for script in soup.find_all('script'):
-                if script.string and "HistoricalPriceStore" in script.string:
-                    logger.info("Found data in JavaScript. Attempting to extract...")
-                    # This would require parsing JavaScript, which is more complex
-                    # but flagging that we found the data in a different format
+            # Build the full document tree only for diagnostics
+            soup = BeautifulSoup(response.text, 'html.parser')
             
             # Output more of the HTML for deeper investigation
             logger.debug(f"HTML title: {soup.title.string if soup.title else 'No title found'}")
             logger.debug(f"HTML body preview: {soup.body.get_text()[:500] if soup.body else 'No body found'}...")
-            return None
+            return None, None
         
-        # Extract data from table rows
-        data = []
-        rows = table_body.find_all('tr') if table_body else []
+        if not any(len(cells) >= 7 for cells in rows):
+            # The page rendered fine but the range has no bars (e.g. before the listing date)
+            logger.warning("History table has no price rows for the requested range")
+            return pd.DataFrame(columns=HISTORY_COLUMNS), _event_frames([cells for cells in rows if len(cells) >= 2])
         
-        for row in rows:
-            cells = row.find_all('td')
-            if len(cells) >= 7:  # Ensure we have enough columns
-                row_data = [cell.text.strip() for cell in cells]
-                data.append(row_data)
+        # Price rows go into the frame, dividend/split rows into the events frame
+        with phase("clean"):
+            df, events = clean_history_rows(rows)
         
-        if not data:
+        if df is None:
             logger.error("No data found in the table")
-            return None
-        
-        # Create DataFrame
-        columns = ["Date", "Open", "High", "Low", "Close", "Adj Close", "Volume"]
-        df = pd.DataFrame(data, columns=columns)
-        
-        # Clean data and convert types
-        for col in ["Open", "High", "Low", "Close", "Adj Close"]:
-            # Replace any non-numeric chars except decimal point and try to convert
-            df[col] = df[col].replace('[^0-9.-]', '', regex=True)
-            # Handle any remaining conversion errors
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-        
-        # Convert Volume to numeric (remove commas and convert)
-        df["Volume"] = df["Volume"].replace('[^0-9]', '', regex=True)
-        df["Volume"] = pd.to_numeric(df["Volume"], errors='coerce')
-        
-        # Convert Date to datetime
-        df["Date"] = pd.to_datetime(df["Date"], errors='coerce')
-        
-        # Drop any rows with NaN values
-        df = df.dropna()
-        
-        if df.empty:
-            logger.error("DataFrame is empty after cleaning")
-            return None
+            return None, None
             
-        return df
+        return df, events
     except Exception as e:
         logger.error(f"Error in scrape_yahoo_finance_history: {str(e)}")
         import traceback
         logger.error(traceback.format_exc())
-        return None
+        return None, None